@@ -0,0 +1,277 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from data_manager import create_data_manager
+from generate_data import parse_rows, write_csv
+from metrics import summarize
+from reporting import LoggingReporter
+from results_view import PAGE_SIZE
+from snapshot import remove_snapshot
+
+# Queries timed by the search phase: common words, a rare one, a prefix, a miss and a typo
+DEFAULT_QUERIES = ('restaurant', 'cafe', 'pharmacy', 'konkan', 'dapoli', 'bakery', 'ph', 'sai',
+                   'jewellers', 'xyzzy', 'pharmcy')
+# (label, sort key, reverse) for every option in the app's sort menu
+SORT_OPTIONS = (('Name (A-Z)', 'Name', False), ('Name (Z-A)', 'Name', True),
+                ('Category (A-Z)', 'Category', False), ('Category (Z-A)', 'Category', True),
+                ('Distance', 'Distance', False), ('Relevance', 'Relevance', False))
+# Reference point for distance sorting (Dapoli)
+NEAR_POINT = (17.7590, 73.1860)
+# A metric is flagged when it is this much slower (or bigger) than the baseline
+REGRESSION_THRESHOLD = 1.10
+# Timings shorter than this are mostly timer noise and are never flagged
+NOISE_FLOOR_MS = 1.0
+# The command line tool, started in a fresh process by the startup phase
+CLI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def clear_cache(data_manager):
+    """Forgets cached results, so a repeated search does the full work again."""
+    cache = getattr(data_manager, 'result_cache', None) # The SQLite backend has none
+    if cache is not None:
+        cache.clear()
+
+
+def first_page(results):
+    """What the app's search worker does with fresh results: count them and fetch page one."""
+    len(results)
+    return results[:PAGE_SIZE]
+
+
+def bench_load(backend, filename):
+    """Loads the data with two fresh managers: a cold start (no snapshot, so a full parse,
+    which also writes the snapshot) and then a warm one. Returns the warm manager, its
+    businesses and the report."""
+    remove_snapshot(filename)
+    report = {}
+    for start in ('cold', 'warm'):
+        data_manager = create_data_manager(backend, filename, LoggingReporter())
+        businesses, seconds = timed(data_manager.load_business_data)
+        if businesses is None:
+            raise RuntimeError(f"Could not load '{filename}'")
+        report[start] = {'seconds': round(seconds, 3), 'source': getattr(data_manager, 'load_source', None)}
+    report.update(rows=len(businesses), peak_rss_mb=peak_rss_mb())
+    return data_manager, businesses, report
+
+
+def bench_startup(backend, filename):
+    """Times `cli.py stats` in a new process, cold (no snapshot) and then warm, so imports
+    and interpreter startup are counted too."""
+    remove_snapshot(filename)
+    report = {}
+    for start in ('cold', 'warm'):
+        command = [sys.executable, CLI_SCRIPT, '--backend', backend, '--data', filename, 'stats']
+        completed, seconds = timed(subprocess.run, command, capture_output=True, text=True, check=True)
+        stats = json.loads(completed.stdout)
+        report[start] = {'seconds': round(seconds, 3), 'load_seconds': stats['load_seconds'],
+                         'source': stats.get('load_source')}
+    return report
+
+
+def bench_search(data_manager, queries, repeat):
+    """Times each query the way a typed search runs: match, default sort, first page.
+    Every run starts from an empty result cache; 'cached' times the same query repeated."""
+    samples, cached, per_query = [], [], {}
+    for query in queries:
+        query_samples = []
+        for _ in range(repeat):
+            clear_cache(data_manager)
+            _, seconds = timed(lambda: first_page(data_manager.search(query, 'Name')))
+            query_samples.append(seconds)
+            _, seconds = timed(lambda: first_page(data_manager.search(query, 'Name')))
+            cached.append(seconds)
+        per_query[query] = {'matches': len(data_manager.search(query, 'Name')), **summarize(query_samples)}
+        samples.extend(query_samples)
+    return {**summarize(samples), 'cached': summarize(cached), 'queries': per_query, 'peak_rss_mb': peak_rss_mb()}
+
+
+def bench_sort(data_manager, query, repeat):
+    """Times every sort option on one broad query, for the first page and for a page halfway down."""
+    options = {}
+    for label, sort_key, reverse in SORT_OPTIONS:
+        first, middle = [], []
+        for _ in range(repeat):
+            clear_cache(data_manager)
+            results, seconds = timed(lambda: data_manager.search(query, sort_key, reverse, near=NEAR_POINT))
+            _, page_seconds = timed(first_page, results)
+            first.append(seconds + page_seconds)
+            half = len(results) // 2
+            _, seconds = timed(lambda: results[half:half + PAGE_SIZE])
+            middle.append(seconds)
+        options[label] = {'first_page': summarize(first), 'middle_page': summarize(middle)}
+    return {'query': query, 'options': options, 'peak_rss_mb': peak_rss_mb()}
+
+
+def bench_render(data_manager, query, repeat):
+    """Times ResultsView showing and paging through results in a real Tk window.
+    Reports the phase as skipped when there is no display (run under xvfb-run to include it)."""
+    try:
+        import tkinter as tk
+        from results_view import ResultsView
+        root = tk.Tk()
+    except Exception as e: # No display, or Tk not installed
+        return {'skipped': str(e)}
+    try:
+        root.withdraw()
+        view = ResultsView(root, on_edit=lambda b: None, on_delete=lambda b: None, on_map=lambda b: None)
+        view.pack()
+        results = data_manager.search(query, 'Name')
+        shows, pages = [], []
+
+        def next_page():
+            # The page is fetched in the background; this includes up to one poll interval
+            view.show_page(1)
+            while view.page != 1:
+                root.update()
+        for _ in range(repeat):
+            _, seconds = timed(lambda: (view.show(results), root.update_idletasks()))
+            shows.append(seconds)
+            if view.page_count() > 1:
+                _, seconds = timed(lambda: (next_page(), root.update_idletasks()))
+                pages.append(seconds)
+        report = {'show': summarize(shows), 'peak_rss_mb': peak_rss_mb()}
+        if pages:
+            report['next_page'] = summarize(pages)
+        return report
+    finally:
+        root.destroy()
+
+
+def bench_save(data_manager, businesses, repeat):
+    samples = []
+    for _ in range(repeat):
+        saved, seconds = timed(data_manager.save_business_data, businesses)
+        if not saved:
+            raise RuntimeError(f"Could not save '{data_manager.filename}'")
+        samples.append(seconds)
+    return {**summarize(samples), 'peak_rss_mb': peak_rss_mb()}
+
+
+def run(data_file, backend, queries, repeat, render=True, startup=True):
+    """Runs every phase against a scratch copy of data_file and returns the report."""
+    scratch = tempfile.mkdtemp(prefix='localsearch-bench-')
+    try:
+        copy = os.path.join(scratch, os.path.basename(data_file))
+        shutil.copy(data_file, copy)
+        report = {}
+        if startup:
+            report['startup'] = bench_startup(backend, copy)
+        data_manager, businesses, report['load'] = bench_load(backend, copy)
+        report['search'] = bench_search(data_manager, queries, repeat)
+        report['sort'] = bench_sort(data_manager, queries[0], repeat)
+        if render:
+            report['render'] = bench_render(data_manager, queries[0], repeat)
+        # Saved last: the SQLite backend rewrites its tables, which the other phases read
+        report['save'] = bench_save(data_manager, list(businesses), max(1, repeat // 5))
+        return report
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def flatten(report, prefix=''):
+    """Yields (dotted name, value) for every number in a report."""
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, name + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in ('runs', 'rows', 'matches'):
+            yield name, value
+
+
+def compare(current, baseline):
+    """Prints every metric next to its baseline value. Returns the names of the regressions."""
+    previous = dict(flatten(baseline['results']))
+    regressions = []
+    for name, value in flatten(current['results']):
+        if name not in previous or not previous[name]:
+            continue
+        ratio = value / previous[name]
+        flag = ''
+        if ratio > REGRESSION_THRESHOLD and not (name.endswith('_ms') and value < NOISE_FLOOR_MS):
+            flag = '  <-- slower' if not name.endswith('rss_mb') else '  <-- bigger'
+            regressions.append(name)
+        print(f"{name:60} {previous[name]:>12} -> {value:>12}  ({ratio:.2f}x){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading, searching, sorting, rendering and saving.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data', help="existing data file to benchmark (it is copied, never modified)")
+    source.add_argument('--rows', type=parse_rows, help="generate a synthetic directory of this size (10k, 100k, 1m)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for --rows")
+    parser.add_argument('--backend', choices=('csv', 'sqlite'), default='csv')
+    parser.add_argument('--repeat', type=int, default=10, help="runs per timed operation (default: 10)")
+    parser.add_argument('--query', action='append', dest='queries',
+                        help="query to time (repeatable); the first one is also used for sorting and rendering")
+    parser.add_argument('--no-render', action='store_true', help="skip the Tk rendering phase")
+    parser.add_argument('--no-startup', action='store_true',
+                        help="skip the phase timing cold and warm starts of cli.py in a new process")
+    parser.add_argument('-o', '--output', help="write the report as JSON to this file")
+    parser.add_argument('--baseline', help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    data_file = args.data
+    generated = None
+    if args.rows:
+        generated = tempfile.NamedTemporaryFile(prefix='businesses-', suffix='.csv', delete=False).name
+        print(f"Generating {args.rows} businesses...", file=sys.stderr)
+        write_csv(generated, args.rows, args.seed)
+        data_file = generated
+        if args.backend == 'sqlite':
+            from sqlite_manager import migrate_from_csv
+            data_file = generated[:-len('.csv')] + '.db'
+            migrate_from_csv(generated, data_file, overwrite=True, reporter=LoggingReporter())
+    try:
+        results = run(data_file, args.backend, args.queries or list(DEFAULT_QUERIES), args.repeat,
+                      render=not args.no_render, startup=not args.no_startup)
+    finally:
+        for path in {generated, data_file if generated else None} - {None}:
+            os.remove(path)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'data': args.data or f"synthetic {args.rows} rows, seed {args.seed}",
+            'backend': args.backend,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(report, json.load(file))
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {REGRESSION_THRESHOLD - 1:.0%}", file=sys.stderr)
+            sys.exit(1)
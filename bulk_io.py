@@ -0,0 +1,189 @@
+# bulk_io.py
+import csv
+import json
+import logging
+import os
+import sys
+from collections import deque
+
+from data_manager import EXPECTED_HEADERS
+from geo_index import parse_coordinates
+from search_engine import normalize
+
+# Rows handed to a worker process at a time
+IMPORT_CHUNK_ROWS = 20000
+# Same required fields as the Add/Edit window
+REQUIRED_FIELDS = ('Name', 'Category', 'Address')
+# How many invalid rows are logged individually before only counting them
+MAX_LOGGED_ERRORS = 20
+FORMATS = ('csv', 'jsonl')
+
+_NAME_POSITION = EXPECTED_HEADERS.index('Name')
+_ADDRESS_POSITION = EXPECTED_HEADERS.index('Address')
+
+logger = logging.getLogger('localsearch')
+
+
+def detect_format(filename, fmt=None):
+    """Returns fmt if given, otherwise 'jsonl' for .jsonl/.ndjson/.json files and 'csv' for anything else."""
+    if fmt:
+        return fmt
+    return 'jsonl' if os.path.splitext(filename)[1].lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def validate_business(business, check_coordinates=True):
+    """Checks and normalizes one imported row. With check_coordinates=False, coordinates are
+    kept as given, like the Edit window does; such rows are left out of distance searches.
+    Returns (values in EXPECTED_HEADERS order, None) or (None, error message)."""
+    if not isinstance(business, dict):
+        return None, "not an object"
+    row = {}
+    for header in EXPECTED_HEADERS:
+        value = business.get(header)
+        row[header] = '' if value is None else str(value).strip() # JSONL may hold numbers
+    missing = [field for field in REQUIRED_FIELDS if not row[field]]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    if check_coordinates and (row['Latitude'] or row['Longitude']) and parse_coordinates(row) is None:
+        return None, f"invalid coordinates ({row['Latitude']!r}, {row['Longitude']!r})"
+    if not row['ID']:
+        import uuid # Kept out of startup: cli.py, main.py and server.py all import this module
+        row['ID'] = str(uuid.uuid4())
+    return [row[header] for header in EXPECTED_HEADERS], None
+
+
+def dedupe_key(values):
+    """Two rows with the same Name and Address (ignoring case) are the same business."""
+    return normalize(values[_NAME_POSITION]), normalize(values[_ADDRESS_POSITION])
+
+
+def _validate_chunk(task):
+    """Worker-process side of import_file(): parses and validates one chunk of rows."""
+    fmt, header, first_row, items = task
+    valid, errors = [], []
+    for row_number, item in enumerate(items, first_row):
+        if fmt == 'jsonl':
+            try:
+                business = json.loads(item)
+            except ValueError as e:
+                errors.append((row_number, f"invalid JSON: {e}"))
+                continue
+        else:
+            business = dict(zip(header, item))
+        values, error = validate_business(business)
+        if error is None:
+            valid.append(values)
+        else:
+            errors.append((row_number, error))
+    return valid, errors
+
+
+def _read_tasks(file, fmt, chunk_rows):
+    """Splits an import file into (fmt, header, first row number, items) tasks. CSV rows are
+    split here, since quoted fields may span lines; JSONL lines are parsed by the workers."""
+    if fmt == 'jsonl':
+        header = None
+        rows = (line for line in file if line.strip())
+    else:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        rows = (row for row in reader if row)
+    chunk, first_row = [], 1
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield fmt, header, first_row, chunk
+            first_row += len(chunk)
+            chunk = []
+    if chunk:
+        yield fmt, header, first_row, chunk
+
+
+def _map_in_order(function, tasks, workers):
+    """Like map(), over a process pool when workers > 1. At most 2 * workers tasks are
+    in flight, so a file of millions of rows is never held in memory all at once."""
+    if workers <= 1:
+        yield from map(function, tasks)
+        return
+    from concurrent.futures import ProcessPoolExecutor # Pulls in multiprocessing; only needed here
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_file(data_manager, filename, fmt=None, workers=None, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Validates, dedupes and adds every business in a CSV or JSONL file ('-' reads stdin).
+
+    Parsing and validation run on a pool of worker processes; deduplication
+    happens here, in file order, against both the existing data and earlier
+    rows of the file (by ID, and by Name plus Address). Returns a dict of
+    counts: read, imported, invalid and duplicates. Raises OSError if the file
+    cannot be read and RuntimeError if the data manager fails to save."""
+    fmt = detect_format(filename, fmt)
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    existing = data_manager.load_business_data()
+    if existing is None:
+        raise RuntimeError(f"Could not load '{data_manager.filename}'")
+    seen_ids = set()
+    seen_keys = set()
+    id_position = EXPECTED_HEADERS.index('ID')
+    for business in existing:
+        values = [business.get(header, '') for header in EXPECTED_HEADERS]
+        seen_ids.add(values[id_position])
+        seen_keys.add(dedupe_key(values))
+
+    stats = {'read': 0, 'imported': 0, 'invalid': 0, 'duplicates': 0}
+    accepted = []
+    file = sys.stdin if filename == '-' else open(filename, mode='r', newline='', encoding='utf-8')
+    try:
+        for valid, errors in _map_in_order(_validate_chunk, _read_tasks(file, fmt, chunk_rows), workers):
+            stats['read'] += len(valid) + len(errors)
+            for row_number, error in errors:
+                if stats['invalid'] < MAX_LOGGED_ERRORS:
+                    logger.warning("%s row %d skipped: %s", filename, row_number, error)
+                stats['invalid'] += 1
+            for values in valid:
+                key = dedupe_key(values)
+                if values[id_position] in seen_ids or key in seen_keys:
+                    stats['duplicates'] += 1
+                    continue
+                seen_ids.add(values[id_position])
+                seen_keys.add(key)
+                accepted.append(dict(zip(EXPECTED_HEADERS, values)))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+    if stats['invalid'] > MAX_LOGGED_ERRORS:
+        logger.warning("%d more invalid rows not shown", stats['invalid'] - MAX_LOGGED_ERRORS)
+
+    if accepted and not data_manager.add_businesses(accepted):
+        raise RuntimeError(f"Could not save the imported businesses to '{data_manager.filename}'")
+    stats['imported'] = len(accepted)
+    return stats
+
+
+def export_file(businesses, filename, fmt=None):
+    """Streams businesses to a CSV or JSONL file ('-' writes stdout). Returns the number written."""
+    fmt = detect_format(filename, fmt)
+    file = sys.stdout if filename == '-' else open(filename, mode='w', newline='', encoding='utf-8')
+    count = 0
+    try:
+        if fmt == 'jsonl':
+            for business in businesses:
+                file.write(json.dumps({header: business.get(header, '') for header in EXPECTED_HEADERS}) + '\n')
+                count += 1
+        else:
+            writer = csv.writer(file)
+            writer.writerow(EXPECTED_HEADERS)
+            for business in businesses:
+                writer.writerow([business.get(header, '') for header in EXPECTED_HEADERS])
+                count += 1
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    return count
@@ -1,33 +1,50 @@
 # business_app.py
 import tkinter as tk
-from tkinter import messagebox, scrolledtext
-import uuid # For generating unique IDs
+from tkinter import messagebox, scrolledtext, ttk
 
 # Import external modules
 from data_manager import DataManager
 from map_utils import show_on_map
 from dialog_utils import custom_confirm_dialog
+from results_view import ResultsView, PAGE_SIZE
+from geo_index import parse_geo_query, parse_point
+from search_worker import SearchWorker
+from load_worker import LoadWorker
+from metrics import metrics
+
+# Delay after the last keystroke before a live search starts, in milliseconds
+SEARCH_DEBOUNCE_MS = 250
+# Spans shown in the status bar after each search while metrics are on
+SEARCH_BREAKDOWN = ('search.match', 'search.sort', 'search.page', 'render')
 
 class BusinessSearchApp:
-    def __init__(self, master):
+    def __init__(self, master, data_manager=None):
         self.master = master
         master.title("Local Business Search Engine")
         master.geometry("800x600") # Set a larger default window size
         master.resizable(True, True) # Allow window resizing
 
-        self.data_manager = DataManager() # Instantiate the DataManager
+        # CSV-backed DataManager unless a different backend was chosen in main.py
+        self.data_manager = data_manager if data_manager is not None else DataManager()
         
-        # --- Data Loading ---
-        self.businesses = self.data_manager.load_business_data()
-        if self.businesses is None: # None indicates a critical error during load
-            master.destroy()
-            return
-        elif not self.businesses:
-            messagebox.showwarning("Warning", "No business data found. 'businesses.csv' is empty or missing. You can add new businesses.")
+        # Matching and sorting run on a background thread so typing never blocks the UI
+        self.search_worker = SearchWorker(master, self._run_search, self._show_results, self._show_search_error)
+        self._debounce_id = None
 
         # --- UI Elements ---
         self.create_widgets()
-        self.search_business() # Display all businesses initially
+
+        # --- Data Loading ---
+        # The data is loaded on a background thread, so the window shows up right away;
+        # the first page appears once the first chunk is in and searches run against
+        # whatever has been loaded so far
+        self.businesses = None
+        self.load_percent = 0
+        self._first_page_requested = False
+        self.status_bar.config(text="Loading businesses...")
+        self.load_worker = LoadWorker(master, self.data_manager.stream_business_data,
+                                      self._show_load_progress, self._finish_loading, self._show_load_error)
+        self.load_worker.start()
 
     def create_widgets(self):
         """Creates all UI elements for the main application window."""
@@ -37,10 +54,20 @@ class BusinessSearchApp:
 
         tk.Label(search_frame, text="Search for a business:").pack(side=tk.LEFT, padx=(0, 10))
 
-        self.search_entry = tk.Entry(search_frame, width=40)
+        self.search_var = tk.StringVar(self.master)
+        self.search_var.trace_add("write", self._schedule_search) # Search as you type
+        self.search_entry = tk.Entry(search_frame, width=40, textvariable=self.search_var)
         self.search_entry.pack(side=tk.LEFT, expand=True, fill=tk.X)
         self.search_entry.bind("<Return>", self.search_business_event) # Allow Enter key to trigger search
 
+        # Reference point for "within R km", "nearest N" and distance sorting
+        tk.Label(search_frame, text="Near (lat, lon):").pack(side=tk.LEFT, padx=(10, 5))
+        self.near_var = tk.StringVar(self.master)
+        self.near_var.trace_add("write", self._schedule_search)
+        self.near_entry = tk.Entry(search_frame, width=18, textvariable=self.near_var)
+        self.near_entry.pack(side=tk.LEFT)
+        self.near_entry.bind("<Return>", self.search_business_event)
+
         self.search_button = tk.Button(search_frame, text="Search", command=self.search_business)
         self.search_button.pack(side=tk.LEFT, padx=(10, 0))
 
@@ -61,7 +88,9 @@ class BusinessSearchApp:
             "Name (A-Z)": ("Name", False),
             "Name (Z-A)": ("Name", True),
             "Category (A-Z)": ("Category", False),
-            "Category (Z-A)": ("Category", True)
+            "Category (Z-A)": ("Category", True),
+            "Distance": ("Distance", False),
+            "Relevance": ("Relevance", False)
         }
         # Set default sort option
         self.sort_option_var.set(list(self.sort_options.keys())[0]) 
@@ -75,96 +104,124 @@ class BusinessSearchApp:
 
         tk.Label(results_frame, text="Search Results:").pack(anchor=tk.NW, pady=(0,5))
 
-        self.results_text = scrolledtext.ScrolledText(results_frame, wrap=tk.WORD, font=("Arial", 10),
-                                                    state=tk.DISABLED, # Start as read-only
-                                                    height=15)
-        self.results_text.pack(fill=tk.BOTH, expand=True)
+        # Paged table with a single action bar, instead of widgets per result
+        self.results_view = ResultsView(results_frame,
+                                        on_edit=self.open_add_edit_window,
+                                        on_delete=self.delete_business,
+                                        on_map=lambda b: show_on_map(b.get('Name', ''), b.get('Address', ''), self.status_bar),
+                                        on_error=lambda e: self.status_bar.config(text=f"Could not fetch results: {e}"))
+        self.results_view.pack(fill=tk.BOTH, expand=True)
 
         # --- Status Bar ---
         self.status_bar = tk.Label(self.master, text="Ready", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
 
+        # Loading progress, shown above the status bar until the data is fully loaded
+        self.load_progress = ttk.Progressbar(self.master, mode='determinate', maximum=100)
+        self.load_progress.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+
+    def _show_load_progress(self, bytes_read, total_bytes):
+        """Runs on the Tk thread after every loaded chunk."""
+        self.load_percent = 100 * bytes_read // total_bytes if total_bytes else 100
+        self.load_progress['value'] = self.load_percent
+        if not self._first_page_requested:
+            self._first_page_requested = True
+            self.search_business() # Show the first page without waiting for the rest
+
+    def _finish_loading(self, businesses):
+        """Runs on the Tk thread once the data has been fully loaded."""
+        self.businesses = businesses
+        self.load_percent = 100
+        self.load_progress.pack_forget()
+        if self.data_manager.load_warning:
+            messagebox.showwarning("Warning", self.data_manager.load_warning)
+        if not businesses:
+            messagebox.showwarning("Warning", "No business data found. 'businesses.csv' is empty or missing. You can add new businesses.")
+        self.search_business() # Re-run the current search over the complete data
+
+    def _show_load_error(self, error):
+        """Runs on the Tk thread when loading failed; the app cannot continue."""
+        messagebox.showerror(getattr(error, 'title', "Load Error"), str(error))
+        self.master.destroy()
+
     def search_business_event(self, event):
         """Event handler for Enter key press in search entry."""
         self.search_business()
 
-    def _sort_results(self, results):
-        """Helper method to sort the list of business results."""
+    def _sort_settings(self):
+        """Returns the (field, reverse) pair for the selected sort option."""
         selected_option = self.sort_option_var.get()
-        sort_key_name, reverse_sort = self.sort_options.get(selected_option, ("Name", False)) # Default to Name A-Z
+        return self.sort_options.get(selected_option, ("Name", False)) # Default to Name A-Z
 
-        # Sort the results based on the chosen key
-        # Using .get() with a default empty string to handle missing keys gracefully
-        return sorted(results, key=lambda b: b.get(sort_key_name, '').lower(), reverse=reverse_sort)
 
+    def _schedule_search(self, *args):
+        """Restarts the debounce timer; the search runs once typing pauses."""
+        if self._debounce_id is not None:
+            self.master.after_cancel(self._debounce_id)
+        self._debounce_id = self.master.after(SEARCH_DEBOUNCE_MS, self.search_business)
 
     def search_business(self, *args): # *args to accept event from OptionMenu
-        """Performs the business search and displays results."""
+        """Starts a business search on the worker thread; results are shown when it finishes."""
+        if self._debounce_id is not None:
+            self.master.after_cancel(self._debounce_id) # Searching now; no need for the pending one
+            self._debounce_id = None
         query = self.search_entry.get().strip().lower()
         
-        self.results_text.config(state=tk.NORMAL) # Enable text widget for editing
-        self.results_text.delete(1.0, tk.END)  # Clear previous results
-
-        found_results = []
-        if not query:
-            # If query is empty, show all businesses
-            found_results = list(self.businesses)
-            self.status_bar.config(text=f"Displaying all {len(found_results)} business(es).")
-        else:
-            for b in self.businesses:
-                # More flexible searching: check if query is a substring of name, category, or description
-                name_match = query in b.get('Name', '').lower()
-                category_match = query in b.get('Category', '').lower()
-                description_match = query in b.get('Description', '').lower()
-                if name_match or category_match or description_match:
-                    found_results.append(b)
-            self.status_bar.config(text=f"Found {len(found_results)} result(s).")
-
-        # Apply sorting to the found results
-        found_results = self._sort_results(found_results)
-
-        if found_results:
-            for b in found_results:
-                # Insert business details
-                self.results_text.insert(tk.END, f"Name: {b.get('Name', 'N/A')}\n")
-                self.results_text.insert(tk.END, f"Category: {b.get('Category', 'N/A')}\n")
-                self.results_text.insert(tk.END, f"Address: {b.get('Address', 'N/A')}\n")
-                self.results_text.insert(tk.END, f"Phone: {b.get('Phone', 'N/A')}\n")
-                if b.get('Website'):
-                    self.results_text.insert(tk.END, f"Website: {b['Website']}\n")
-                if b.get('Hours'):
-                    self.results_text.insert(tk.END, f"Hours: {b['Hours']}\n")
-                if b.get('Description'):
-                    self.results_text.insert(tk.END, f"Description: {b['Description']}\n")
-                
-                # Add action buttons for each business
-                # Using a lambda to pass the specific business 'b' to the command
-                self.results_text.insert(tk.END, "Actions: ")
-                self.results_text.window_create(tk.END, window=tk.Button(self.results_text, text="Edit",
-                                                    command=lambda data=b: self.open_add_edit_window(data),
-                                                    font=("Arial", 8), padx=2, pady=0))
-                self.results_text.insert(tk.END, " ")
-                self.results_text.window_create(tk.END, window=tk.Button(self.results_text, text="Delete",
-                                                    command=lambda data=b: self.delete_business(data),
-                                                    font=("Arial", 8), padx=2, pady=0))
-                self.results_text.insert(tk.END, " ")
-                if b.get('Address') and b.get('Name'): # Only show map button if address and name exist
-                     self.results_text.window_create(tk.END, window=tk.Button(self.results_text, text="Map",
-                                                         command=lambda name=b.get('Name', ''), addr=b.get('Address', ''): show_on_map(name, addr, self.status_bar),
-                                                         font=("Arial", 8), padx=2, pady=0))
-                self.results_text.insert(tk.END, "\n\n") # Separator between businesses
+        # A trailing "within 2 km" or "nearest 5" limits results around the Near point
+        query, radius_km, nearest = parse_geo_query(query)
+        near = parse_point(self.near_entry.get())
+        sort_key_name, reverse_sort = self._sort_settings()
+        if near is None and (radius_km is not None or nearest is not None):
+            self.status_bar.config(text="Enter a 'latitude, longitude' point in the Near box to search by distance.")
+            return
+        if near is None and sort_key_name == "Distance":
+            sort_key_name = "Name" # No point to measure from; fall back to the default order
+
+        self.status_bar.config(text="Searching...")
+        show_all = not query and radius_km is None and nearest is None
+        self.search_worker.submit(query, sort_key_name, reverse_sort, near, radius_km, nearest, show_all)
+
+    def _run_search(self, query, sort_key_name, reverse_sort, near, radius_km, nearest, show_all):
+        """Runs on the worker thread: matches, sorts and pre-fetches the first page."""
+        # Checked first: a search that started before loading finished may have missed rows
+        partial = self.data_manager.loading
+        # Substring match on name, category or description plus sorting both happen in the
+        # data layer: in memory for the CSV backend, inside the database for SQLite.
+        # An empty query returns all businesses.
+        found_results = self.data_manager.search(query, sort_key_name, reverse_sort,
+                                                 near=near, radius_km=radius_km, nearest=nearest)
+        # Counting and fetching the first page are the expensive parts for lazy results
+        with metrics.span('search.page'):
+            metrics.count('search.results', len(found_results))
+            found_results[:PAGE_SIZE]
+        return found_results, show_all, partial
+
+    def _show_results(self, outcome):
+        """Runs on the Tk thread with the results of the newest search."""
+        found_results, show_all, partial = outcome
+        if not found_results:
+            status = "No results found."
+        elif show_all:
+            status = f"Displaying all {len(found_results)} business(es)."
         else:
-            self.results_text.insert(tk.END, "No results found for your query. Try adding a new business!")
-            self.status_bar.config(text="No results found.")
-
-        self.results_text.config(state=tk.DISABLED) # Make text read-only again
+            status = f"Found {len(found_results)} result(s)."
+        if partial:
+            status += f" Partial results: still loading ({self.load_percent}% read)."
+        self.results_view.show(found_results, empty_message="No results found for your query. Try adding a new business!")
+        if metrics.enabled:
+            # Where the time went, e.g. "[match 3.1 ms, sort 0.2 ms, page 1.4 ms, render 6.0 ms]"
+            status += f" [{metrics.breakdown(SEARCH_BREAKDOWN)}]"
+        self.status_bar.config(text=status)
+
+    def _show_search_error(self, error):
+        self.status_bar.config(text="Search failed.")
+        messagebox.showerror("Search Error", f"An error occurred while searching: {error}")
 
     def clear_search(self):
         """Clears the search entry, results text, and displays all businesses."""
         self.search_entry.delete(0, tk.END)
-        self.results_text.config(state=tk.NORMAL)
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.config(state=tk.DISABLED)
+        self.near_entry.delete(0, tk.END)
+        self.results_view.clear()
         self.status_bar.config(text="Ready")
         self.search_business() # Re-display all businesses
 
@@ -249,47 +306,36 @@ class BusinessSearchApp:
             return
 
         if original_business_data: # Editing existing business
-            # Find the business by its ID (preferred) or name and update it
-            found = False
-            for i, b in enumerate(self.businesses):
-                if b.get('ID') == original_business_data.get('ID'):
-                    # Update all fields
-                    for key_map, csv_key in {
-                        'name_entry': 'Name', 'category_entry': 'Category', 'address_entry': 'Address',
-                        'phone_entry': 'Phone', 'website_entry': 'Website', 'hours_entry': 'Hours',
-                        'description_entry': 'Description', 'latitude_entry': 'Latitude', 'longitude_entry': 'Longitude'
-                    }.items():
-                        b[csv_key] = new_data.get(csv_key, '') # Use .get with empty string default
-                    found = True
-                    break
-            if not found:
-                messagebox.showerror("Error", "Could not find business to edit.")
-                return
+            # Keep the original ID and replace every editable field
+            updated_data = dict(original_business_data)
+            for csv_key in self.data_manager.expected_headers:
+                if csv_key != 'ID':
+                    updated_data[csv_key] = new_data.get(csv_key, '') # Use .get with empty string default
+            # DataManager journals the change, updates the row in place and re-indexes it
+            if not self.data_manager.update_business(updated_data):
+                return # Error message already shown by DataManager
             messagebox.showinfo("Success", "Business updated successfully!")
         else: # Adding new business
+            import uuid # Imported here rather than at startup; only needed when adding
             new_data['ID'] = str(uuid.uuid4()) # Generate a unique ID
             # Ensure all expected headers are present, even if empty
             for header in self.data_manager.expected_headers: # Use expected headers from DataManager
                 if header not in new_data:
                     new_data[header] = ''
-            self.businesses.append(new_data)
+            if not self.data_manager.add_business(new_data):
+                return # Error message already shown by DataManager
             messagebox.showinfo("Success", "New business added successfully!")
 
-        if self.data_manager.save_business_data(self.businesses): # Call DataManager to save
-            window.destroy()
-            self.search_business() # Refresh results in main window
-        else:
-            # Error message already shown by DataManager
-            pass
+        window.destroy()
+        self.search_business() # Refresh results in main window
 
     def delete_business(self, business_data):
         """Deletes a business entry after confirmation."""
         # Use the custom confirmation dialog from dialog_utils
         if custom_confirm_dialog(self.master, "Confirm Delete", f"Are you sure you want to delete '{business_data.get('Name', 'N/A')}'?"):
             try:
-                # Filter out the business to be deleted by its ID
-                self.businesses = [b for b in self.businesses if b.get('ID') != business_data.get('ID')]
-                if self.data_manager.save_business_data(self.businesses): # Call DataManager to save
+                # DataManager journals the deletion and removes it from the shared list and index
+                if self.data_manager.delete_business(business_data.get('ID')):
                     messagebox.showinfo("Success", "Business deleted successfully!")
                     self.search_business() # Refresh results
                 else:
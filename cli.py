@@ -0,0 +1,293 @@
+# cli.py
+import argparse
+import configparser
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+from bulk_io import FORMATS, export_file, import_file
+from data_manager import BACKENDS, DataLoadError, create_data_manager
+from geo_index import haversine_km, parse_coordinates, parse_geo_query, parse_point
+from metrics import metrics
+from reporting import LoggingReporter
+from search_engine import normalize
+
+# Optional settings file; command-line flags take precedence over it
+CONFIG_FILE = 'settings.ini'
+# Sort keys accepted by DataManager.search()
+SORT_KEYS = ('Name', 'Category', 'Distance', 'Relevance')
+# Results printed per query unless --limit says otherwise
+DEFAULT_LIMIT = 20
+
+logger = logging.getLogger('localsearch')
+
+
+def settings(section, config_file=CONFIG_FILE):
+    """Returns a section of settings.ini, or an empty dict if there is none."""
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    return config[section] if config.has_section(section) else {}
+
+
+def storage_settings(config_file=CONFIG_FILE):
+    """Returns the [storage] section of settings.ini, or an empty dict if there is none."""
+    return settings('storage', config_file)
+
+
+def add_metrics_arguments(parser):
+    """Adds --metrics, --trace and --profile, defaulting to the [metrics] section of settings.ini.
+    Shared with main.py."""
+    config = settings('metrics')
+    parser.add_argument('--metrics', action='store_true',
+                        default=config.get('enabled', 'no').strip().lower() in ('1', 'yes', 'true', 'on'),
+                        help="time load, search, render and save (implied by --trace and --profile)")
+    parser.add_argument('--trace', metavar='FILE', default=config.get('trace'),
+                        help="on exit, write the timings as Chrome-trace JSON (chrome://tracing, ui.perfetto.dev)")
+    parser.add_argument('--profile', metavar='FILE', default=config.get('profile'),
+                        help="run under cProfile and write its stats to FILE on exit (python -m pstats FILE)")
+
+
+def start_metrics(args):
+    """Turns instrumentation on if the command line or settings.ini asked for it."""
+    if args.metrics or args.trace or args.profile:
+        metrics.start(trace_file=args.trace, profile_file=args.profile)
+
+
+def build_parser():
+    storage = storage_settings()
+    parser = argparse.ArgumentParser(
+        description="Local Business Search Engine, without the window. Results are printed as JSON lines.")
+    parser.add_argument('--backend', choices=BACKENDS, default=storage.get('backend', 'csv'),
+                        help="storage backend to use (default: csv)")
+    parser.add_argument('--data', default=storage.get('data'),
+                        help="data file, or the URL of a running server.py for --backend http (default: businesses.csv or businesses.db)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log progress as well as problems")
+    add_metrics_arguments(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help="search by text, like the search box",
+                                description="Prints one JSON line per query. Text may end in "
+                                            "'within R km' or 'nearest N', as in the app.")
+    query.add_argument('text', nargs='*', help="search text (default: every business)")
+    query.add_argument('--batch', metavar='FILE',
+                       help="read one query per line from FILE ('-' for stdin); a line may also be a "
+                            "JSON object with query, near, sort, reverse and limit keys")
+    query.add_argument('--near', metavar='"LAT, LON"', help="reference point for distance searches")
+    query.add_argument('--sort', choices=SORT_KEYS, default='Name')
+    query.add_argument('--reverse', action='store_true', help="sort in descending order")
+    query.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="results per query, 0 for all (default: 20)")
+
+    near = commands.add_parser('near', help="businesses around a point, closest first")
+    near.add_argument('point', metavar='"LAT, LON"')
+    near.add_argument('text', nargs='*', help="optional search text to filter by")
+    limit = near.add_mutually_exclusive_group()
+    limit.add_argument('--radius', type=float, metavar='KM', help="only businesses within KM kilometres")
+    limit.add_argument('--nearest', type=int, metavar='N', help="only the N closest businesses")
+    near.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help="results to print, 0 for all (default: 20)")
+
+    bulk_import = commands.add_parser('import', help="validate, dedupe and add businesses from a CSV or JSONL file")
+    bulk_import.add_argument('file', help="file to import ('-' for stdin)")
+    bulk_import.add_argument('--format', choices=FORMATS, help="file format (default: from the extension)")
+    bulk_import.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+
+    export = commands.add_parser('export', help="write businesses to a CSV or JSONL file")
+    export.add_argument('file', help="file to write ('-' for stdout)")
+    export.add_argument('--format', choices=FORMATS, help="file format (default: from the extension)")
+    export.add_argument('--query', default='', help="only export businesses matching this search text")
+
+    commands.add_parser('stats', help="print counts and load time (cold or warm start) as JSON")
+    return parser
+
+
+def load(data_manager):
+    """Loads the data, raising DataLoadError on failure. Returns every business."""
+    businesses = data_manager.stream_business_data()
+    if data_manager.load_warning:
+        logger.warning(data_manager.load_warning)
+    return businesses
+
+
+def run_query(data_manager, text, near=None, sort='Name', reverse=False, limit=DEFAULT_LIMIT, offset=0,
+              radius_km=None, nearest=None):
+    """Runs one search the way the app's search box does and returns it as a JSON-ready dict.
+    radius_km and nearest, if given, replace a "within R km" or "nearest N" at the end of text.
+    Raises ValueError for a malformed point or an impossible combination of options."""
+    query, text_radius_km, text_nearest = parse_geo_query(normalize(text))
+    radius_km = text_radius_km if radius_km is None else radius_km
+    nearest = text_nearest if nearest is None else nearest
+    point = None
+    if near:
+        # "lat, lon" from the command line, or a [lat, lon] pair from a JSON batch line
+        point = parse_point(near if isinstance(near, str) else ' '.join(map(str, near)))
+    if near and point is None:
+        raise ValueError(f"invalid point {near!r}; expected 'latitude, longitude'")
+    if point is None and (radius_km is not None or nearest is not None):
+        raise ValueError("'within' and 'nearest' need a reference point (--near)")
+    if sort not in SORT_KEYS:
+        raise ValueError(f"unknown sort key {sort!r}; expected one of {', '.join(SORT_KEYS)}")
+    if point is None and sort == 'Distance':
+        sort = 'Name' # No point to measure from; fall back to the default order
+    results = data_manager.search(query, sort, reverse, near=point, radius_km=radius_km, nearest=nearest)
+    page = results[offset:offset + limit] if limit else list(results[offset:])
+    return {'query': text, 'total': len(results), 'results': [as_json(business, point) for business in page]}
+
+
+def as_json(business, point=None):
+    """A business as a plain dict, plus its distance in km from point when both have coordinates."""
+    row = dict(business)
+    coordinates = parse_coordinates(row) if point is not None else None
+    if coordinates is not None:
+        row['distance_km'] = round(haversine_km(point[0], point[1], *coordinates), 3)
+    return row
+
+
+def read_batch(filename):
+    """Yields the queries in a batch file, one per non-blank line, as run_query() keyword arguments."""
+    file = sys.stdin if filename == '-' else open(filename, encoding='utf-8')
+    try:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    spec = json.loads(line)
+                except ValueError as e:
+                    yield {'text': line, 'error': f"invalid JSON: {e}"}
+                    continue
+                yield {'text': spec.get('query', ''), 'near': spec.get('near'), 'sort': spec.get('sort'),
+                       'reverse': spec.get('reverse'), 'limit': spec.get('limit')}
+            else:
+                yield {'text': line}
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def command_query(data_manager, args):
+    load(data_manager)
+    if args.batch:
+        specs = read_batch(args.batch)
+    else:
+        specs = [{'text': ' '.join(args.text)}]
+    failed = False
+    for spec in specs:
+        if 'error' in spec:
+            result = {'query': spec['text'], 'error': spec['error']}
+        else:
+            # Per-line settings override the command-line ones
+            options = {'near': args.near, 'sort': args.sort, 'reverse': args.reverse, 'limit': args.limit}
+            options.update((key, value) for key, value in spec.items() if value is not None and key != 'text')
+            try:
+                result = run_query(data_manager, spec['text'], **options)
+            except ValueError as e:
+                result = {'query': spec['text'], 'error': str(e)}
+        failed = failed or 'error' in result
+        print(json.dumps(result), flush=bool(args.batch)) # Stream batch results as they are ready
+    cache = getattr(data_manager, 'result_cache', None)
+    if args.batch and cache is not None:
+        logger.info("Result cache: %s", json.dumps(cache.stats()))
+    return 1 if failed else 0
+
+
+def command_near(data_manager, args):
+    load(data_manager)
+    try:
+        result = run_query(data_manager, ' '.join(args.text), near=args.point, sort='Distance', limit=args.limit,
+                           radius_km=args.radius, nearest=args.nearest)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    print(json.dumps(result))
+    return 0
+
+
+def command_import(data_manager, args):
+    started = time.perf_counter()
+    try:
+        stats = import_file(data_manager, args.file, args.format, args.workers)
+    except (OSError, RuntimeError) as e:
+        logger.error(str(e))
+        return 1
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    print(json.dumps(stats))
+    return 0
+
+
+def command_export(data_manager, args):
+    businesses = load(data_manager)
+    if args.query:
+        businesses = data_manager.search(normalize(args.query), 'Name')
+    try:
+        count = export_file(businesses, args.file, args.format)
+    except BrokenPipeError:
+        raise
+    except OSError as e:
+        logger.error(str(e))
+        return 1
+    logger.info("Exported %d businesses to %s", count, args.file)
+    if args.file != '-':
+        print(json.dumps({'exported': count, 'file': args.file}))
+    return 0
+
+
+def command_stats(data_manager, args):
+    started = time.perf_counter()
+    businesses = load(data_manager)
+    load_seconds = time.perf_counter() - started
+    categories = Counter()
+    with_coordinates = 0
+    for business in businesses:
+        categories[business.get('Category', '')] += 1
+        if parse_coordinates(business) is not None:
+            with_coordinates += 1
+    journal = getattr(data_manager, 'journal_filename', None)
+    print(json.dumps({
+        'backend': args.backend,
+        'data': data_manager.filename,
+        'businesses': len(businesses),
+        'with_coordinates': with_coordinates,
+        'categories': len(categories),
+        'top_categories': categories.most_common(10),
+        'file_bytes': os.path.getsize(data_manager.filename) if os.path.exists(data_manager.filename) else 0,
+        'journal_bytes': os.path.getsize(journal) if journal and os.path.exists(journal) else 0,
+        'load_seconds': round(load_seconds, 3),
+        # 'snapshot' for a warm start, 'csv' for a cold one; None for backends without snapshots
+        'load_source': getattr(data_manager, 'load_source', None),
+    }))
+    return 0
+
+
+COMMANDS = {'query': command_query, 'near': command_near, 'import': command_import,
+            'export': command_export, 'stats': command_stats}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s: %(message)s", stream=sys.stderr)
+    start_metrics(args)
+    # Problems are logged to stderr instead of shown in message boxes
+    data_manager = create_data_manager(args.backend, args.data, LoggingReporter(logger))
+    try:
+        return COMMANDS[args.command](data_manager, args)
+    except DataLoadError as e:
+        logger.error("%s: %s", e.title, e)
+        return 1
+    except BrokenPipeError:
+        # e.g. piped into head; nothing is listening any more, so stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if metrics.enabled:
+            for filename in metrics.finish():
+                logger.info("Wrote %s", filename)
+            # Kept off stdout, which carries the results
+            print(json.dumps({'metrics': metrics.summary()}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
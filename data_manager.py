@@ -1,53 +1,575 @@
 import csv
+import gc
+import json
 import os
-from tkinter import messagebox
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from geo_index import GeoIndex
+from metrics import metrics
+from record_store import RecordStore
+from reporting import MessageBoxReporter
+from result_cache import ResultCache
+from search_engine import SearchEngine, normalize
+from snapshot import read_snapshot, remove_snapshot, write_snapshot
+from sort_index import OrderedResults, SortIndex
+
+# Columns of businesses.csv, in file order
+EXPECTED_HEADERS = ['ID', 'Name', 'Category', 'Address', 'Phone', 'Website', 'Hours', 'Description', 'Latitude', 'Longitude']
+# Backends selectable with create_data_manager()
+BACKENDS = ('csv', 'sqlite', 'http')
+
+# Rows parsed and stored per batch while loading the CSV
+LOAD_CHUNK_ROWS = 10000
+
+# Name the ID of a CSV row with a blank or repeated ID is derived from (with uuid5), given the
+# row's number; the same unchanged file always gets the same IDs, which the journal refers to
+GENERATED_ID_NAME = 'businesses.csv row {}'
+
+# The journal is compacted once it grows past this size, or past the size of the CSV itself
+COMPACT_MIN_BYTES = 1024 * 1024
+
+@contextmanager
+def gc_paused():
+    """Suspends the cyclic garbage collector while bulk-loading. Loading creates
+    millions of objects and no cycles, so every collection pass it would trigger
+    is wasted work."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+class DataLoadError(Exception):
+    """A critical error while loading; title is the heading for the error dialog."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+
 
 class DataManager:
-    def __init__(self, filename='businesses.csv'):
+    def __init__(self, filename='businesses.csv', reporter=None):
         self.filename = filename
+        # Where errors and warnings go: message boxes by default, a logger for the CLI
+        self.reporter = reporter if reporter is not None else MessageBoxReporter()
+        # Add/update/delete records are appended here instead of rewriting the CSV
+        self.journal_filename = filename + '.journal'
         # Define expected headers for robust loading and saving
-        self.expected_headers = ['ID', 'Name', 'Category', 'Address', 'Phone', 'Website', 'Hours', 'Description', 'Latitude', 'Longitude']
-
-    def load_business_data(self):
-        """Loads business data from a CSV file.
-        Returns a list of dictionaries, or None on critical error."""
-        businesses = []
-        if not os.path.exists(self.filename):
-            # Create an empty CSV with headers if it doesn't exist
+        self.expected_headers = list(EXPECTED_HEADERS)
+        # Rows as of the last load plus every change made through this manager
+        self.businesses = RecordStore(self.expected_headers)
+        # Inverted index over the stored rows, rebuilt on every load
+        self.search_engine = SearchEngine(self.businesses)
+        # Spatial index over Latitude/Longitude, maintained alongside the text index
+        self.geo_index = GeoIndex()
+        # Precomputed Name/Category orders, so sorting never re-sorts the whole result set
+        self.sort_index = SortIndex()
+        # Searches may run on a worker thread while the UI thread adds, edits or deletes
+        self.lock = threading.RLock()
+        # Held by whoever is writing the journal, so changes reach disk and memory in the same order
+        self.write_lock = threading.RLock()
+        # True while stream_business_data() is running; searches then only see part of the data
+        self.loading = False
+        # Non-critical problem found by the last load, e.g. missing columns
+        self.load_warning = None
+        # How the last load got its rows: 'snapshot' (warm start), 'csv' (cold start, full parse) or 'new'
+        self.load_source = None
+        # Wall-clock seconds the last load took, journal replay included
+        self.load_seconds = None
+        # Bumped on every change to the data; cached search results are only valid for one version
+        self.version = 0
+        self.result_cache = ResultCache()
+
+    def load_business_data(self, on_progress=None):
+        """Loads business data from the CSV file and replays the change journal on top of it.
+        Returns a RecordStore of the businesses, or None on critical error."""
+        try:
+            businesses = self.stream_business_data(on_progress)
+        except DataLoadError as e:
+            self.reporter.error(e.title, str(e))
+            return None # Indicate critical error
+        if self.load_warning:
+            self.reporter.warning("Warning", self.load_warning)
+        return businesses
+
+    def stream_business_data(self, on_progress=None):
+        """Loads the CSV chunk by chunk, making every chunk searchable as soon as it is parsed.
+
+        Safe to run on a background thread: each chunk is stored and indexed
+        under the lock, so searches issued meanwhile see the rows loaded so far
+        (self.loading is True until the journal has been replayed as well).
+        on_progress(bytes_read, total_bytes) is called after every chunk, on
+        the loading thread. Raises DataLoadError instead of going through the
+        reporter; a non-critical problem is left in self.load_warning.
+
+        If the CSV is unchanged since it was last parsed, the rows and indexes
+        come from its snapshot instead (see snapshot.py) in one step; after a
+        full parse a new snapshot is written for the next start."""
+        started = time.perf_counter()
+        businesses = RecordStore(self.expected_headers)
+        with self.lock:
+            self.loading = True
+            self.load_warning = None
+            self.businesses = businesses
+            self.search_engine = SearchEngine(businesses)
+            self.geo_index.build(())
+            self.sort_index.build(())
+            self._data_changed()
+        try:
+            with metrics.span('load', file=self.filename):
+                if not os.path.exists(self.filename):
+                    self._create_empty_file()
+                    self.load_source = 'new'
+                elif self._load_snapshot():
+                    businesses = self.businesses
+                    self.load_source = 'snapshot'
+                    if on_progress is not None:
+                        on_progress(1, 1)
+                else:
+                    source_stat = os.stat(self.filename)
+                    rows_read, generated = 0, 0
+                    for rows, bytes_read, total_bytes in self._read_chunks():
+
+                        def new_id(i, first_row=rows_read + 1):
+                            nonlocal generated
+                            generated += 1
+                            import uuid # Kept out of startup; only needed for such files
+                            return str(uuid.uuid5(uuid.NAMESPACE_OID, GENERATED_ID_NAME.format(first_row + i)))
+
+                        with self.lock, gc_paused():
+                            with metrics.span('load.store'):
+                                # Rows with a blank or repeated ID get their own, rather than being merged
+                                records = businesses.extend_values(rows, new_id)
+                            rows_read += len(rows)
+                            with metrics.span('load.index'):
+                                self.search_engine.extend([record.slot for record in records])
+                                for record in records:
+                                    self.geo_index.add(record)
+                                self.sort_index.extend(records)
+                            self._data_changed()
+                        metrics.count('load.rows', len(rows))
+                        if on_progress is not None:
+                            on_progress(bytes_read, total_bytes)
+                    if generated:
+                        warning = f"{generated} row(s) in '{self.filename}' had a blank or repeated ID and were given new IDs."
+                        self.load_warning = f"{self.load_warning} {warning}" if self.load_warning else warning
+                    self._save_snapshot(source_stat)
+                    self.load_source = 'csv'
+
+                try:
+                    with self.lock, metrics.span('load.journal'):
+                        changed_ids, changed_slots = self._replay_journal(businesses)
+                        self.search_engine.extend(changed_slots)
+                        for business_id, deleted in changed_ids.items():
+                            self._reindex(business_id, replace=deleted)
+                        self._data_changed()
+                except Exception as e:
+                    raise DataLoadError("Load Error", f"An error occurred while replaying '{self.journal_filename}': {e}") from e
+        finally:
+            self.loading = False
+        self.load_seconds = time.perf_counter() - started
+        return businesses
+
+    def _load_snapshot(self):
+        """Restores the parsed CSV and its indexes from the snapshot if it is still current.
+        Returns whether it did."""
+        gc.collect() # See gc.freeze() below
+        with metrics.span('load.snapshot'), gc_paused():
             try:
-                with open(self.filename, mode='w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(self.expected_headers)
-                return []
-            except Exception as e:
-                messagebox.showerror("File Creation Error", f"Could not create '{self.filename}': {e}")
-                return None # Indicate critical error
+                sections = read_snapshot(self.filename)
+                if sections is None:
+                    return False
+                businesses = RecordStore.from_snapshot(sections['store'])
+                if businesses.headers != tuple(self.expected_headers):
+                    return False
+                search_engine = SearchEngine.from_snapshot(sections['search_engine'], businesses)
+                geo_index = GeoIndex.from_snapshot(sections['geo_index'], businesses)
+                sort_index = SortIndex.from_snapshot(sections['sort_index'], businesses)
+                load_warning = sections['meta']['load_warning']
+            except Exception:
+                return False # A damaged or outdated snapshot only costs a full parse
+            with self.lock:
+                self.businesses = businesses
+                self.search_engine = search_engine
+                self.geo_index = geo_index
+                self.sort_index = sort_index
+                self.load_warning = load_warning
+                self._data_changed()
+            # Millions of long-lived objects just appeared at once, and the collector's first pass
+            # after gc_paused() would walk them all (over a second at 200k rows). Freezing moves
+            # them, and whatever survived the collect() above, out of its reach; they hold no
+            # reference cycles, so reference counting still frees them once they are replaced.
+            gc.freeze()
+        metrics.count('load.rows', len(self.businesses))
+        return True
+
+    def _save_snapshot(self, source_stat):
+        """Writes the snapshot of the CSV just parsed, before the journal is replayed on top.
 
+        Holds write_lock, so no change can happen halfway through, but not
+        lock: searches only read the store and indexes and keep running. A
+        failure only means the next start parses again."""
         try:
+            with self.write_lock, metrics.span('load.snapshot_write'):
+                write_snapshot(self.filename, {
+                    'meta': [('load_warning', self.load_warning)],
+                    'store': self.businesses.snapshot_items(),
+                    'search_engine': self.search_engine.snapshot_items(),
+                    'geo_index': self.geo_index.snapshot_items(self.businesses),
+                    'sort_index': self.sort_index.snapshot_items(self.businesses),
+                }, source_stat)
+        except Exception:
+            metrics.count('load.snapshot_errors')
+
+    def _create_empty_file(self):
+        """Creates an empty CSV with headers."""
+        try:
+            with open(self.filename, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(self.expected_headers)
+        except Exception as e:
+            raise DataLoadError("File Creation Error", f"Could not create '{self.filename}': {e}") from e
+
+    def _read_chunks(self):
+        """Yields (rows, bytes_read, total_bytes) for every LOAD_CHUNK_ROWS rows of the CSV,
+        each row being a list of values in expected_headers order."""
+        try:
+            total_bytes = os.path.getsize(self.filename)
             with open(self.filename, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
+                reader = csv.reader(file)
+                fieldnames = next(reader, [])
                 # Check for essential columns, but proceed if they are missing (data will be N/A)
-                if not all(col in reader.fieldnames for col in ['Name', 'Category', 'Address', 'Phone']):
-                    messagebox.showwarning("Warning", f"CSV file '{self.filename}' might be missing essential columns (Name, Category, Address, Phone).")
-                
-                for row in reader:
-                    # Fill missing expected headers with empty string to prevent KeyError later
-                    processed_row = {header: row.get(header, '') for header in self.expected_headers}
-                    businesses.append(processed_row)
+                if not all(col in fieldnames for col in ['Name', 'Category', 'Address', 'Phone']):
+                    self.load_warning = f"CSV file '{self.filename}' might be missing essential columns (Name, Category, Address, Phone)."
+
+                # Position of each expected header in the file; missing ones are filled with ''
+                positions = [fieldnames.index(header) if header in fieldnames else None
+                             for header in self.expected_headers]
+                in_order = positions == list(range(len(self.expected_headers)))
+                while True:
+                    with gc_paused(), metrics.span('load.parse'):
+                        chunk = list(islice(reader, LOAD_CHUNK_ROWS))
+                        rows = [
+                            row if in_order and len(row) >= len(positions)
+                            else [row[i] if i is not None and i < len(row) else '' for i in positions]
+                            for row in chunk
+                            if row # Blank lines are skipped, just like DictReader does
+                        ]
+                    if not chunk:
+                        break
+                    yield rows, file.buffer.tell(), total_bytes
         except Exception as e:
-            messagebox.showerror("Load Error", f"An error occurred while loading business data from '{self.filename}': {e}")
-            return None # Indicate critical error
-        return businesses
+            raise DataLoadError("Load Error", f"An error occurred while loading business data from '{self.filename}': {e}") from e
 
     def save_business_data(self, businesses_list):
-        """Saves current business data to the CSV file."""
+        """Saves the given business data to the CSV file and clears the journal.
+
+        The file is written to a temporary file first and then renamed over the
+        original, so a crash mid-write can never leave a truncated CSV."""
+        temp_filename = self.filename + '.tmp'
         try:
-            with open(self.filename, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=self.expected_headers)
-                writer.writeheader()
-                writer.writerows(businesses_list)
+            with metrics.span('save', file=self.filename):
+                with open(temp_filename, mode='w', newline='', encoding='utf-8') as file:
+                    writer = csv.DictWriter(file, fieldnames=self.expected_headers, extrasaction='ignore')
+                    writer.writeheader()
+                    writer.writerows(businesses_list)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_filename, self.filename)
+                # Every journaled change is now part of the CSV
+                if os.path.exists(self.journal_filename):
+                    os.remove(self.journal_filename)
+                # Outdated now; the next load parses the new CSV and writes a fresh one
+                remove_snapshot(self.filename)
             return True
         except Exception as e:
-            messagebox.showerror("Save Error", f"An error occurred while saving data to '{self.filename}': {e}")
+            self.reporter.error("Save Error", f"An error occurred while saving data to '{self.filename}': {e}")
+            return False
+
+    def compact(self):
+        """Folds the journal back into the CSV with an atomic rewrite."""
+        with self.write_lock, self.lock:
+            if self.loading:
+                return False # Only part of the CSV is in memory yet
+            return self.save_business_data(self.businesses)
+
+    def add_business(self, business):
+        """Adds a new business and records it in the journal."""
+        return self._report(self.apply_changes([('add', business)]))
+
+    def add_businesses(self, businesses):
+        """Adds many businesses at once, e.g. from a bulk import. Instead of journaling
+        every row, the CSV is rewritten once at the end."""
+        with self.write_lock, self.lock:
+            records = self.businesses.extend_values(
+                [[business.get(header) or '' for header in self.expected_headers] for business in businesses])
+            with gc_paused():
+                self.search_engine.extend([record.slot for record in records])
+                for record in records:
+                    self.geo_index.add(record)
+                self.sort_index.extend(records)
+            self._data_changed()
+            return self.compact()
+
+    def update_business(self, business):
+        """Replaces the fields of the business with the same ID and records the change in the journal."""
+        return self._report(self.apply_changes([('update', business)]))
+
+    def delete_business(self, business_id):
+        """Deletes the business with the given ID and records the deletion in the journal."""
+        return self._report(self.apply_changes([('delete', business_id)]))
+
+    def apply_changes(self, changes):
+        """Applies a batch of ('add', business), ('update', business) and ('delete', ID)
+        changes, in order, with a single journal write and fsync for all of them.
+
+        Returns one entry per change: None once it is applied and on disk, or a
+        (title, message) error, e.g. for updating an ID that does not exist.
+        Batches are written one at a time; searches running meanwhile only wait
+        for the in-memory part, never for the disk."""
+        errors, records = [], []
+        with self.write_lock:
+            with self.lock:
+                present = {} # IDs added or deleted earlier in this batch
+                for op, value in changes:
+                    if op == 'delete':
+                        business_id = value
+                        record = {'op': 'delete', 'id': business_id}
+                    elif op in ('add', 'update'):
+                        row = {header: value.get(header, '') for header in self.expected_headers}
+                        business_id = row['ID']
+                        record = {'op': op, 'row': row}
+                    else:
+                        raise ValueError(f"Unknown change '{op}'; expected add, update or delete")
+                    if op != 'add' and not present.get(business_id, business_id in self.businesses):
+                        verb = 'edit' if op == 'update' else 'delete'
+                        errors.append(("Error", f"Could not find business to {verb}."))
+                        continue
+                    present[business_id] = op != 'delete'
+                    errors.append(None)
+                    records.append(record)
+            if not records:
+                return errors
+            try:
+                self._append_journal(records)
+            except Exception as e:
+                error = ("Save Error", f"An error occurred while saving data to '{self.journal_filename}': {e}")
+                return [error if result is None else result for result in errors]
+            with self.lock:
+                for record in records:
+                    if record['op'] == 'delete':
+                        slot = self.businesses.slots[record['id']]
+                        self.businesses.delete(record['id']) # O(1): the slot just becomes a tombstone
+                        self.search_engine.refresh(slot)
+                        self._reindex(record['id'])
+                    else:
+                        # Adds and updates are upserts; views held by the UI see the new values immediately
+                        business = self.businesses.append(record['row'])
+                        self.search_engine.refresh(business.slot)
+                        self._reindex(business['ID'])
+                self._data_changed()
+            self._maybe_compact()
+        return errors
+
+    def _report(self, errors):
+        """Shows the error of a one-change batch, if any. Returns True if the change was applied."""
+        if errors[0] is not None:
+            self.reporter.error(*errors[0])
             return False
+        return True
+
+    def get_business(self, business_id):
+        """Returns the business with the given ID, or None."""
+        return self.businesses.get(business_id)
+
+    def search(self, query, sort_key='Name', reverse=False, near=None, radius_km=None, nearest=None):
+        """Returns the businesses whose Name, Category or Description contains query,
+        sorted case-insensitively by sort_key. Name and Category orders come back
+        as a lazily ordered sequence rather than a list.
+
+        near is an optional (lat, lon) point. With radius_km only businesses
+        within that many km of it are kept, with nearest only the closest
+        nearest businesses are kept, and sort_key 'Distance' orders the results
+        by distance from it (businesses without coordinates go last).
+
+        sort_key 'Relevance' ranks the matches by field-weighted BM25 and also
+        accepts misspelled words (see SearchEngine.relevance()); with an empty
+        query it falls back to sorting by Name.
+
+        Results are cached per data version (see ResultCache), so a repeated
+        search returns the same, already partly ordered sequence; treat
+        results as read-only."""
+        metrics.count('search.queries')
+        with self.lock:
+            key = (self.version, normalize(query), sort_key, reverse, near, radius_km, nearest)
+            results = self.result_cache.get(key)
+            if results is not None:
+                metrics.count('search.cache_hits')
+                return results
+            with metrics.span('search.match'):
+                ids, scores, distances, sort_key = self._match(query, sort_key, near, radius_km, nearest)
+            with metrics.span('search.sort', key=sort_key):
+                results = self._order(ids, scores, distances, sort_key, reverse, near)
+            self.result_cache.put(key, results)
+            return results
+
+    def _match(self, query, sort_key, near, radius_km, nearest):
+        """The matching half of search(): returns (ids, scores, distances, sort_key), where ids
+        is None for "every business", scores holds the relevance scores for sort_key
+        'Relevance' (else None) and sort_key falls back to 'Name' if there is nothing to rank by."""
+        scores = None
+        if sort_key == 'Relevance':
+            if normalize(query):
+                scores = self.search_engine.relevance(query)
+            else:
+                sort_key = 'Name' # Nothing to rank by
+        # None stands for "every business", so a pure location query never touches every row
+        if scores is not None:
+            ids = set(scores)
+        else:
+            ids = self._match_text(normalize(query)) if normalize(query) else None
+        distances = {}
+        if near is not None and radius_km is not None:
+            distances = self.geo_index.within(near[0], near[1], radius_km)
+            ids = set(distances) if ids is None else ids.intersection(distances)
+        if near is not None and nearest is not None:
+            closest = self.geo_index.nearest(near[0], near[1], nearest, allowed=ids)
+            distances = {business_id: distance for distance, business_id in closest}
+            ids = set(distances)
+        return ids, scores, distances, sort_key
+
+    def _match_text(self, query):
+        """SearchEngine.match_ids() through the result cache: a cached match set is reused
+        as is, and a query extending a cached one only re-checks that one's matches."""
+        ids = self.result_cache.matches(self.version, query)
+        if ids is None:
+            ids = self.search_engine.match_ids(query, self.result_cache.candidates(self.version, query))
+            self.result_cache.put_matches(self.version, query, ids)
+        return ids
+
+    def _order(self, ids, scores, distances, sort_key, reverse, near):
+        """The sorting half of search(). Name and Category orders are emitted lazily from
+        the precomputed sort index; the other keys sort the matches here."""
+        if sort_key in self.sort_index.fields:
+            # Emitted lazily in the precomputed order; the first page is a top-K selection
+            return OrderedResults(self.sort_index, self.businesses.get, sort_key, reverse, ids, self.lock)
+
+        results = self.search_engine.search('') if ids is None else self.search_engine.rows(ids)
+        if scores is not None:
+            # Best match first; equal scores stay in load order
+            return sorted(results, key=lambda b: -scores[b['ID']])
+        if sort_key == 'Distance':
+            if near is None:
+                sort_key = 'Name' # No reference point to measure from
+            else:
+                def distance_key(b):
+                    distance = distances.get(b['ID'])
+                    if distance is None:
+                        distance = self.geo_index.distance(b['ID'], near[0], near[1])
+                    return (distance is None, distance or 0.0)
+                return sorted(results, key=distance_key)
+        # Using .get() with a default empty string to handle missing keys gracefully
+        return sorted(results, key=lambda b: b.get(sort_key, '').lower(), reverse=reverse)
+
+    def _append_journal(self, records):
+        """Appends change records to the journal and forces them to disk with one fsync."""
+        with metrics.span('journal.append', records=len(records)):
+            with open(self.journal_filename, mode='a', encoding='utf-8') as file:
+                file.write(''.join(json.dumps(record) + '\n' for record in records))
+                file.flush()
+                os.fsync(file.fileno())
+        metrics.count('journal.records', len(records))
+
+    def _replay_journal(self, businesses):
+        """Applies the journaled changes, in order, to the store loaded from the CSV.
+
+        Replaying is idempotent (adds and updates are upserts, deleting a
+        missing ID is a no-op), so a crash between compaction's rename and
+        its journal removal is harmless. Only a final line without its
+        newline is taken as torn and dropped; a damaged record anywhere else
+        raises ValueError and the journal is left untouched, since the
+        records after it were acknowledged. Returns ({ID: deleted}, slots):
+        the IDs it touched, new rows ordered by when they were added, so they
+        are reindexed (and tie in sort order) just as they were added, and the
+        set of store slots written or deleted. deleted is True for IDs deleted
+        along the way: their index entries are stale even if they were added
+        again, since that made them new rows."""
+        changed_ids, changed_slots = {}, set()
+        if not os.path.exists(self.journal_filename):
+            return changed_ids, changed_slots
+
+        valid_bytes = 0
+        with open(self.journal_filename, mode='rb') as file:
+            for line_number, line in enumerate(file, 1):
+                if not line.endswith(b'\n'):
+                    # A torn final record from a crash mid-append; it was never acknowledged
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"damaged record on line {line_number}: {e}") from e
+                valid_bytes += len(line)
+                op = record.get('op')
+                if op in ('add', 'update'):
+                    business_id = record['row'].get('ID', '')
+                    if business_id not in businesses:
+                        # A new row goes after every row added before it
+                        changed_ids[business_id] = changed_ids.pop(business_id, False)
+                    changed_slots.add(businesses.append(record['row']).slot) # Upsert by ID
+                    changed_ids.setdefault(business_id, False)
+                elif op == 'delete':
+                    slot = businesses.slots.get(record.get('id'))
+                    if businesses.delete(record.get('id')):
+                        changed_slots.add(slot)
+                    changed_ids[record.get('id')] = True
+        if valid_bytes != os.path.getsize(self.journal_filename):
+            # Drop the torn tail so later appends start on a clean line
+            os.truncate(self.journal_filename, valid_bytes)
+        return changed_ids, changed_slots
+
+    def _data_changed(self):
+        """Starts a new data version, dropping every cached search result."""
+        self.version += 1
+        self.result_cache.clear()
+
+    def _reindex(self, business_id, replace=False):
+        """Brings the indexes keyed by ID up to date with the stored state of one business
+        (the search engine is keyed by slot and refreshed by the caller). With replace,
+        its old entries are dropped first, so it is indexed as a new row."""
+        record = self.businesses.get(business_id)
+        if record is None or replace:
+            self.geo_index.remove(business_id)
+            self.sort_index.remove(business_id)
+        if record is not None:
+            self.geo_index.add(record) # Adds are upserts in every index
+            self.sort_index.update(record)
+
+    def _maybe_compact(self):
+        """Compacts once the journal outgrows both COMPACT_MIN_BYTES and the CSV itself."""
+        try:
+            journal_size = os.path.getsize(self.journal_filename)
+            csv_size = os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+        except OSError:
+            return
+        if journal_size > max(COMPACT_MIN_BYTES, csv_size) and not self.loading:
+            self.compact()
+
 
+def create_data_manager(backend='csv', filename=None, reporter=None):
+    """Returns the DataManager for the named storage backend ('csv', 'sqlite', or 'http'
+    for a running server.py, with its URL as the filename)."""
+    if backend == 'sqlite':
+        from sqlite_manager import SQLiteDataManager # Imported lazily; only needed for this backend
+        return SQLiteDataManager(filename or 'businesses.db', reporter)
+    if backend == 'http':
+        from remote_data_manager import RemoteDataManager
+        return RemoteDataManager(filename or 'http://127.0.0.1:8765', reporter)
+    if backend == 'csv':
+        return DataManager(filename or 'businesses.csv', reporter)
+    raise ValueError(f"Unknown storage backend '{backend}'; expected one of {', '.join(BACKENDS)}")
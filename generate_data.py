@@ -0,0 +1,146 @@
+# generate_data.py
+import argparse
+import csv
+import random
+import uuid
+
+from data_manager import EXPECTED_HEADERS
+
+# Preset sizes for --rows
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# (category, relative frequency, name suffixes, description templates)
+CATEGORIES = [
+    ('Restaurant', 12, ('Restaurant', 'Bhojanalay', 'Kitchen', 'Dhaba'),
+     ('Popular local eatery serving {cuisine} cuisine.', 'Family restaurant known for its {cuisine} thali.')),
+    ('Grocery Store', 10, ('Kirana Store', 'Provisions', 'Supermarket', 'General Stores'),
+     ('Daily groceries, grains and household essentials.', 'Neighbourhood store with fresh vegetables and staples.')),
+    ('Cafe', 6, ('Cafe', 'Coffee House', 'Tea Stall'),
+     ('Cozy cafe offering coffee and snacks.', 'Quick bites, chai and fresh {cuisine} snacks.')),
+    ('Pharmacy', 6, ('Pharmacy', 'Medicals', 'Chemist'),
+     ('Well-stocked pharmacy with general medicines.', 'Medicines, first aid and health products.')),
+    ('Hotel', 4, ('Hotel', 'Residency', 'Inn', 'Resorts'),
+     ('Comfortable rooms close to {landmark}.', 'Budget stay with restaurant and parking.')),
+    ('Homestay', 3, ('Homestay', 'Cottages', 'Guest House'),
+     ('Homely stay with {cuisine} meals near {landmark}.',)),
+    ('Bakery', 4, ('Bakery', 'Bakers', 'Cake Shop'),
+     ('Fresh bread, cakes and biscuits baked daily.',)),
+    ('Hardware Store', 4, ('Hardware', 'Traders', 'Building Materials'),
+     ('Tools, paint, plumbing and electrical supplies.',)),
+    ('Electronics Store', 3, ('Electronics', 'Mobile Shop', 'Digital World'),
+     ('Mobiles, appliances and accessories with repair service.',)),
+    ('Clothing Store', 5, ('Garments', 'Cloth Centre', 'Fashions', 'Tailors'),
+     ('Sarees, readymade garments and tailoring.',)),
+    ('Bank', 2, ('Bank', 'Co-operative Bank', 'Credit Society'),
+     ('Branch with ATM, savings accounts and loans.',)),
+    ('Hospital', 2, ('Hospital', 'Clinic', 'Nursing Home'),
+     ('General physician, emergency care and diagnostics.',)),
+    ('School', 2, ('School', 'Vidyalaya', 'Academy'),
+     ('English and Marathi medium school.',)),
+    ('Beauty Salon', 3, ('Salon', 'Beauty Parlour', 'Hair Studio'),
+     ('Haircuts, beauty treatments and bridal makeup.',)),
+    ('Gym', 2, ('Gym', 'Fitness Centre'),
+     ('Weights, cardio and personal training.',)),
+    ('Car Rental', 1, ('Car Rentals', 'Travels', 'Cabs'),
+     ('Cars and taxis for local sightseeing and outstation trips.',)),
+    ('Seafood', 3, ('Fish Market', 'Seafood', 'Fisheries'),
+     ('Fresh catch of the day from {landmark}.',)),
+    ('Book Store', 1, ('Book Depot', 'Stationers', 'Books'),
+     ('Books, school supplies and stationery.',)),
+    ('Jewellery Shop', 1, ('Jewellers', 'Gold House'),
+     ('Gold and silver ornaments and custom designs.',)),
+    ('Courier Service', 1, ('Courier', 'Logistics'),
+     ('Domestic courier and parcel services.',)),
+]
+
+# (town, district, PIN code, latitude, longitude, relative size)
+TOWNS = [
+    ('Dapoli', 'Ratnagiri', '415712', 17.7590, 73.1860, 6),
+    ('Ratnagiri', 'Ratnagiri', '415612', 16.9902, 73.3120, 10),
+    ('Chiplun', 'Ratnagiri', '415605', 17.5321, 73.5154, 7),
+    ('Guhagar', 'Ratnagiri', '415703', 17.4860, 73.1930, 3),
+    ('Khed', 'Ratnagiri', '415709', 17.7186, 73.3961, 4),
+    ('Alibag', 'Raigad', '402201', 18.6414, 72.8722, 6),
+    ('Murud', 'Raigad', '402401', 18.3270, 72.9630, 3),
+    ('Mahad', 'Raigad', '402301', 18.0830, 73.4170, 4),
+    ('Sawantwadi', 'Sindhudurg', '416510', 15.9046, 73.8213, 4),
+    ('Malvan', 'Sindhudurg', '416606', 16.0600, 73.4700, 4),
+    ('Kudal', 'Sindhudurg', '416520', 16.0100, 73.6900, 3),
+    ('Pune', 'Pune', '411001', 18.5204, 73.8567, 30),
+    ('Mumbai', 'Mumbai', '400001', 19.0760, 72.8777, 40),
+    ('Kolhapur', 'Kolhapur', '416003', 16.7050, 74.2433, 12),
+    ('Satara', 'Satara', '415001', 17.6805, 74.0183, 8),
+]
+
+NAME_PREFIXES = ('Konkan', 'Sai', 'Shree', 'Ganesh', 'Sea Breeze', 'Coastal', 'Sahyadri', 'Green', 'New',
+                 'Royal', 'Laxmi', 'Om', 'Mauli', 'Swami', 'Jai Malhar', 'Tulsi', 'Sagar', 'Anand', 'Kokan Kinara',
+                 'Vishwas', 'Samarth', 'Shivneri', 'Prakash', 'Golden', 'Hill View', 'Riverside', 'Gurukrupa')
+STREETS = ('Main Road', 'Station Road', 'Market Yard', 'Bus Stand Road', 'Beach Road', 'Temple Lane', 'MG Road',
+           'Shivaji Chowk', 'College Road', 'Near Bus Stand', 'Bazaar Peth', 'Highway Junction', 'Fort Road')
+CUISINES = ('Konkani', 'Malvani', 'Maharashtrian', 'South Indian', 'Punjabi', 'seafood', 'vegetarian')
+LANDMARKS = ('the beach', 'the fort', 'the bus stand', 'the temple', 'the market', 'the river', 'the university')
+HOURS = ('Mon-Sun: 10AM-10PM', 'Mon-Sat: 9AM-9PM', '24 Hours', 'Tue-Sun: 11AM-7PM', 'Mon-Sat: 8AM-8PM',
+         'Mon-Sun: 7AM-11AM, 5PM-10PM')
+# Share of rows without coordinates, with coordinates that keep trailing zeros, and without a website
+MISSING_COORDINATES = 0.02
+PADDED_COORDINATES = 0.3
+NO_WEBSITE = 0.6
+
+
+def parse_rows(value):
+    """Accepts a row count or one of the SIZES presets (10k, 100k, 1m)."""
+    return SIZES.get(value.lower()) or int(value)
+
+
+def generate_businesses(rows, seed=0):
+    """Yields row dicts shaped like businesses.csv, reproducibly for a given seed."""
+    rng = random.Random(seed)
+    category_weights = [category[1] for category in CATEGORIES]
+    town_weights = [town[5] for town in TOWNS]
+    for _ in range(rows):
+        category, _, suffixes, descriptions = rng.choices(CATEGORIES, category_weights)[0]
+        town, district, pin, town_lat, town_lon, _ = rng.choices(TOWNS, town_weights)[0]
+        name = f"{rng.choice(NAME_PREFIXES)} {rng.choice(suffixes)}"
+        if rng.random() < 0.3:
+            name = f"{town} {name}" # e.g. "Dapoli Sai Bakery"
+        latitude = longitude = ''
+        if rng.random() >= MISSING_COORDINATES:
+            # Businesses cluster around the town centre, thinning out over a few km
+            lat, lon = rng.gauss(town_lat, 0.03), rng.gauss(town_lon, 0.03)
+            if rng.random() < PADDED_COORDINATES:
+                latitude, longitude = f"{lat:.4f}", f"{lon:.4f}" # Hand-entered style, e.g. "17.7500"
+            else:
+                latitude, longitude = str(round(lat, 6)), str(round(lon, 6))
+        slug = ''.join(ch for ch in name.lower() if ch.isalnum())
+        yield {
+            'ID': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'Name': name,
+            'Category': category,
+            'Address': f"{rng.randint(1, 250)} {rng.choice(STREETS)} {town} {district} Maharashtra {pin}",
+            'Phone': str(rng.randint(6_000_000_000, 9_999_999_999)),
+            'Website': 'N/A' if rng.random() < NO_WEBSITE else f"http://{slug}.com",
+            'Hours': rng.choice(HOURS),
+            'Description': rng.choice(descriptions).format(cuisine=rng.choice(CUISINES), landmark=rng.choice(LANDMARKS)),
+            'Latitude': latitude,
+            'Longitude': longitude,
+        }
+
+
+def write_csv(filename, rows, seed=0):
+    """Writes a synthetic directory of the given size to filename. Returns the row count."""
+    with open(filename, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        writer.writerows(generate_businesses(rows, seed))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic businesses.csv for testing and benchmarks.")
+    parser.add_argument('rows', type=parse_rows, help="number of rows, or 10k, 100k or 1m")
+    parser.add_argument('-o', '--output', help="CSV file to write (default: businesses_<rows>.csv)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed; the same seed gives the same file")
+    args = parser.parse_args()
+    output = args.output or f"businesses_{args.rows}.csv"
+    write_csv(output, args.rows, args.seed)
+    print(f"Wrote {args.rows} businesses to {output}")
@@ -0,0 +1,203 @@
+# geo_index.py
+import heapq
+import math
+import re
+
+from record_store import BusinessRecord
+from snapshot import decode_ids, encode_ids, parts_of
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Size of one grid cell in degrees (about 5.5 km north-south)
+CELL_DEGREES = 0.05
+
+# "<text> within 2 km" or "<text> nearest 5" at the end of a search query
+GEO_QUERY_PATTERN = re.compile(
+    r'^(?P<text>.*?)\s*\b(?:within\s+(?P<radius>\d+(?:\.\d+)?)\s*km|nearest\s+(?P<count>\d+))\s*$',
+    re.IGNORECASE)
+
+
+def parse_coordinates(business):
+    """Returns (latitude, longitude) as floats, or None when either is blank or malformed.
+    Rows of a RecordStore hand over the floats parsed when they were stored."""
+    if isinstance(business, BusinessRecord):
+        lat, lon = business.point()
+    else:
+        try:
+            lat = float(business.get('Latitude') or '')
+            lon = float(business.get('Longitude') or '')
+        except (TypeError, ValueError):
+            return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None # Also rejects nan and inf
+    return lat, lon
+
+
+def parse_point(text):
+    """Parses a "lat, lon" string typed by the user. Returns None if it is not a valid point."""
+    parts = (text or '').replace(',', ' ').split()
+    if len(parts) != 2:
+        return None
+    return parse_coordinates({'Latitude': parts[0], 'Longitude': parts[1]})
+
+
+def parse_geo_query(query):
+    """Splits a trailing "within R km" or "nearest N" clause off a search query.
+    Returns (text, radius_km, count); radius_km and count are None when absent."""
+    match = GEO_QUERY_PATTERN.match(query or '')
+    if not match:
+        return query, None, None
+    radius = float(match.group('radius')) if match.group('radius') else None
+    count = int(match.group('count')) if match.group('count') else None
+    return match.group('text'), radius, count
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """Returns the (min_lat, max_lat, min_lon, max_lon) boxes that together cover
+    every point within radius_km of (lat, lon). The box is split in two when it
+    crosses the antimeridian."""
+    dlat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    # Longitude degrees shrink towards the poles, so use the widest latitude in the band
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 90 or radius_km >= math.pi * EARTH_RADIUS_KM / 2:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    dlon = radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+    if dlon >= 180:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return [(min_lat, max_lat, min_lon + 360, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
+
+
+class GeoIndex:
+    """Grid index over business coordinates for radius and nearest-N queries.
+
+    Points are bucketed into CELL_DEGREES-sized cells, so a radius query only
+    visits the cells overlapping the circle's bounding box. Nearest-N widens
+    the radius until enough points are inside it. Rows whose Latitude or
+    Longitude is blank or malformed are simply not indexed."""
+
+    def __init__(self, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._cells = {}  # (row, col) -> set of business IDs
+        self._points = {} # business ID -> (lat, lon)
+
+    def __len__(self):
+        return len(self._points)
+
+    def build(self, businesses):
+        """Discards the current index and indexes every business in the list."""
+        self._cells = {}
+        self._points = {}
+        for business in businesses:
+            self.add(business)
+
+    def add(self, business):
+        """Indexes a business's coordinates, replacing any previous position."""
+        business_id = business.get('ID', '')
+        self.remove(business_id)
+        point = parse_coordinates(business)
+        if point is None:
+            return
+        self._points[business_id] = point
+        self._cells.setdefault(self._cell(*point), set()).add(business_id)
+
+    def snapshot_items(self, store):
+        """Yields (key, value) pairs of plain values describing the index, for snapshot.py;
+        businesses are referred to by their slot in store, the RecordStore holding them."""
+        slots = store.slots
+        yield 'cell_degrees', self.cell_degrees
+        for part in parts_of((cell, encode_ids(ids, slots)) for cell, ids in self._cells.items()):
+            yield 'cells', part
+        for part in parts_of((slots[business_id], point) for business_id, point in self._points.items()):
+            yield 'points', part
+
+    @classmethod
+    def from_snapshot(cls, state, store):
+        """Rebuilds an index of the businesses in store from snapshot_items()."""
+        ids = store.ids
+        index = cls(state['cell_degrees'])
+        index._cells = {cell: set(decode_ids(data, ids)) for cell, data in state.get('cells', {}).items()}
+        index._points = {ids[slot]: point for slot, point in state.get('points', {}).items()}
+        return index
+
+    def update(self, business):
+        """Re-indexes a business after its coordinates may have changed."""
+        self.add(business)
+
+    def remove(self, business_id):
+        """Drops a business from the index. Unknown IDs are ignored."""
+        point = self._points.pop(business_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        ids = self._cells[cell]
+        ids.discard(business_id)
+        if not ids:
+            del self._cells[cell]
+
+    def distance(self, business_id, lat, lon):
+        """Distance in km from (lat, lon) to a business, or None if it has no coordinates."""
+        point = self._points.get(business_id)
+        if point is None:
+            return None
+        return haversine_km(lat, lon, *point)
+
+    def within(self, lat, lon, radius_km):
+        """Returns {business ID: distance_km} for every business within radius_km."""
+        results = {}
+        for min_lat, max_lat, min_lon, max_lon in bounding_boxes(lat, lon, radius_km):
+            for business_id in self._ids_in_box(min_lat, max_lat, min_lon, max_lon):
+                distance = haversine_km(lat, lon, *self._points[business_id])
+                if distance <= radius_km:
+                    results[business_id] = distance
+        return results
+
+    def nearest(self, lat, lon, count, allowed=None):
+        """Returns [(distance_km, business ID)] for the count nearest businesses,
+        optionally restricted to the IDs in allowed."""
+        if count <= 0 or not self._points:
+            return []
+        if allowed is not None and len(allowed) * 8 < len(self._points):
+            # A small candidate set (e.g. from a text query) is cheaper to rank directly
+            distances = ((self.distance(business_id, lat, lon), business_id) for business_id in allowed)
+            return heapq.nsmallest(count, ((d, i) for d, i in distances if d is not None))
+
+        radius = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            found = self.within(lat, lon, radius)
+            if allowed is not None:
+                found = {i: d for i, d in found.items() if i in allowed}
+            # Everything within the radius has been seen, so the closest count of them are exact
+            if len(found) >= count or radius >= math.pi * EARTH_RADIUS_KM:
+                return heapq.nsmallest(count, ((d, i) for i, d in found.items()))
+            radius *= 2
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _ids_in_box(self, min_lat, max_lat, min_lon, max_lon):
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+            # The box covers more cells than are occupied; walk the occupied ones instead
+            for (row, col), ids in self._cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    yield from ids
+            return
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                yield from self._cells.get((row, col), ())
@@ -0,0 +1,144 @@
+# load_test.py
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import quote, urlencode, urlsplit
+
+from metrics import summarize
+
+# Search texts sent by the load test, a mix of common, rare, short and misspelled words
+QUERIES = ('restaurant', 'cafe', 'pharmacy', 'konkan', 'dapoli', 'bakery', 'ph', 'sai', 'jewellers',
+           'hotel', 'pharmcy', '')
+SORTS = ('Name', 'Category', 'Relevance')
+# Reference point for nearby requests (Dapoli)
+NEAR_POINT = '17.7590, 73.1860'
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection to the service."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        """Sends a request and returns (status, decoded JSON body)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n\r\n"
+                          .encode('latin-1') + body)
+        await self.writer.drain()
+        status_line, *header_lines = (await self.reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        length = 0
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        return int(status_line.split(' ')[1]), json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def next_request(rng, ids, write_ratio):
+    """Picks the next (method, path, payload): mostly searches, some nearby and get requests,
+    and updates (rewriting a business with its own values) at write_ratio."""
+    roll = rng.random()
+    if ids and roll < write_ratio:
+        return 'PUT', None, rng.choice(ids) # Filled in by the client: it needs the current fields
+    roll = rng.random()
+    if roll < 0.7:
+        params = {'q': rng.choice(QUERIES), 'sort': rng.choice(SORTS), 'limit': 100}
+        return 'GET', '/search?' + urlencode(params), None
+    if roll < 0.85:
+        params = {'near': NEAR_POINT, 'nearest': rng.choice((5, 20, 100)), 'q': rng.choice(QUERIES[:6])}
+        return 'GET', '/nearby?' + urlencode(params), None
+    if ids:
+        return 'GET', '/businesses/' + quote(rng.choice(ids), safe=''), None
+    return 'GET', '/search?' + urlencode({'q': rng.choice(QUERIES)}), None
+
+
+async def client(host, port, deadline, ids, write_ratio, seed, latencies, errors):
+    """Sends requests back to back on one connection until the deadline."""
+    rng = random.Random(seed)
+    connection = Connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            method, path, payload = next_request(rng, ids, write_ratio)
+            started = time.perf_counter()
+            try:
+                if method == 'PUT':
+                    business_id = payload
+                    path = '/businesses/' + quote(business_id, safe='')
+                    status, business = await connection.request('GET', path)
+                    if status == 200:
+                        status, _ = await connection.request('PUT', path, business)
+                else:
+                    status, _ = await connection.request(method, path, payload)
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                errors.append(f"{method} {path}: {e}")
+                connection.close()
+                connection = Connection(host, port)
+                continue
+            latencies.setdefault(method, []).append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(f"{method} {path}: HTTP {status}")
+    finally:
+        connection.close()
+
+
+async def run(url, concurrency, duration, write_ratio, seed):
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    # A sample of real IDs for get and update requests
+    probe = Connection(host, port)
+    status, reply = await probe.request('GET', '/search?' + urlencode({'q': '', 'limit': 1000}))
+    probe.close()
+    if status != 200:
+        raise RuntimeError(f"{url} answered HTTP {status}: {reply}")
+    ids = [business['ID'] for business in reply['results']]
+
+    latencies, errors = {}, []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(client(host, port, deadline, ids, write_ratio, seed + i, latencies, errors)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    every = [seconds for samples in latencies.values() for seconds in samples]
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'requests': len(every),
+        'errors': len(errors),
+        'rps': round(len(every) / elapsed, 1),
+        'latency': summarize(every) if every else None,
+        'by_method': {method: summarize(samples) for method, samples in latencies.items()},
+        'first_errors': errors[:5],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running server.py and report requests per second and latency.")
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help="service to test (default: http://127.0.0.1:8765)")
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help="simultaneous connections (default: 16)")
+    parser.add_argument('-d', '--duration', type=float, default=10, help="seconds to run for (default: 10)")
+    parser.add_argument('--write-ratio', type=float, default=0.0,
+                        help="share of requests that update a business with its own values (default: 0); "
+                             "these are real writes to the service's data file")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.url, args.concurrency, args.duration, args.write_ratio, args.seed))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    sys.exit(1 if report['errors'] else 0)
@@ -0,0 +1,59 @@
+# load_worker.py
+import queue
+import threading
+
+# How often the Tk thread checks on the loader, in milliseconds
+LOAD_POLL_INTERVAL_MS = 100
+
+class LoadWorker:
+    """Runs a data manager's stream_business_data() on a background thread.
+
+    The loader thread only queues events; progress, completion and errors
+    are delivered on the Tk thread by polling with master.after(), the same
+    way SearchWorker hands back search results. on_progress is called with
+    (bytes_read, total_bytes), on_done with the loaded businesses and
+    on_error with the exception that stopped the load."""
+
+    def __init__(self, master, load_function, on_progress, on_done, on_error):
+        self.master = master
+        self.load_function = load_function
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self._events = queue.Queue() # ('progress' | 'done' | 'error', payload)
+        self._thread = threading.Thread(target=self._run, name="data-loader", daemon=True)
+
+    def start(self):
+        """Starts loading. Must be called from the Tk thread."""
+        self._thread.start()
+        self.master.after(LOAD_POLL_INTERVAL_MS, self._poll)
+
+    def _run(self):
+        try:
+            businesses = self.load_function(lambda *progress: self._events.put(('progress', progress)))
+        except Exception as e:
+            self._events.put(('error', e))
+        else:
+            self._events.put(('done', businesses))
+
+    def _poll(self):
+        """Delivers queued events on the Tk thread; keeps polling until the load has ended."""
+        progress = None
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                progress = payload # Only the latest progress is worth drawing
+                continue
+            if progress is not None:
+                self.on_progress(*progress)
+            if kind == 'done':
+                self.on_done(payload)
+            else:
+                self.on_error(payload)
+            return
+        if progress is not None:
+            self.on_progress(*progress)
+        self.master.after(LOAD_POLL_INTERVAL_MS, self._poll)
@@ -1,13 +1,42 @@
+import argparse
 import tkinter as tk
 from business_app import BusinessSearchApp # Import the main application class
+from cli import add_metrics_arguments, start_metrics, storage_settings # settings.ini is shared with the headless CLI
+from data_manager import BACKENDS, create_data_manager
+from metrics import metrics
+
+def parse_args():
+    """Reads the storage settings from settings.ini and the command line."""
+    storage = storage_settings()
+
+    parser = argparse.ArgumentParser(description="Local Business Search Engine")
+    parser.add_argument('--backend', choices=BACKENDS, default=storage.get('backend', 'csv'),
+                        help="storage backend to use (default: csv)")
+    parser.add_argument('--data', default=storage.get('data'),
+                        help="data file, or the URL of a running server.py for --backend http (default: businesses.csv or businesses.db)")
+    parser.add_argument('--migrate-from', metavar='CSV',
+                        help="import this CSV into the SQLite database before starting")
+    add_metrics_arguments(parser)
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
+    start_metrics(args)
+
     # Create the main Tkinter window
     root = tk.Tk()
     
+    if args.migrate_from:
+        from sqlite_manager import migrate_from_csv
+        args.backend = 'sqlite'
+        migrate_from_csv(args.migrate_from, args.data or 'businesses.db')
+
     # Instantiate and run the BusinessSearchApp
     # The BusinessSearchApp class handles all UI and logic orchestration
-    app = BusinessSearchApp(root)
+    app = BusinessSearchApp(root, create_data_manager(args.backend, args.data))
     
     # Start the Tkinter event loop
     root.mainloop()
+
+    # Trace and profile files, if asked for, are written once the window is closed
+    metrics.finish()
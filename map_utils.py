@@ -1,4 +1,3 @@
-import webbrowser
 from tkinter import messagebox
 
 def show_on_map(name, address, status_bar=None):
@@ -13,6 +12,7 @@ def show_on_map(name, address, status_bar=None):
     query_string = f"{name} {address}".strip()
     map_url = f"https://www.google.com/maps/search/?api=1&query={query_string.replace(' ', '+')}"
     try:
+        import webbrowser # Slow to import; only needed once a map is opened
         webbrowser.open_new_tab(map_url)
         if status_bar:
             status_bar.config(text=f"Opening map for {name} at {address}...")
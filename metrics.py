@@ -0,0 +1,181 @@
+# metrics.py
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# Durations kept per span name for the percentiles; older ones are dropped
+HISTOGRAM_SAMPLES = 10000
+# Trace events kept for the Chrome trace; older ones are dropped
+MAX_TRACE_EVENTS = 200000
+# Setting this environment variable (e.g. LOCALSEARCH_METRICS=1) turns instrumentation on at startup
+ENV_VAR = 'LOCALSEARCH_METRICS'
+# Latency percentiles reported by summarize()
+PERCENTILES = (50, 90, 99)
+
+
+class _NullSpan:
+    """What span() returns while instrumentation is off: entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'args', 'started')
+
+    def __init__(self, metrics, name, args):
+        self.metrics = metrics
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics._record(self.name, self.started, time.perf_counter(), self.args)
+        return False
+
+
+def _percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, min(len(ordered) - 1, -(-pct * len(ordered) // 100) - 1))]
+
+
+def summarize(samples):
+    """Latency percentiles of durations (in seconds) as a dict of milliseconds; used by
+    benchmark.py and load_test.py."""
+    ordered = sorted(samples)
+    summary = {f'p{pct}_ms': round(_percentile(ordered, pct) * 1000, 3) for pct in PERCENTILES}
+    summary['max_ms'] = round(ordered[-1] * 1000, 3)
+    summary['runs'] = len(ordered)
+    return summary
+
+
+class Metrics:
+    """Timing spans, counters and duration histograms for the hot paths.
+
+    Off by default. While off, span() hands back one shared no-op context
+    manager and count() returns straight away, so the spans left around
+    load, search, render and save cost a method call each, never anything
+    per row. While on, every span adds its duration to a histogram and an
+    event to a Chrome trace, and can be written out with finish(). Safe to
+    use from the loading and search threads as well as the Tk thread."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.trace_file = None
+        self.profile_file = None
+        self._profiler = None
+        self.reset()
+
+    def reset(self):
+        """Forgets everything recorded so far."""
+        with self.lock:
+            self.counters = defaultdict(int)
+            self.histograms = defaultdict(lambda: deque(maxlen=HISTOGRAM_SAMPLES))
+            self.totals = defaultdict(lambda: [0, 0.0]) # name -> [count, seconds], over every span
+            self.last = {} # name -> seconds taken by the most recent span
+            self.trace_events = deque(maxlen=MAX_TRACE_EVENTS)
+            self._origin = time.perf_counter()
+
+    def span(self, name, **args):
+        """Context manager timing the code inside it under name, e.g. 'search.match'.
+        args are attached to the trace event."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, amount=1):
+        """Adds amount to the counter called name."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += amount
+
+    def _record(self, name, started, ended, args):
+        seconds = ended - started
+        event = {'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': os.getpid(),
+                 'tid': threading.get_native_id(),
+                 'ts': round((started - self._origin) * 1e6, 1), 'dur': round(seconds * 1e6, 1)}
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.histograms[name].append(seconds)
+            totals = self.totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+            self.last[name] = seconds
+            self.trace_events.append(event)
+
+    def breakdown(self, names):
+        """Short text with the latest duration of each named span, e.g.
+        'match 3.1 ms, sort 0.2 ms'; spans that never ran are left out."""
+        with self.lock:
+            parts = [f"{name.rsplit('.', 1)[-1]} {self.last[name] * 1000:.1f} ms"
+                     for name in names if name in self.last]
+        return ', '.join(parts)
+
+    def summary(self):
+        """Counters and per-span duration statistics (in ms) as a JSON-ready dict."""
+        with self.lock:
+            spans = {}
+            for name, samples in self.histograms.items():
+                ordered = sorted(samples)
+                count, seconds = self.totals[name]
+                spans[name] = {
+                    'count': count,
+                    'total_ms': round(seconds * 1000, 3),
+                    'mean_ms': round(seconds * 1000 / count, 3),
+                    'p50_ms': round(_percentile(ordered, 50) * 1000, 3),
+                    'p90_ms': round(_percentile(ordered, 90) * 1000, 3),
+                    'p99_ms': round(_percentile(ordered, 99) * 1000, 3),
+                    'max_ms': round(ordered[-1] * 1000, 3),
+                }
+            return {'counters': dict(self.counters), 'spans': spans}
+
+    def start(self, trace_file=None, profile_file=None):
+        """Turns instrumentation on. On finish(), the spans are written to trace_file as
+        Chrome-trace JSON (open it in chrome://tracing or ui.perfetto.dev) and, if
+        profile_file is given, cProfile stats to it (read them with python -m pstats).
+        cProfile only sees the thread that called start()."""
+        self.enabled = True
+        self.trace_file = trace_file
+        self.profile_file = profile_file
+        if profile_file and self._profiler is None:
+            import cProfile # Only needed when profiling
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def finish(self):
+        """Writes the trace and profile files asked for in start(). Returns the files written."""
+        written = []
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_file)
+            self._profiler = None
+            written.append(self.profile_file)
+        if self.trace_file:
+            self.write_trace(self.trace_file)
+            written.append(self.trace_file)
+        return written
+
+    def write_trace(self, filename):
+        """Writes every recorded span as Chrome-trace JSON, with the summary alongside."""
+        with self.lock:
+            events = list(self.trace_events)
+        with open(filename, mode='w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}, file)
+
+
+# The instance the rest of the app records into
+metrics = Metrics(enabled=bool(os.environ.get(ENV_VAR)))
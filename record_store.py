@@ -0,0 +1,295 @@
+# record_store.py
+import math
+import sys
+from array import array
+from collections.abc import Mapping
+from itertools import compress
+
+# Columns with few distinct values, stored as interned strings
+INTERNED_FIELDS = ('Category',)
+# Columns parsed once into float arrays (NaN when blank)
+COORDINATE_FIELDS = ('Latitude', 'Longitude')
+
+
+class BusinessRecord(Mapping):
+    """Read-only, dict-like view of one row in a RecordStore.
+
+    Supports everything the UI and DataManager do with a business dict
+    (get(), [], iteration, dict(record)) while the data itself stays in the
+    store's columns. Views always show the row's current values."""
+
+    __slots__ = ('_store', '_slot')
+
+    def __init__(self, store, slot):
+        self._store = store
+        self._slot = slot
+
+    def __getitem__(self, field):
+        return self._store.value(self._slot, field)
+
+    def get(self, field, default=None):
+        # Overridden for speed: indexing calls this for every field of every row
+        column = self._store._columns.get(field)
+        if column is not None:
+            return column[self._slot]
+        try:
+            return self._store.value(self._slot, field)
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        return iter(self._store.headers)
+
+    def __len__(self):
+        return len(self._store.headers)
+
+    @property
+    def slot(self):
+        """Where the row lies in its store; indexes refer to rows by this number."""
+        return self._slot
+
+    def point(self):
+        """(Latitude, Longitude) as the floats parsed when the row was stored; see RecordStore.point()."""
+        return self._store.point(self._slot)
+
+    def __repr__(self):
+        return f"BusinessRecord({dict(self)!r})"
+
+
+class RecordStore:
+    """Column-oriented in-memory store for businesses with O(1) access by ID.
+
+    Each text column is one list of strings indexed by slot, Category values
+    are interned, and Latitude/Longitude are parsed once into float arrays.
+    Deleting a business only marks its slot as a tombstone, so lookup, update
+    and delete by ID are all O(1). Iteration yields BusinessRecord views in
+    insertion order, skipping deleted slots."""
+
+    def __init__(self, headers):
+        self.headers = tuple(headers)
+        self._columns = {field: [] for field in self.headers if field not in COORDINATE_FIELDS}
+        self._coordinates = {field: array('d') for field in COORDINATE_FIELDS if field in self.headers}
+        # Original text of coordinates that a float cannot reproduce exactly (e.g. "73.1800" or "abc")
+        self._coordinate_text = {field: {} for field in self._coordinates}
+        self._live = bytearray() # 1 for live slots, 0 for tombstones
+        self._slot_by_id = {}
+        # (position in a values list, field, column) for fast row appends
+        self._text_layout = [(i, field, self._columns[field]) for i, field in enumerate(self.headers)
+                             if field in self._columns]
+        self._coordinate_layout = [(i, field, self._coordinates[field]) for i, field in enumerate(self.headers)
+                                   if field in self._coordinates]
+        self._id_position = self.headers.index('ID')
+
+    def __len__(self):
+        return len(self._slot_by_id)
+
+    def __bool__(self):
+        return bool(self._slot_by_id)
+
+    def __iter__(self):
+        live = self._live
+        for slot in range(len(live)):
+            if live[slot]:
+                yield BusinessRecord(self, slot)
+
+    def items(self):
+        """Yields (ID, view) pairs of the live rows, in insertion order."""
+        for business_id, slot in self._slot_by_id.items():
+            yield business_id, BusinessRecord(self, slot)
+
+    def __contains__(self, business_id):
+        return business_id in self._slot_by_id
+
+    @property
+    def tombstones(self):
+        """Number of deleted slots still held in memory."""
+        return len(self._live) - len(self._slot_by_id)
+
+    def get(self, business_id):
+        """Returns a view of the business with the given ID, or None."""
+        slot = self._slot_by_id.get(business_id)
+        return None if slot is None else BusinessRecord(self, slot)
+
+    def row(self, slot):
+        """Returns a view of the row in slot, or None if the slot is a tombstone."""
+        return BusinessRecord(self, slot) if self._live[slot] else None
+
+    def append(self, business):
+        """Stores a business mapping and returns its view. An existing ID is updated instead."""
+        return self.append_values([business.get(field, '') for field in self.headers])
+
+    def append_values(self, values):
+        """Like append(), but takes the field values in header order (e.g. a parsed CSV row)."""
+        business_id = values[self._id_position]
+        slot = self._slot_by_id.get(business_id)
+        if slot is not None:
+            self._write(slot, values)
+            return BusinessRecord(self, slot)
+        slot = len(self._live)
+        for i, field, column in self._text_layout:
+            value = values[i] or ''
+            column.append(sys.intern(value) if field in INTERNED_FIELDS else value)
+        for i, field, column in self._coordinate_layout:
+            column.append(self._coordinate(field, slot, values[i]))
+        self._live.append(1)
+        self._slot_by_id[business_id] = slot
+        return BusinessRecord(self, slot)
+
+    def extend_values(self, rows, new_id=None):
+        """Bulk append_values() for loading: appends a batch of value lists column by column.
+
+        A row whose ID is already stored updates that row. If new_id is given,
+        such rows, and rows with a blank ID, are stored as new rows instead,
+        under the ID new_id(i) returns for the row at index i of rows (which is
+        written into the row). Returns the views of the stored rows, in order."""
+        rows = rows if isinstance(rows, list) else list(rows)
+        ids = [row[self._id_position] for row in rows]
+        if ((new_id is not None and not all(ids)) or len(set(ids)) != len(ids)
+                or not self._slot_by_id.keys().isdisjoint(ids)):
+            if new_id is None:
+                # Duplicate IDs need upsert semantics, which the row-at-a-time path provides
+                return [self.append_values(row) for row in rows]
+            ids = self._unique_ids(rows, ids, new_id)
+        start = len(self._live)
+        for i, field, column in self._text_layout:
+            values = [row[i] or '' for row in rows]
+            column.extend(map(sys.intern, values) if field in INTERNED_FIELDS else values)
+        for i, field, column in self._coordinate_layout:
+            self._extend_coordinates(field, column, start, [row[i] for row in rows])
+        self._live.extend(b'\x01' * len(rows))
+        self._slot_by_id.update(zip(ids, range(start, start + len(rows))))
+        return [BusinessRecord(self, slot) for slot in range(start, start + len(rows))]
+
+    def _unique_ids(self, rows, ids, new_id):
+        seen = set()
+        for i, row in enumerate(rows):
+            business_id = ids[i]
+            if not business_id or business_id in seen or business_id in self._slot_by_id:
+                business_id = new_id(i)
+                if business_id in seen or business_id in self._slot_by_id:
+                    raise ValueError(f"generated ID '{business_id}' is already in use")
+            row[self._id_position] = ids[i] = business_id
+            seen.add(business_id)
+        return ids
+
+    @property
+    def slots(self):
+        """The ID -> slot dict of the live rows; snapshots refer to businesses by slot. Read-only."""
+        return self._slot_by_id
+
+    @property
+    def ids(self):
+        """The ID stored in every slot, tombstones included. Read-only."""
+        return self._columns['ID']
+
+    def snapshot_items(self):
+        """Yields (key, value) pairs of plain values describing the store, for snapshot.py;
+        from_snapshot() rebuilds it from them."""
+        yield 'headers', list(self.headers)
+        for field, column in self._columns.items():
+            yield 'columns', {field: column}
+        yield 'coordinates', {field: column.tobytes() for field, column in self._coordinates.items()}
+        yield 'coordinate_text', self._coordinate_text
+        yield 'live', bytes(self._live)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """Rebuilds a store from snapshot_items(). Raises ValueError if they do not fit together."""
+        store = cls(state['headers'])
+        slots = len(state['live'])
+        for field, column in store._columns.items():
+            column.extend(state['columns'][field])
+            if len(column) != slots:
+                raise ValueError(f"snapshot column {field} has {len(column)} rows, expected {slots}")
+        for field, column in store._coordinates.items():
+            column.frombytes(state['coordinates'][field])
+            if len(column) != slots:
+                raise ValueError(f"snapshot column {field} has {len(column)} rows, expected {slots}")
+            store._coordinate_text[field].update(state['coordinate_text'][field])
+        store._live = bytearray(state['live'])
+        ids = store._columns['ID']
+        store._slot_by_id = {ids[slot]: slot for slot in compress(range(slots), store._live)}
+        if len(store._slot_by_id) != sum(store._live):
+            raise ValueError("snapshot holds the same ID twice")
+        return store
+
+    def update(self, business):
+        """Overwrites every field of the business with the same ID. Returns its view, or None."""
+        slot = self._slot_by_id.get(business.get('ID', ''))
+        if slot is None:
+            return None
+        self._write(slot, [business.get(field, '') for field in self.headers])
+        return BusinessRecord(self, slot)
+
+    def delete(self, business_id):
+        """Marks the business's slot as a tombstone. Returns False for unknown IDs."""
+        slot = self._slot_by_id.pop(business_id, None)
+        if slot is None:
+            return False
+        self._live[slot] = 0
+        return True
+
+    def value(self, slot, field):
+        """Returns one field of a slot as the string it was stored as."""
+        column = self._columns.get(field)
+        if column is not None:
+            return column[slot]
+        values = self._coordinates.get(field)
+        if values is None:
+            raise KeyError(field)
+        text = self._coordinate_text[field].get(slot)
+        if text is not None:
+            return text
+        number = values[slot]
+        return '' if math.isnan(number) else repr(number)
+
+    def point(self, slot):
+        """Returns (Latitude, Longitude) of a slot as parsed floats, NaN where a value is blank
+        or malformed (or the store has no such column). Nothing is parsed again."""
+        latitudes = self._coordinates.get('Latitude')
+        longitudes = self._coordinates.get('Longitude')
+        return (math.nan if latitudes is None else latitudes[slot],
+                math.nan if longitudes is None else longitudes[slot])
+
+    def _write(self, slot, values):
+        for i, field, column in self._text_layout:
+            value = values[i] or ''
+            column[slot] = sys.intern(value) if field in INTERNED_FIELDS else value
+        for i, field, column in self._coordinate_layout:
+            column[slot] = self._coordinate(field, slot, values[i])
+
+    def _extend_coordinates(self, field, column, start, texts):
+        texts = [text or '' for text in texts]
+        try:
+            # Blank values parse as NaN, just like _coordinate() stores them
+            numbers = array('d', map(float, [text or 'nan' for text in texts]))
+        except ValueError:
+            # Malformed values in this batch; parse them one at a time
+            column.extend(self._coordinate(field, slot, text) for slot, text in enumerate(texts, start))
+            return
+        overrides = self._coordinate_text[field]
+        slots = range(start, start + len(texts))
+        # compress() and map() keep the per-value comparisons in C; only mismatches reach Python
+        for slot in compress(slots, map(str.__ne__, texts, map(repr, numbers))):
+            text = texts[slot - start]
+            if text: # e.g. "73.1800" or a literal "nan", kept so saving round-trips it
+                overrides[slot] = text
+        for slot in compress(slots, map('nan'.__eq__, texts)):
+            overrides[slot] = 'nan' # Would otherwise read back as blank
+        column.extend(numbers)
+
+    def _coordinate(self, field, slot, text):
+        text = text or ''
+        overrides = self._coordinate_text[field]
+        if not text:
+            overrides.pop(slot, None)
+            return math.nan
+        try:
+            number = float(text)
+        except ValueError:
+            number = math.nan
+        if math.isnan(number) or repr(number) != text:
+            overrides[slot] = text # Keep the exact text so saving round-trips it
+        else:
+            overrides.pop(slot, None)
+        return number
@@ -0,0 +1,187 @@
+# remote_data_manager.py
+import json
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from data_manager import EXPECTED_HEADERS, DataLoadError
+from reporting import MessageBoxReporter
+
+# Rows fetched per request while paging through results
+FETCH_ROWS = 100
+# Seconds to wait for the service before giving up on a request
+REQUEST_TIMEOUT = 30
+# Most JSON sent in one add_businesses() request; well under server.py's MAX_BODY_BYTES (8 MB)
+UPLOAD_BYTES = 4 * 1024 * 1024
+
+
+class ServiceError(Exception):
+    """The service answered with an error, or could not be reached (status is then None)."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RemoteResults:
+    """Lazy sequence over one search on the service, fetched FETCH_ROWS rows at a time
+    as they are asked for, like the local backends' lazy results."""
+
+    def __init__(self, manager, params):
+        self.manager = manager
+        self.params = params
+        self._rows = {} # position -> business dict
+        self._total = None
+
+    def _fetch(self, start, stop):
+        """Fetches every not yet fetched row in [start, stop), in whole FETCH_ROWS pages."""
+        start -= start % FETCH_ROWS
+        while start < stop:
+            if start in self._rows and (stop - 1) in self._rows:
+                return
+            reply = self.manager._request('GET', '/search?' + urlencode(
+                {**self.params, 'offset': start, 'limit': FETCH_ROWS}))
+            self._total = reply['total']
+            for position, row in enumerate(reply['results'], start):
+                self._rows[position] = row
+            if not reply['results']:
+                return # The data shrank since the first page
+            start += FETCH_ROWS
+
+    def __len__(self):
+        if self._total is None:
+            self._fetch(0, 1)
+        return self._total
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        for position in range(len(self)):
+            self._fetch(position, position + 1)
+            if position in self._rows:
+                yield self._rows[position]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            self._fetch(start, stop)
+            return [self._rows[i] for i in range(start, stop, step) if i in self._rows]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        self._fetch(index, index + 1)
+        return self._rows[index]
+
+
+class RemoteDataManager:
+    """Data source backed by a running server.py, so several desk staff share one
+    directory instead of each loading (and overwriting) their own copy of the CSV.
+
+    Offers the same methods as DataManager. Searches come back as lazily
+    fetched RemoteResults; adds, updates and deletes return once the service
+    has written them to disk. Problems are shown through the reporter."""
+
+    def __init__(self, url='http://127.0.0.1:8765', reporter=None):
+        self.url = url.rstrip('/')
+        self.filename = self.url # Shown in messages, like the local backends' file names
+        self.reporter = reporter if reporter is not None else MessageBoxReporter()
+        self.expected_headers = list(EXPECTED_HEADERS)
+        # The service has loaded everything before it accepts connections
+        self.loading = False
+        self.load_warning = None
+
+    def _request(self, method, path, payload=None):
+        """Sends one request and returns the decoded JSON reply. Raises ServiceError."""
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = Request(self.url + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+        try:
+            with urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                return json.load(response)
+        except HTTPError as e:
+            try:
+                message = json.load(e).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(e.code, message) from e
+        except (URLError, OSError) as e:
+            raise ServiceError(None, f"Could not reach the search service at {self.url}: {getattr(e, 'reason', e)}") from e
+
+    def load_business_data(self, on_progress=None):
+        """Checks that the service is up. Returns a lazy sequence of every business, or None."""
+        try:
+            return self.stream_business_data(on_progress)
+        except DataLoadError as e:
+            self.reporter.error(e.title, str(e))
+            return None # Indicate critical error
+
+    def stream_business_data(self, on_progress=None):
+        """Same as load_business_data(), but raises DataLoadError instead of going through the reporter."""
+        try:
+            self._request('GET', '/stats')
+        except ServiceError as e:
+            raise DataLoadError("Connection Error", str(e)) from e
+        if on_progress is not None:
+            on_progress(1, 1)
+        return RemoteResults(self, {'q': ''})
+
+    def save_business_data(self, businesses_list):
+        """Not offered by the service: the server owns the file and persists every change itself."""
+        self.reporter.error("Save Error", f"Saving a whole directory is not supported through {self.url}.")
+        return False
+
+    def add_business(self, business):
+        return self._change('POST', '/businesses', business)
+
+    def add_businesses(self, businesses):
+        """Adds many businesses, in requests of up to UPLOAD_BYTES of JSON each; the service
+        writes each request in one batch. Stops at the first request that fails, so the
+        batches sent before it stay added."""
+        batch, batch_bytes = [], 0
+        for business in businesses:
+            row_bytes = len(json.dumps(business).encode('utf-8')) + 2 # With the separating ", "
+            if batch and batch_bytes + row_bytes > UPLOAD_BYTES:
+                if not self._change('POST', '/businesses', batch):
+                    return False
+                batch, batch_bytes = [], 0
+            batch.append(business)
+            batch_bytes += row_bytes
+        return self._change('POST', '/businesses', batch) if batch else True
+
+    def update_business(self, business):
+        return self._change('PUT', '/businesses/' + quote(business.get('ID', ''), safe=''), business)
+
+    def delete_business(self, business_id):
+        return self._change('DELETE', '/businesses/' + quote(business_id, safe=''))
+
+    def _change(self, method, path, payload=None):
+        try:
+            self._request(method, path, payload)
+            return True
+        except ServiceError as e:
+            self.reporter.error("Save Error" if e.status in (None, 500) else "Error", str(e))
+            return False
+
+    def get_business(self, business_id):
+        """Returns the business with the given ID, or None."""
+        try:
+            return self._request('GET', '/businesses/' + quote(business_id, safe=''))
+        except ServiceError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def search(self, query, sort_key='Name', reverse=False, near=None, radius_km=None, nearest=None):
+        """Same as DataManager.search(), answered by the service page by page.
+        Raises ServiceError if the service cannot be reached."""
+        params = {'q': query, 'sort': sort_key}
+        if reverse:
+            params['reverse'] = '1'
+        if near is not None:
+            params['near'] = f"{near[0]}, {near[1]}"
+        if radius_km is not None:
+            params['within'] = radius_km
+        if nearest is not None:
+            params['nearest'] = nearest
+        return RemoteResults(self, params)
@@ -0,0 +1,26 @@
+# reporting.py
+import logging
+
+class MessageBoxReporter:
+    """Shows data-layer errors and warnings in Tk message boxes (the desktop app's default)."""
+
+    def error(self, title, message):
+        from tkinter import messagebox # Imported here so headless callers never load Tk
+        messagebox.showerror(title, message)
+
+    def warning(self, title, message):
+        from tkinter import messagebox
+        messagebox.showwarning(title, message)
+
+
+class LoggingReporter:
+    """Sends data-layer errors and warnings to a logger instead; used by the headless CLI."""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger('localsearch')
+
+    def error(self, title, message):
+        self.logger.error("%s: %s", title, message)
+
+    def warning(self, title, message):
+        self.logger.warning("%s: %s", title, message)
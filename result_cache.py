@@ -0,0 +1,109 @@
+# result_cache.py
+from collections import OrderedDict
+
+# Most result sets kept at once
+MAX_CACHED_RESULTS = 64
+# Memory bound, counted in business IDs held across every cached entry (roughly 8-40 bytes each)
+MAX_CACHED_IDS = 2_000_000
+
+
+def _size(value):
+    """Number of IDs or rows an entry holds; lazily ordered results count in full."""
+    return len(value) if value is not None else 0
+
+
+class ResultCache:
+    """LRU cache of search results for one data version.
+
+    Two kinds of entries share one memory bound: finished result sets, keyed
+    by (data version, normalized query, sort and location options), and the
+    set of IDs whose text matches a query, keyed by (data version, query).
+    Text matches make switching the sort order cheap, and since every match
+    for "cafe" is also a match for "caf", a query that extends a cached one
+    only re-checks that one's matches (see candidates()). The owner bumps its
+    data version and calls clear() on every add, edit and delete.
+    Not thread-safe; DataManager only uses it under its lock."""
+
+    def __init__(self, max_results=MAX_CACHED_RESULTS, max_ids=MAX_CACHED_IDS):
+        self.max_results = max_results
+        self.max_ids = max_ids
+        self.hits = 0
+        self.misses = 0
+        self.refinements = 0 # Text matches looked up with a shorter query's matches at hand
+        self.evictions = 0
+        self.clear()
+
+    def clear(self):
+        """Drops every entry; the statistics are kept."""
+        self._results = OrderedDict() # (version, query, options...) -> results
+        self._matches = OrderedDict() # (version, query) -> set of matching IDs
+        self._size = 0
+
+    def get(self, key):
+        """Returns the cached results for key, or None."""
+        results = self._results.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return results
+
+    def put(self, key, results):
+        """Caches results (treated as read-only from now on) under key."""
+        self._store(self._results, key, results)
+
+    def matches(self, version, query):
+        """Returns the cached set of IDs matching query, or None. The set must not be modified."""
+        ids = self._matches.get((version, query))
+        if ids is not None:
+            self._matches.move_to_end((version, query))
+        return ids
+
+    def put_matches(self, version, query, ids):
+        self._store(self._matches, (version, query), ids)
+
+    def candidates(self, version, query):
+        """Returns the smallest cached match set of a shorter query contained in query,
+        a superset of query's own matches; None if there is none."""
+        best = None
+        for (cached_version, cached_query), ids in self._matches.items():
+            if (cached_version == version and cached_query in query and cached_query != query
+                    and (best is None or len(ids) < len(best))):
+                best = ids
+        if best is not None:
+            self.refinements += 1
+        return best
+
+    def _store(self, entries, key, value):
+        size = _size(value)
+        if size > self.max_ids:
+            return # Would push out everything else; cheaper to recompute
+        if key in entries:
+            self._size -= _size(entries.pop(key))
+        entries[key] = value
+        self._size += size
+        while (len(self._results) > self.max_results or len(self._matches) > self.max_results
+               or self._size > self.max_ids):
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        # Finished results go first: they are rebuilt cheaply from the text matches
+        entries = self._matches if len(self._matches) > self.max_results or not self._results else self._results
+        _, value = entries.popitem(last=False)
+        self._size -= _size(value)
+        self.evictions += 1
+
+    def stats(self):
+        """Hit/miss counts and current size, as a JSON-ready dict."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'refinements': self.refinements,
+            'evictions': self.evictions,
+            'results': len(self._results),
+            'matches': len(self._matches),
+            'cached_ids': self._size,
+        }
@@ -0,0 +1,177 @@
+# results_view.py
+import tkinter as tk
+from tkinter import ttk
+
+from metrics import metrics
+from search_worker import SearchWorker
+
+# Number of rows handed to the Treeview at a time
+PAGE_SIZE = 100
+
+class ResultsView(tk.Frame):
+    """Paged results list with one shared action bar for the selected business.
+
+    Only the current page of results is ever inserted into the Treeview, so
+    showing a result set costs the same whether it holds fifty rows or fifty
+    thousand. The Edit, Delete and Map buttons act on the selected row instead
+    of being created once per result. Turning a page fetches it on a
+    background thread, since lazy results may have to ask a remote service;
+    on_error is called with the exception if that fails."""
+
+    columns = ('Name', 'Category', 'Address', 'Phone')
+
+    def __init__(self, master, on_edit, on_delete, on_map, on_error=None, page_size=PAGE_SIZE, **kwargs):
+        super().__init__(master, **kwargs)
+        self.on_edit = on_edit
+        self.on_delete = on_delete
+        self.on_map = on_map
+        self.on_error = on_error
+        self.page_size = page_size
+        self.results = []
+        self.page = 0
+        self.page_businesses = {} # Treeview iid -> business for the rows on the current page
+        self.empty_message = ""
+        self._pager = SearchWorker(self, self._fetch_page, self._show_fetched_page, self._show_fetch_error)
+
+        # --- Results Table ---
+        table_frame = tk.Frame(self)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(table_frame, columns=self.columns, show='headings', selectmode='browse', height=15)
+        for column in self.columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=150, stretch=True)
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Double-1>", lambda event: self._run_action(self.on_edit))
+
+        # --- Details of the selected business ---
+        self.details_label = tk.Label(self, text="", justify=tk.LEFT, anchor=tk.W, wraplength=760, font=("Arial", 10))
+        self.details_label.pack(fill=tk.X, pady=(5, 0))
+
+        # --- Shared Action Bar and Pager ---
+        action_frame = tk.Frame(self, pady=5)
+        action_frame.pack(fill=tk.X)
+
+        self.edit_button = tk.Button(action_frame, text="Edit", state=tk.DISABLED,
+                                     command=lambda: self._run_action(self.on_edit))
+        self.edit_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.delete_button = tk.Button(action_frame, text="Delete", state=tk.DISABLED,
+                                       command=lambda: self._run_action(self.on_delete))
+        self.delete_button.pack(side=tk.LEFT, padx=5)
+        self.map_button = tk.Button(action_frame, text="Map", state=tk.DISABLED,
+                                    command=lambda: self._run_action(self.on_map))
+        self.map_button.pack(side=tk.LEFT, padx=5)
+
+        self.next_button = tk.Button(action_frame, text="Next >", state=tk.DISABLED, command=lambda: self.show_page(self.page + 1))
+        self.next_button.pack(side=tk.RIGHT, padx=(5, 0))
+        self.page_label = tk.Label(action_frame, text="")
+        self.page_label.pack(side=tk.RIGHT, padx=5)
+        self.prev_button = tk.Button(action_frame, text="< Prev", state=tk.DISABLED, command=lambda: self.show_page(self.page - 1))
+        self.prev_button.pack(side=tk.RIGHT, padx=5)
+
+    def page_count(self, results=None):
+        """Returns the number of pages needed for the current results (at least one)."""
+        return max(1, -(-len(self.results if results is None else results) // self.page_size))
+
+    def show(self, results, empty_message="No results found."):
+        """Replaces the displayed results and jumps back to the first page. Runs on the Tk
+        thread, so lazy results should have their first page fetched already (as the
+        search worker does)."""
+        self.results = results
+        self.empty_message = empty_message
+        with metrics.span('render', page=0):
+            self._render_page(0, results[:self.page_size])
+
+    def show_page(self, page):
+        """Fetches a single page of the current results in the background, then renders it."""
+        self._pager.submit(self.results, page)
+
+    def _fetch_page(self, results, page):
+        """Runs on the pager's thread."""
+        page = min(max(page, 0), self.page_count(results) - 1)
+        start = page * self.page_size
+        return results, page, results[start:start + self.page_size]
+
+    def _show_fetched_page(self, fetched):
+        results, page, page_rows = fetched
+        if results is not self.results:
+            return # Replaced by a new search while the page was being fetched
+        with metrics.span('render', page=page):
+            self._render_page(page, page_rows)
+
+    def _show_fetch_error(self, error):
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _render_page(self, page, page_rows):
+        """Puts page_rows, the rows of the given page, into the Treeview."""
+        self.page = page
+        start = self.page * self.page_size
+
+        # Only the visible page's items exist at any time
+        self.tree.delete(*self.tree.get_children())
+        # Rows are kept by iid, not position: lazy results shift once a business is deleted.
+        # Treeview generates the iids, since an ID may be blank and '' is the iid of the tree's root.
+        self.page_businesses = {}
+        shown_ids = set()
+        for b in page_rows:
+            business_id = b.get('ID', '')
+            if business_id and business_id in shown_ids:
+                continue # A remote page fetched after a change may repeat a row
+            shown_ids.add(business_id)
+            iid = self.tree.insert('', tk.END, values=tuple(b.get(column, '') for column in self.columns))
+            self.page_businesses[iid] = b
+
+        if self.results:
+            self.page_label.config(text=f"Rows {start + 1}-{start + len(page_rows)} of {len(self.results)} "
+                                        f"(page {self.page + 1} of {self.page_count()})")
+            self.details_label.config(text="Select a business to see its details.")
+        else:
+            self.page_label.config(text="")
+            self.details_label.config(text=self.empty_message)
+        self.prev_button.config(state=tk.NORMAL if self.page > 0 else tk.DISABLED)
+        self.next_button.config(state=tk.NORMAL if self.page < self.page_count() - 1 else tk.DISABLED)
+        self._update_action_bar(None)
+
+    def selected_business(self):
+        """Returns the business dict for the selected row, or None."""
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        return self.page_businesses.get(selection[0])
+
+    def clear(self):
+        """Removes all results from the view."""
+        self.show([], empty_message="")
+
+    def _on_select(self, event=None):
+        b = self.selected_business()
+        if b is not None:
+            details = [f"Name: {b.get('Name', 'N/A')}", f"Category: {b.get('Category', 'N/A')}",
+                       f"Address: {b.get('Address', 'N/A')}", f"Phone: {b.get('Phone', 'N/A')}"]
+            if b.get('Website'):
+                details.append(f"Website: {b['Website']}")
+            if b.get('Hours'):
+                details.append(f"Hours: {b['Hours']}")
+            if b.get('Description'):
+                details.append(f"Description: {b['Description']}")
+            self.details_label.config(text="\n".join(details))
+        self._update_action_bar(b)
+
+    def _update_action_bar(self, b):
+        state = tk.NORMAL if b is not None else tk.DISABLED
+        self.edit_button.config(state=state)
+        self.delete_button.config(state=state)
+        # Only allow the map if both address and name exist
+        map_state = tk.NORMAL if b is not None and b.get('Address') and b.get('Name') else tk.DISABLED
+        self.map_button.config(state=map_state)
+
+    def _run_action(self, action):
+        b = self.selected_business()
+        if b is not None:
+            action(b)
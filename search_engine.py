@@ -0,0 +1,395 @@
+# search_engine.py
+import math
+import re
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from record_store import BusinessRecord
+from snapshot import SLOT_TYPECODE, parts_of
+
+# Fields that the search box matches against
+SEARCH_FIELDS = ('Name', 'Category', 'Description')
+# Length of the character n-grams stored in the index
+GRAM_SIZE = 3
+# Joins a row's lowercased fields into the one string kept per row; no query can contain it
+FIELD_SEPARATOR = '\x00'
+
+# --- Relevance ranking (BM25F) ---
+# How much a word counts in each field: a hit in Name outranks a passing mention in Description
+FIELD_WEIGHTS = {'Name': 3.0, 'Category': 2.0, 'Description': 1.0}
+# Standard BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Largest edit distance between a typed word and an indexed one; shorter words allow fewer edits
+MAX_EDITS = 2
+# Characters a word needs per allowed edit ("cafe" gets one, "pharmacy" two)
+CHARS_PER_EDIT = 4
+# Score multipliers for words matched by prefix ("pharm") or per edit of a misspelling ("pharmcy")
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.5
+# Added, times the field weight, when the whole query appears verbatim in a field
+PHRASE_BONUS = 1.0
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Normalizes a search query the same way the search box always has."""
+    return (text or '').strip().lower()
+
+
+def _grams(text):
+    """Returns the set of distinct GRAM_SIZE-character substrings of text."""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _contains(slots, slot):
+    """Whether the sorted slot array holds slot."""
+    i = bisect_left(slots, slot)
+    return i < len(slots) and slots[i] == slot
+
+
+def tokenize(text):
+    """Splits lowercased text into words."""
+    return WORD_PATTERN.findall(text)
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 as soon as it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class SearchEngine:
+    """In-memory inverted n-gram index over Name, Category and Description.
+
+    Rows are referred to by their slot in store (the RecordStore holding
+    them), so the index keeps no business dicts or IDs of its own: each
+    trigram maps to a sorted array of slots, and each indexed slot to one
+    string of its lowercased fields. A query is answered by intersecting the
+    posting lists of its own trigrams and then confirming the few surviving
+    candidates with a plain substring check, so the results are exactly those
+    of the old "query in field.lower()" scan. The public methods take and
+    return business IDs, and rows come back in load order, which is slot order.
+
+    For relevance ranking it also keeps the vocabulary of whole words with
+    their document frequencies, a trigram index over that vocabulary for
+    typo-tolerant lookups, and per-field word counts for BM25 length
+    normalization; see relevance()."""
+
+    def __init__(self, store, fields=SEARCH_FIELDS, max_edits=MAX_EDITS):
+        self.store = store
+        self.fields = fields
+        self.max_edits = max_edits
+        self._weights = [FIELD_WEIGHTS.get(field, 1.0) for field in fields]
+        self._postings = {}  # trigram -> sorted array of slots
+        self._texts = []     # slot -> lowercased fields joined by FIELD_SEPARATOR, None if not indexed
+        self._count = 0      # indexed slots
+        self._document_frequency = Counter() # word -> number of businesses containing it
+        self._word_postings = {}             # trigram of " word " -> set of words
+        self._field_lengths = [0] * len(self.fields) # total words per field, for average lengths
+
+    def __len__(self):
+        return self._count
+
+    def snapshot_items(self):
+        """Yields (key, value) pairs of plain values describing the index, for snapshot.py;
+        from_snapshot() rebuilds it from them. Postings are written as the bytes of their
+        slot arrays."""
+        yield 'settings', [list(self.fields), self.max_edits, self._field_lengths]
+        # One record, so the words shared by both are written once
+        yield 'vocabulary', [dict(self._document_frequency),
+                             {gram: tuple(words) for gram, words in self._word_postings.items()}]
+        for part in parts_of((gram, slots.tobytes()) for gram, slots in self._postings.items()):
+            yield 'postings', part
+        for part in parts_of((slot, text) for slot, text in enumerate(self._texts) if text is not None):
+            yield 'texts', part
+
+    @classmethod
+    def from_snapshot(cls, state, store):
+        """Rebuilds the index of the businesses in store from snapshot_items()."""
+        fields, max_edits, field_lengths = state['settings']
+        engine = cls(store, tuple(fields), max_edits)
+        engine._field_lengths = list(field_lengths)
+        document_frequency, word_postings = state['vocabulary']
+        engine._document_frequency = Counter(document_frequency)
+        engine._word_postings = {gram: set(words) for gram, words in word_postings.items()}
+        for gram, data in state.get('postings', {}).items():
+            slots = engine._postings[gram] = array(SLOT_TYPECODE)
+            slots.frombytes(data)
+        texts = engine._texts = [None] * len(store.ids)
+        for slot, text in state.get('texts', {}).items():
+            texts[slot] = text
+        engine._count = len(texts) - texts.count(None)
+        if engine._count != len(store) or any(store.row(slot) is None for slot in state.get('texts', {})):
+            raise ValueError("snapshot index does not match the stored rows")
+        return engine
+
+    def refresh(self, slot):
+        """Brings the index entry of one store slot in line with the store: indexes a live
+        row (again, if its searched fields changed) and drops a deleted one."""
+        texts = self._texts
+        if slot >= len(texts):
+            texts.extend([None] * (slot + 1 - len(texts)))
+        business = self.store.row(slot)
+        fields = None if business is None else self._lowered(business)
+        old = texts[slot]
+        if old == (None if fields is None else FIELD_SEPARATOR.join(fields)):
+            return
+        if old is not None:
+            self._unindex(slot, old)
+        if fields is not None:
+            self._index([(slot, fields)])
+
+    def extend(self, slots):
+        """refresh() for many slots, e.g. the rows of a chunk just loaded. Rows new to the
+        index are indexed together, several times faster than one at a time."""
+        start = len(self._texts)
+        rows = []
+        for slot in sorted(set(slots)):
+            if slot < start:
+                self.refresh(slot)
+                continue
+            business = self.store.row(slot)
+            if business is not None:
+                rows.append((slot, self._lowered(business)))
+        if rows:
+            self._texts.extend([None] * (rows[-1][0] + 1 - start))
+            self._index(rows)
+
+    def search(self, query):
+        """Returns the businesses whose Name, Category or Description contains query.
+
+        Matching is case-insensitive and results come back in load order,
+        just like the linear scan this replaces."""
+        if not normalize(query):
+            return [BusinessRecord(self.store, slot) for slot, text in enumerate(self._texts) if text is not None]
+        return self.rows(self.match_ids(query))
+
+    def match_ids(self, query, candidates=None):
+        """Returns the set of IDs of the businesses matching query, in no particular order.
+        candidates, if given, is a set of IDs known to hold every match (e.g. the matches of
+        a shorter query contained in this one); only those are checked when that is the
+        smaller set to check."""
+        ids = self.store.ids
+        if candidates is not None:
+            slots = self.store.slots
+            candidates = {slots[business_id] for business_id in candidates if business_id in slots}
+        return {ids[slot] for slot in self._match_slots(normalize(query), candidates)}
+
+    def relevance(self, query):
+        """Returns {business ID: score} for a ranked, typo-tolerant search.
+
+        Every word of the query must match a word of the business exactly,
+        as a prefix, or within the edit-distance threshold; businesses
+        containing the query verbatim always match, as they do in match_ids().
+        Only the candidates found through the trigram indexes are scored, with
+        field-weighted BM25 (BM25F) summed over the query words. A query with no
+        words at all (e.g. "-") matches as in match_ids() and is ranked by the
+        phrase bonus alone."""
+        query = normalize(query)
+        words = tokenize(query)
+        ids = self.store.ids
+        if not words:
+            return {ids[slot]: PHRASE_BONUS * self._phrase_weight(query, self._texts[slot].split(FIELD_SEPARATOR))
+                    for slot in self._match_slots(query)}
+        matches = [self._vocabulary_matches(word) for word in words]
+
+        # Verbatim hits always match; the longest word's spellings bring in the rest,
+        # and every other word then filters them while scoring
+        candidates = self._match_slots(query)
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        if len(words[longest]) >= GRAM_SIZE:
+            candidates |= self._candidates(words[longest])
+            for term in matches[longest]:
+                if not term.startswith(words[longest]): # Prefix matches are substring hits already
+                    candidates |= self._candidates(term)
+
+        count = self._count
+        averages = [max(total / count, 1.0) if count else 1.0 for total in self._field_lengths]
+        idf = {term: math.log(1 + (count - self._document_frequency[term] + 0.5) /
+                              (self._document_frequency[term] + 0.5))
+               for word_matches in matches for term in word_matches}
+        scores = {}
+        for slot in candidates:
+            texts = self._texts[slot].split(FIELD_SEPARATOR)
+            field_tokens = [tokenize(text) for text in texts]
+            # BM25F: field weight over the field's length relative to that field's average length
+            norms = [weight / (1 - BM25_B + BM25_B * len(tokens) / average)
+                     for weight, tokens, average in zip(self._weights, field_tokens, averages)]
+            score = 0.0
+            for word_matches in matches:
+                best = 0.0
+                for term, weight in word_matches.items():
+                    frequency = sum(norm * tokens.count(term) for norm, tokens in zip(norms, field_tokens))
+                    if frequency:
+                        best = max(best, weight * idf[term] * frequency * (BM25_K1 + 1) / (frequency + BM25_K1))
+                if not best:
+                    score = None # This word matched nowhere in the business
+                    break
+                score += best
+            phrase = self._phrase_weight(query, texts)
+            if score is None and not phrase:
+                continue
+            scores[ids[slot]] = (score or 0.0) + PHRASE_BONUS * phrase
+        return scores
+
+    def rows(self, business_ids):
+        """Returns the businesses with the given IDs in load order."""
+        store = self.store
+        return [BusinessRecord(store, slot) for slot in sorted(map(store.slots.__getitem__, business_ids))]
+
+    def _match_slots(self, query, candidates=None):
+        """match_ids() on a normalized query and candidate slots; returns the matching slots."""
+        texts = self._texts
+        if not query:
+            return {slot for slot, text in enumerate(texts) if text is not None}
+        if FIELD_SEPARATOR in query:
+            return set() # It would match across two fields
+
+        if len(query) >= GRAM_SIZE:
+            indexed = self._candidates(query)
+            if not indexed:
+                return set()
+            if candidates is None or len(indexed) <= len(candidates):
+                candidates = indexed
+        elif candidates is None or len(candidates) * 2 > self._count:
+            # Too short to have a trigram; walking the texts in order beats
+            # hopping around a set that is nearly as big
+            return {slot for slot, text in enumerate(texts) if text is not None and query in text}
+
+        return {slot for slot in candidates if query in texts[slot]}
+
+    def _candidates(self, query):
+        """Intersects the posting lists of every trigram in query, smallest first. Returns a set of slots."""
+        postings = []
+        for gram in _grams(query):
+            slots = self._postings.get(gram)
+            if not slots:
+                return set()
+            postings.append(slots)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for slots in postings[1:]:
+            if len(candidates) * GRAM_SIZE * 4 < len(slots):
+                # A binary search per candidate beats walking the whole array
+                candidates = {slot for slot in candidates if _contains(slots, slot)}
+            else:
+                candidates.intersection_update(slots)
+            if not candidates:
+                break
+        return candidates
+
+    def _phrase_weight(self, query, texts):
+        """The largest weight of the fields (lowercased texts) containing query verbatim, or 0."""
+        return max((weight for weight, text in zip(self._weights, texts) if query in text), default=0.0)
+
+    def _vocabulary_matches(self, word):
+        """Returns {indexed word: score weight} for the words that word may stand for."""
+        matches = {}
+        if word in self._document_frequency:
+            matches[word] = 1.0
+        if len(word) >= GRAM_SIZE:
+            for term in self._words_with_grams(_grams(' ' + word)):
+                if term.startswith(word) and term != word:
+                    matches[term] = PREFIX_WEIGHT
+        allowed = min(self.max_edits, len(word) // CHARS_PER_EDIT)
+        if allowed:
+            # Each edit changes at most GRAM_SIZE of the padded word's trigrams
+            grams = _grams(f' {word} ')
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._word_postings.get(gram, ()))
+            required = max(1, len(grams) - GRAM_SIZE * allowed)
+            for term, count in shared.items():
+                if count >= required and term not in matches:
+                    distance = edit_distance(word, term, allowed)
+                    if distance <= allowed:
+                        matches[term] = FUZZY_WEIGHT ** distance
+        return matches
+
+    def _words_with_grams(self, grams):
+        """Returns the indexed words containing every trigram in grams."""
+        postings = sorted((self._word_postings.get(gram, set()) for gram in grams), key=len)
+        if not postings or not postings[0]:
+            return set()
+        return set(postings[0]).intersection(*postings[1:])
+
+    def _lowered(self, business):
+        return [(business.get(field) or '').lower() for field in self.fields]
+
+    def _index(self, rows):
+        """Indexes rows, a list of (slot, lowercased fields) in slot order, none of them indexed.
+        New slots are gathered per trigram first, so each posting array grows once per call."""
+        texts, lengths = self._texts, self._field_lengths
+        new_slots, words = {}, Counter()
+        for slot, fields in rows:
+            texts[slot] = FIELD_SEPARATOR.join(fields)
+            for gram in set().union(*map(_grams, fields)):
+                try:
+                    new_slots[gram].append(slot)
+                except KeyError:
+                    new_slots[gram] = [slot]
+            row_words = set()
+            for i, text in enumerate(fields):
+                tokens = tokenize(text)
+                lengths[i] += len(tokens)
+                row_words.update(tokens)
+            words.update(row_words)
+        self._count += len(rows)
+        postings = self._postings
+        for gram, added in new_slots.items():
+            slots = postings.get(gram)
+            if slots is None:
+                postings[gram] = array(SLOT_TYPECODE, added)
+            elif slots[-1] < added[0]:
+                slots.extend(added) # Rows are mostly indexed in slot order
+            else:
+                for slot in added:
+                    insort(slots, slot)
+        frequency = self._document_frequency
+        for word, count in words.items():
+            if word in frequency:
+                frequency[word] += count
+            else:
+                frequency[word] = count
+                for gram in _grams(f' {word} '):
+                    self._word_postings.setdefault(gram, set()).add(word)
+
+    def _unindex(self, slot, text):
+        self._texts[slot] = None
+        self._count -= 1
+        texts = text.split(FIELD_SEPARATOR)
+        for gram in set().union(*(_grams(text) for text in texts)):
+            slots = self._postings.get(gram)
+            if slots is not None:
+                i = bisect_left(slots, slot)
+                if i < len(slots) and slots[i] == slot:
+                    del slots[i]
+                if not slots:
+                    del self._postings[gram]
+        words = set()
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            self._field_lengths[i] -= len(tokens)
+            words.update(tokens)
+        for word in words:
+            self._document_frequency[word] -= 1
+            if not self._document_frequency[word]:
+                del self._document_frequency[word]
+                for gram in _grams(f' {word} '):
+                    terms = self._word_postings.get(gram)
+                    if terms is not None:
+                        terms.discard(word)
+                        if not terms:
+                            del self._word_postings[gram]
@@ -0,0 +1,81 @@
+# search_worker.py
+import queue
+import threading
+
+# How often the Tk thread checks for finished searches, in milliseconds
+POLL_INTERVAL_MS = 20
+
+class SearchWorker:
+    """Runs searches on a background thread and hands results back to the Tk mainloop.
+
+    Only the newest request is kept: submitting while a search is still
+    waiting replaces it, and a search that was already running when a newer
+    one arrived has its result dropped. Finished results are collected on
+    the Tk thread by polling with master.after(), since Tk itself must only
+    be touched from the thread running the mainloop."""
+
+    def __init__(self, master, search_function, on_results, on_error=None):
+        self.master = master
+        self.search_function = search_function
+        self.on_results = on_results
+        self.on_error = on_error
+        self.generation = 0 # Incremented for every submitted request
+        self._pending = None
+        self._condition = threading.Condition()
+        self._finished = queue.Queue() # (generation, results, error) from the worker thread
+        self._polling = False
+        self._thread = threading.Thread(target=self._run, name="search-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, *args, **kwargs):
+        """Queues a search, superseding any earlier one. Returns its generation number.
+        Must be called from the Tk thread."""
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, args, kwargs)
+            self._condition.notify()
+        if not self._polling:
+            self._polling = True
+            self.master.after(POLL_INTERVAL_MS, self._poll)
+        return self.generation
+
+    def is_current(self, generation):
+        """True if no newer search has been submitted since generation."""
+        return generation == self.generation
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, args, kwargs = self._pending
+                self._pending = None
+
+            try:
+                results, error = self.search_function(*args, **kwargs), None
+            except Exception as e:
+                results, error = None, e
+            # Skip the hand-off entirely if the user has already typed more
+            if self.is_current(generation):
+                self._finished.put((generation, results, error))
+
+    def _poll(self):
+        """Delivers the newest finished search, if it is still current; runs on the Tk thread."""
+        latest = None
+        while True:
+            try:
+                latest = self._finished.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            generation, results, error = latest
+            # Re-check here: a newer request may have been submitted since it finished
+            if self.is_current(generation):
+                # Cleared first, so a callback that raises does not stop every later delivery
+                self._polling = False
+                if error is None:
+                    self.on_results(results)
+                elif self.on_error is not None:
+                    self.on_error(error)
+                return
+        self.master.after(POLL_INTERVAL_MS, self._poll)
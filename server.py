@@ -0,0 +1,336 @@
+# server.py
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from bulk_io import validate_business
+from cli import DEFAULT_LIMIT, add_metrics_arguments, run_query, start_metrics, storage_settings
+from data_manager import BACKENDS, EXPECTED_HEADERS, DataLoadError, create_data_manager
+from metrics import metrics
+from reporting import LoggingReporter
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Threads answering searches and lookups; they share the one in-memory index
+READ_THREADS = 8
+# Most queued changes written to disk with a single journal fsync
+MAX_WRITE_BATCH = 256
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 8 * 1024 * 1024
+# Most results returned per request
+MAX_LIMIT = 1000
+
+STATUS_TEXT = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+logger = logging.getLogger('localsearch')
+
+
+class HTTPError(Exception):
+    """Turned into an error response with the given status code."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(params, name, default=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f"'{name}' must be a whole number") from None
+
+
+def _float_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise HTTPError(400, f"'{name}' must be a number") from None
+
+
+def _change_error(error):
+    """HTTPError for a (title, message) error from apply_changes(): saving failures are
+    the server's fault, anything else is about a business that does not exist."""
+    title, message = error
+    return HTTPError(500 if title == "Save Error" else 404, message)
+
+
+class SearchService:
+    """Serves one data manager to many clients over HTTP/JSON.
+
+    Reads (search, nearby, get, stats) run on a pool of threads against the
+    shared in-memory index, so a slow search never holds up the others or the
+    event loop. Writes (add, update, delete) go through a single queue: one
+    writer task takes every change waiting in it and applies them with one
+    DataManager.apply_changes() call, i.e. one journal fsync per batch rather
+    than per change. A write is only answered once it is on disk."""
+
+    def __init__(self, data_manager, read_threads=READ_THREADS, max_write_batch=MAX_WRITE_BATCH):
+        self.data_manager = data_manager
+        self.max_write_batch = max_write_batch
+        self.readers = ThreadPoolExecutor(read_threads, thread_name_prefix='reader')
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix='writer')
+        self.writes = None # asyncio.Queue of (op, value, future), created on the event loop
+        self.counts = {'requests': 0, 'errors': 0, 'writes': 0, 'write_batches': 0}
+        self.routes = {
+            ('GET', 'search'): self.search,
+            ('GET', 'nearby'): self.nearby,
+            ('GET', 'stats'): self.stats,
+            ('GET', 'businesses'): self.get,
+            ('POST', 'businesses'): self.add,
+            ('PUT', 'businesses'): self.update,
+            ('DELETE', 'businesses'): self.delete,
+        }
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Starts the writer task and begins accepting connections. Returns the asyncio server."""
+        self.writes = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def _serve_connection(self, reader, writer):
+        """Answers requests on one connection until the client closes it (HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break # Client went away
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {'error': "request headers too large"}, keep_alive=False)
+                    break
+                request_line, *header_lines = head.decode('latin-1').rstrip('\r\n').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.split(' ')
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': "malformed request"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {'error': f"body over {MAX_BODY_BYTES} bytes"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._dispatch(method, target, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        data = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n")
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        writer.write(head.encode('latin-1') + b'\r\n' + data)
+        await writer.drain()
+
+    async def _dispatch(self, method, target, body):
+        """Routes one request to its handler. Returns (status, JSON-ready payload)."""
+        self.counts['requests'] += 1
+        url = urlsplit(target)
+        resource, _, business_id = url.path.strip('/').partition('/')
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            handler = self.routes.get((method, resource))
+            if handler is None:
+                if any(route[1] == resource for route in self.routes):
+                    raise HTTPError(405, f"{method} is not supported on /{resource}")
+                raise HTTPError(404, f"no such endpoint: {url.path}")
+            with metrics.span(f'http.{resource}', method=method):
+                return await handler(params, unquote(business_id), body)
+        except HTTPError as e:
+            self.counts['errors'] += 1
+            return e.status, {'error': str(e)}
+        except ValueError as e: # Malformed query options, e.g. an invalid 'near' point
+            self.counts['errors'] += 1
+            return 400, {'error': str(e)}
+        except Exception as e:
+            self.counts['errors'] += 1
+            logger.exception("%s %s failed", method, target)
+            return 500, {'error': str(e)}
+
+    def _read(self, function, *args):
+        """Runs a read on the reader threads, leaving the event loop free for other requests."""
+        return asyncio.get_running_loop().run_in_executor(self.readers, function, *args)
+
+    async def _write(self, changes):
+        """Queues changes for the writer and waits until they are applied and on disk.
+        Returns one None or (title, message) error per change."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for op, value in changes:
+            future = loop.create_future()
+            await self.writes.put((op, value, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _write_loop(self):
+        """The single writer: drains the queue into batches and applies each in one go."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            while len(batch) < self.max_write_batch and not self.writes.empty():
+                batch.append(self.writes.get_nowait())
+            try:
+                errors = await loop.run_in_executor(self.writer, self.data_manager.apply_changes,
+                                                    [(op, value) for op, value, _ in batch])
+            except Exception as e:
+                logger.exception("Writing %d change(s) failed", len(batch))
+                errors = [("Save Error", str(e))] * len(batch)
+            self.counts['writes'] += len(batch)
+            self.counts['write_batches'] += 1
+            for (_, _, future), error in zip(batch, errors):
+                if not future.done(): # The client may have disconnected meanwhile
+                    future.set_result(error)
+
+    # --- Endpoints ---
+
+    async def search(self, params, _, body):
+        """GET /search?q=&sort=&reverse=&near=&within=&nearest=&limit=&offset="""
+        limit = min(max(_int_param(params, 'limit', DEFAULT_LIMIT), 0) or MAX_LIMIT, MAX_LIMIT)
+        return 200, await self._read(lambda: run_query(
+            self.data_manager, params.get('q', ''), near=params.get('near') or None,
+            sort=params.get('sort') or 'Name', reverse=params.get('reverse', '').lower() in ('1', 'true', 'yes'),
+            limit=limit, offset=max(_int_param(params, 'offset', 0), 0),
+            radius_km=_float_param(params, 'within'), nearest=_int_param(params, 'nearest')))
+
+    async def nearby(self, params, _, body):
+        """GET /nearby?near=LAT,LON&radius=KM or &nearest=N, optionally &q= — closest first."""
+        if not params.get('near'):
+            raise HTTPError(400, "'near' is required")
+        limit = min(max(_int_param(params, 'limit', DEFAULT_LIMIT), 0) or MAX_LIMIT, MAX_LIMIT)
+        return 200, await self._read(lambda: run_query(
+            self.data_manager, params.get('q', ''), near=params['near'], sort='Distance', limit=limit,
+            offset=max(_int_param(params, 'offset', 0), 0),
+            radius_km=_float_param(params, 'radius'), nearest=_int_param(params, 'nearest')))
+
+    async def get(self, params, business_id, body):
+        """GET /businesses/ID"""
+        if not business_id:
+            raise HTTPError(405, "GET needs a business ID: /businesses/ID")
+        business = await self._read(self.data_manager.get_business, business_id)
+        if business is None:
+            raise HTTPError(404, f"no business with ID '{business_id}'")
+        return 200, dict(business)
+
+    async def add(self, params, business_id, body):
+        """POST /businesses with one business object, or a list of them. IDs are generated
+        if missing; a business with an existing ID replaces it."""
+        if business_id:
+            raise HTTPError(405, "POST goes to /businesses, without an ID")
+        payload = self._json(body)
+        rows = [self._validated(item) for item in (payload if isinstance(payload, list) else [payload])]
+        errors = await self._write([('add', row) for row in rows])
+        for error in errors:
+            if error is not None:
+                raise _change_error(error)
+        created = [{'ID': row['ID']} for row in rows]
+        return 201, created if isinstance(payload, list) else created[0]
+
+    async def update(self, params, business_id, body):
+        """PUT /businesses/ID with every field of the business, as in the Edit window. As there,
+        blank or malformed coordinates are kept; the business just has no place on the map."""
+        if not business_id:
+            raise HTTPError(405, "PUT needs a business ID: /businesses/ID")
+        business = self._json(body)
+        if not isinstance(business, dict):
+            raise HTTPError(400, "expected a JSON object")
+        row = self._validated(dict(business, ID=business_id), check_coordinates=False)
+        error, = await self._write([('update', row)])
+        if error is not None:
+            raise _change_error(error)
+        return 200, row
+
+    async def delete(self, params, business_id, body):
+        """DELETE /businesses/ID"""
+        if not business_id:
+            raise HTTPError(405, "DELETE needs a business ID: /businesses/ID")
+        error, = await self._write([('delete', business_id)])
+        if error is not None:
+            raise _change_error(error)
+        return 200, {'deleted': business_id}
+
+    async def stats(self, params, _, body):
+        """GET /stats: business count, request and write counters, result cache statistics."""
+        def collect():
+            businesses = self.data_manager.search('', 'Name')
+            cache = getattr(self.data_manager, 'result_cache', None)
+            return {'businesses': len(businesses), **self.counts, 'queued_writes': self.writes.qsize(),
+                    'result_cache': cache.stats() if cache is not None else None}
+        return 200, await self._read(collect)
+
+    def _json(self, body):
+        try:
+            return json.loads(body or b'null')
+        except ValueError as e:
+            raise HTTPError(400, f"invalid JSON: {e}") from None
+
+    def _validated(self, business, check_coordinates=True):
+        """Checks a business the way bulk imports do; returns it with every expected field."""
+        values, error = validate_business(business, check_coordinates)
+        if error is not None:
+            raise HTTPError(400, error)
+        return dict(zip(EXPECTED_HEADERS, values))
+
+
+async def serve(data_manager, host, port):
+    service = SearchService(data_manager)
+    server = await service.start(host, port)
+    logger.warning("Serving %s on http://%s:%d", data_manager.filename, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    storage = storage_settings()
+    parser = argparse.ArgumentParser(description="Serve the business directory to several clients over HTTP/JSON.")
+    parser.add_argument('--backend', choices=[backend for backend in BACKENDS if backend != 'http'],
+                        default=storage.get('backend', 'csv'), help="storage backend to use (default: csv)")
+    parser.add_argument('--data', default=storage.get('data'),
+                        help="data file (default: businesses.csv or businesses.db)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s", stream=sys.stderr)
+    start_metrics(args)
+
+    data_manager = create_data_manager(args.backend, args.data, LoggingReporter(logger))
+    try:
+        data_manager.stream_business_data()
+    except DataLoadError as e:
+        logger.error("%s: %s", e.title, e)
+        return 1
+    if data_manager.load_warning:
+        logger.warning(data_manager.load_warning)
+    try:
+        asyncio.run(serve(data_manager, args.host, args.port))
+    except KeyboardInterrupt:
+        pass # Every acknowledged write is already in the journal
+    finally:
+        metrics.finish()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# snapshot.py
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+# Start of every snapshot file
+MAGIC = b'LSSNAP'
+# Bump whenever what RecordStore or an index writes into a snapshot changes, so old snapshots are ignored
+FORMAT = 3
+# Magic, format, marshal version, the source CSV's size, mtime (ns) and BLAKE2b digest,
+# then the payload's length and CRC-32
+HEADER = struct.Struct('<6sHHQq32sQI')
+# Length prefix of every record in the payload
+RECORD_LENGTH = struct.Struct('<Q')
+# Array type of the store slot numbers that stand in for business IDs inside indexes
+SLOT_TYPECODE = 'i'
+# Bytes read at a time while hashing the CSV
+HASH_BLOCK_BYTES = 1024 * 1024
+# Values per record when a large dict is written in parts (a key holding a tuple of 1000 IDs
+# counts 1001); keeps every marshal call, which holds the GIL and so stalls searches, short
+# and only one part in memory as bytes at a time
+PART_ITEMS = 100000
+
+
+def snapshot_filename(filename):
+    """The snapshot kept next to a CSV, e.g. businesses.csv.snapshot."""
+    return filename + '.snapshot'
+
+
+def file_digest(filename):
+    """BLAKE2b digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(filename, mode='rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def parts_of(items, size=PART_ITEMS):
+    """Groups (key, value) pairs into dicts of about size values each, for writing a large dict
+    in parts; a tuple, list, set or bytes value counts as one value per element (or byte)."""
+    part, count = {}, 0
+    for key, value in items:
+        part[key] = value
+        count += 1 + (len(value) if isinstance(value, (tuple, list, set, bytes)) else 0)
+        if count >= size:
+            yield part
+            part, count = {}, 0
+    if part:
+        yield part
+
+
+def encode_ids(business_ids, slots):
+    """Packs business IDs as the bytes of an array of their slots, given the store's ID -> slot
+    dict. Written this way, every ID string is stored (and loaded) once, in the store's ID
+    column, instead of once per index entry. Slots are sorted, so decoding visits the ID
+    strings in the order they lie in memory."""
+    return array(SLOT_TYPECODE, sorted(map(slots.__getitem__, business_ids))).tobytes()
+
+
+def decode_ids(data, ids):
+    """Iterates over the business IDs packed by encode_ids(), given the store's ID of every slot.
+    Raises IndexError for slots past the end of the store."""
+    slots = array(SLOT_TYPECODE)
+    slots.frombytes(data)
+    return map(ids.__getitem__, slots)
+
+
+def write_snapshot(filename, sections, source_stat):
+    """Saves the snapshot of the CSV filename.
+
+    sections maps a section name to an iterable of (key, value) pairs made
+    of plain values marshal can write: str, int, float, bytes, None, and
+    lists, tuples, dicts and sets of them. A key given several times (e.g.
+    a dict written with parts_of()) is merged back into one value when read.
+    Records are written one at a time as they are produced. source_stat is
+    os.stat() of the CSV taken before it was parsed; if the file has changed
+    since, nothing is written, since the data may match neither version.
+    The file is written under a temporary name and renamed into place.
+    Returns the snapshot's size in bytes, or None."""
+    current = os.stat(filename)
+    if (current.st_size, current.st_mtime_ns) != (source_stat.st_size, source_stat.st_mtime_ns):
+        return None
+    target = snapshot_filename(filename)
+    temp_filename = f"{target}.{os.getpid()}.tmp" # Two apps starting cold at once never share one
+    payload_bytes, crc = 0, 0
+    # Never writable by others: read_snapshot() refuses snapshots that are
+    with open(temp_filename, mode='wb', opener=lambda path, flags: os.open(path, flags, 0o644)) as file:
+        file.write(bytes(HEADER.size)) # Filled in once the payload's length and checksum are known
+        for section, items in sections.items():
+            for key, value in items:
+                record = marshal.dumps((section, key, value))
+                record = RECORD_LENGTH.pack(len(record)) + record
+                file.write(record)
+                crc = zlib.crc32(record, crc)
+                payload_bytes += len(record)
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, FORMAT, marshal.version, current.st_size, current.st_mtime_ns,
+                               file_digest(filename), payload_bytes, crc))
+    os.replace(temp_filename, target)
+    return HEADER.size + payload_bytes
+
+
+def read_snapshot(filename):
+    """Returns the sections saved by write_snapshot(), as {section: {key: value}}, if the CSV
+    filename is unchanged since; None if there is no usable snapshot.
+
+    A CSV with the snapshot's size and mtime is taken as unchanged. If only
+    the mtime differs (the file was copied, restored or touched), its digest
+    decides. Snapshots owned by another user or writable by others are
+    ignored. The payload's checksum is verified and the records are read
+    straight out of a read-only memory map of the file. marshal only ever
+    builds plain values, so a snapshot cannot run code; the owner still
+    validates what it gets. Raises ValueError or OSError for a damaged file."""
+    target = snapshot_filename(filename)
+    if not os.path.exists(target):
+        return None
+    with open(target, mode='rb') as file:
+        status = os.fstat(file.fileno())
+        if hasattr(os, 'getuid') and (status.st_uid != os.getuid() or status.st_mode & 0o022):
+            return None
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("truncated snapshot header")
+        magic, version, marshal_version, size, mtime_ns, digest, payload_bytes, crc = HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT or marshal_version != marshal.version:
+            return None
+        current = os.stat(filename)
+        if current.st_size != size:
+            return None
+        if current.st_mtime_ns != mtime_ns and file_digest(filename) != digest:
+            return None
+        if status.st_size != HEADER.size + payload_bytes:
+            raise ValueError("truncated snapshot payload")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view, view[HEADER.size:] as payload:
+                if zlib.crc32(payload) != crc:
+                    raise ValueError("snapshot checksum mismatch")
+                return _read_records(payload)
+
+
+def _read_records(payload):
+    sections = {}
+    offset = 0
+    while offset < len(payload):
+        length, = RECORD_LENGTH.unpack_from(payload, offset)
+        offset += RECORD_LENGTH.size
+        with payload[offset:offset + length] as record:
+            section, key, value = marshal.loads(record)
+        offset += length
+        if not isinstance(section, str) or not isinstance(key, str):
+            raise ValueError("malformed snapshot record")
+        entries = sections.setdefault(section, {})
+        if key not in entries:
+            entries[key] = value
+        elif isinstance(value, dict) and isinstance(entries[key], dict):
+            entries[key].update(value)
+        else:
+            raise ValueError(f"snapshot record {section}.{key} given twice")
+    return sections
+
+
+def remove_snapshot(filename):
+    """Deletes the CSV's snapshot, if there is one."""
+    try:
+        os.remove(snapshot_filename(filename))
+    except FileNotFoundError:
+        pass
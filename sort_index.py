@@ -0,0 +1,231 @@
+# sort_index.py
+import heapq
+from bisect import bisect_left, insort
+from contextlib import nullcontext
+from itertools import islice
+
+
+# Fields offered in the app's sort_options
+SORT_FIELDS = ('Name', 'Category')
+
+
+class SortIndex:
+    """Precomputed, incrementally maintained sort orders for Name and Category.
+
+    Each field keeps a list of (lowercased value, insertion number, ID)
+    tuples in sorted order. The lowercased keys are computed once per row
+    instead of on every search, changing the sort option never re-sorts,
+    and the insertion number keeps ties in load order exactly like the
+    stable sorted() calls this replaces, in both directions."""
+
+    def __init__(self, fields=SORT_FIELDS):
+        self.fields = fields
+        self._orders = {field: [] for field in fields} # field -> sorted [(key, seq, ID)]
+        self._keys = {}  # business ID -> (seq, {field: key})
+        self._next_seq = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def build(self, businesses):
+        """Discards the current orders and sorts every business once per field."""
+        self._orders = {field: [] for field in self.fields}
+        self._keys = {}
+        self._next_seq = 0
+        self.extend(businesses)
+
+    def snapshot_items(self, store):
+        """Yields (key, value) pairs of plain values describing the orders, for snapshot.py;
+        businesses are referred to by their slot in store, the RecordStore holding them."""
+        slots = store.slots
+        yield 'settings', [list(self.fields), self._next_seq]
+        for field, order in self._orders.items():
+            yield 'orders', {field: [(key, seq, slots[business_id]) for key, seq, business_id in order]}
+
+    @classmethod
+    def from_snapshot(cls, state, store):
+        """Rebuilds the orders of the businesses in store from snapshot_items(). The per-ID
+        keys are not written; they are collected back from the orders."""
+        ids = store.ids
+        fields, next_seq = state['settings']
+        index = cls(tuple(fields))
+        index._next_seq = next_seq
+        for field in index.fields:
+            order = index._orders[field] = [(key, seq, ids[slot]) for key, seq, slot in state['orders'][field]]
+            for key, seq, business_id in order:
+                index._keys.setdefault(business_id, (seq, {}))[1][field] = key
+        return index
+
+    def extend(self, businesses):
+        """Adds a batch of businesses, e.g. one chunk of a streaming load.
+
+        New entries are appended and each order is re-sorted once; list.sort()
+        merges the already sorted prefix with the new run, so this is far
+        cheaper than inserting the rows one by one."""
+        appended = {} # business ID -> seq of the entries this batch appends
+        for business in businesses:
+            business_id = business.get('ID', '')
+            if business_id in self._keys and business_id not in appended:
+                self.update(business)
+                continue
+            if business_id in appended:
+                seq = appended[business_id] # Keep the first position, as the store does
+            else:
+                seq = appended[business_id] = self._next_seq
+                self._next_seq += 1
+            self._keys[business_id] = (seq, self._sort_keys(business))
+        for field in self.fields:
+            order = self._orders[field]
+            order.extend((self._keys[business_id][1][field], seq, business_id)
+                         for business_id, seq in appended.items())
+            order.sort()
+
+    def add(self, business):
+        """Inserts a business into every order. An existing entry with the same ID is replaced."""
+        business_id = business.get('ID', '')
+        if business_id in self._keys:
+            self.update(business)
+            return
+        seq = self._next_seq
+        self._next_seq += 1
+        keys = self._sort_keys(business)
+        self._keys[business_id] = (seq, keys)
+        for field in self.fields:
+            insort(self._orders[field], (keys[field], seq, business_id))
+
+    def update(self, business):
+        """Moves a business within the orders whose sort key changed."""
+        business_id = business.get('ID', '')
+        if business_id not in self._keys:
+            self.add(business)
+            return
+        seq, old_keys = self._keys[business_id]
+        keys = self._sort_keys(business)
+        self._keys[business_id] = (seq, keys)
+        for field in self.fields:
+            if keys[field] != old_keys[field]:
+                self._discard(field, (old_keys[field], seq, business_id))
+                insort(self._orders[field], (keys[field], seq, business_id))
+
+    def remove(self, business_id):
+        """Drops a business from every order. Unknown IDs are ignored."""
+        entry = self._keys.pop(business_id, None)
+        if entry is None:
+            return
+        seq, keys = entry
+        for field in self.fields:
+            self._discard(field, (keys[field], seq, business_id))
+
+    def ordered_ids(self, field, reverse=False, ids=None, limit=None):
+        """Returns business IDs in sort order, restricted to ids (None means all),
+        stopping after limit IDs when a limit is given."""
+        order = self._orders[field]
+        if ids is None or self._is_dense(ids):
+            # Walk the precomputed order; stops early once limit matches are found
+            walk = (entry[2] for entry in self._walk(order, reverse))
+            if ids is not None:
+                walk = (business_id for business_id in walk if business_id in ids)
+            return list(islice(walk, limit))
+
+        # A sparse result set is cheaper to order on its own, with the precomputed keys
+        def key(business_id):
+            seq, keys = self._keys[business_id]
+            return keys[field], seq
+        if not reverse:
+            if limit is not None:
+                return heapq.nsmallest(limit, ids, key=key)
+            return sorted(ids, key=key)
+
+        def reverse_key(business_id):
+            # Descending by value, ascending by insertion number on ties
+            seq, keys = self._keys[business_id]
+            return keys[field], -seq
+        if limit is not None:
+            return heapq.nlargest(limit, ids, key=reverse_key)
+        return sorted(ids, key=reverse_key, reverse=True)
+
+    def _is_dense(self, ids):
+        # Walking the whole order costs len(self); sorting costs about len(ids) * log(len(ids))
+        return len(ids) * max(1, len(ids).bit_length()) >= len(self._keys)
+
+    def _walk(self, order, reverse):
+        if not reverse:
+            yield from order
+            return
+        # Walk runs of equal keys from the end, each run front to back, to keep ties in load order
+        end = len(order)
+        while end > 0:
+            start = bisect_left(order, (order[end - 1][0],), 0, end)
+            yield from order[start:end]
+            end = start
+
+    def _discard(self, field, entry):
+        order = self._orders[field]
+        index = bisect_left(order, entry)
+        if index < len(order) and order[index] == entry:
+            del order[index]
+
+    def _sort_keys(self, business):
+        # Using .get() with a default empty string to handle missing keys gracefully
+        return {field: (business.get(field) or '').lower() for field in self.fields}
+
+
+class OrderedResults:
+    """Lazily ordered sequence of the businesses in a result set.
+
+    Only the rows asked for are put in order: showing the first page of a
+    large result set is a top-K selection over the matches, and the full
+    order is produced only if someone pages deep enough to need it."""
+
+    def __init__(self, sort_index, lookup, field, reverse=False, ids=None, lock=None):
+        self.sort_index = sort_index
+        self.lookup = lookup # business ID -> business dict
+        self.field = field
+        self.reverse = reverse
+        self.ids = ids
+        self.lock = lock
+        self._length = len(sort_index) if ids is None else len(ids)
+        self._ordered = [] # Prefix of the ordered IDs computed so far
+        self._complete = False
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __iter__(self):
+        self._ensure(self._length)
+        return iter(self._rows(self._ordered))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            self._ensure(stop)
+            return self._rows(self._ordered[start:stop:step])
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        self._ensure(index + 1)
+        return self._rows([self._ordered[index]])[0]
+
+    def _ensure(self, count):
+        """Makes sure at least the first count IDs are ordered."""
+        if self._complete or count <= len(self._ordered):
+            return
+        # Past the first quarter a full ordering is cheaper than repeated top-K selections
+        limit = count if count * 4 < self._length else None
+        with self.lock if self.lock is not None else nullcontext():
+            if self._complete or count <= len(self._ordered):
+                return # Another thread (e.g. a page fetch) got there first
+            ordered = self.sort_index.ordered_ids(self.field, self.reverse, self.ids, limit)
+            # Rows deleted since the search may shorten it; a longer prefix already shown stays
+            if len(ordered) > len(self._ordered) or limit is None:
+                self._ordered = ordered
+                self._complete = limit is None
+
+    def _rows(self, ids):
+        rows = (self.lookup(business_id) for business_id in ids)
+        # A business deleted since the search simply drops out of the page
+        return [row for row in rows if row is not None]
@@ -0,0 +1,424 @@
+import math
+import sqlite3
+import os
+import threading
+
+from data_manager import DataLoadError, DataManager, EXPECTED_HEADERS
+from geo_index import EARTH_RADIUS_KM, bounding_boxes, haversine_km, parse_coordinates
+from metrics import metrics
+from reporting import MessageBoxReporter
+from search_engine import FIELD_WEIGHTS, normalize, GRAM_SIZE
+
+# bm25() column weights, in businesses_fts column order
+BM25_WEIGHTS = ', '.join(str(FIELD_WEIGHTS[field]) for field in ('Name', 'Category', 'Description'))
+# Columns a search may be sorted by, mapped to the indexed expression used in ORDER BY
+SORT_COLUMNS = {'Name': 'Name COLLATE NOCASE', 'Category': 'Category COLLATE NOCASE'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    rowid INTEGER PRIMARY KEY,
+    ID TEXT NOT NULL UNIQUE,
+    Name TEXT NOT NULL DEFAULT '',
+    Category TEXT NOT NULL DEFAULT '',
+    Address TEXT NOT NULL DEFAULT '',
+    Phone TEXT NOT NULL DEFAULT '',
+    Website TEXT NOT NULL DEFAULT '',
+    Hours TEXT NOT NULL DEFAULT '',
+    Description TEXT NOT NULL DEFAULT '',
+    Latitude TEXT NOT NULL DEFAULT '',
+    Longitude TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS businesses_name ON businesses (Name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS businesses_category ON businesses (Category COLLATE NOCASE);
+
+-- Trigram tokenizer so MATCH answers the same substring queries as the search box
+CREATE VIRTUAL TABLE IF NOT EXISTS businesses_fts USING fts5(
+    Name, Category, Description,
+    content='businesses', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS businesses_ai AFTER INSERT ON businesses BEGIN
+    INSERT INTO businesses_fts (rowid, Name, Category, Description)
+    VALUES (new.rowid, new.Name, new.Category, new.Description);
+END;
+CREATE TRIGGER IF NOT EXISTS businesses_ad AFTER DELETE ON businesses BEGIN
+    INSERT INTO businesses_fts (businesses_fts, rowid, Name, Category, Description)
+    VALUES ('delete', old.rowid, old.Name, old.Category, old.Description);
+END;
+CREATE TRIGGER IF NOT EXISTS businesses_au AFTER UPDATE ON businesses BEGIN
+    INSERT INTO businesses_fts (businesses_fts, rowid, Name, Category, Description)
+    VALUES ('delete', old.rowid, old.Name, old.Category, old.Description);
+    INSERT INTO businesses_fts (rowid, Name, Category, Description)
+    VALUES (new.rowid, new.Name, new.Category, new.Description);
+END;
+"""
+
+# Rows fetched per query when iterating over a whole result set
+ITER_BATCH_SIZE = 1000
+
+# R*Tree over valid coordinates only; maintained from Python, which validates them
+GEO_SCHEMA = """
+CREATE VIRTUAL TABLE businesses_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+"""
+
+class SQLiteResults:
+    """Read-only, lazily fetched sequence of business dicts for one query.
+
+    Supports len(), indexing, slicing and iteration, which is all the results
+    view needs, so a page of results is a single LIMIT/OFFSET query and the
+    full result set is never materialized in Python."""
+
+    def __init__(self, connection, lock, where='', params=(), order_by='businesses.rowid', joins=''):
+        self.connection = connection
+        self.lock = lock
+        self.where = where
+        self.params = tuple(params)
+        self.order_by = order_by
+        self.joins = joins # e.g. " JOIN businesses_fts ON ...", for ordering by its bm25()
+        self._length = None
+        self._page = (None, None, None) # (start, stop, rows) of the last slice fetched
+
+    def _select(self, columns, suffix='', extra_params=()):
+        sql = f"SELECT {columns} FROM businesses{self.joins}"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        with self.lock:
+            return self.connection.execute(sql + suffix, self.params + tuple(extra_params)).fetchall()
+
+    def __len__(self):
+        if self._length is None:
+            self._length = self._select("COUNT(*)")[0][0]
+        return self._length
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        # Fetched a page at a time so the lock is never held while the caller works
+        start = 0
+        while True:
+            rows = self[start:start + ITER_BATCH_SIZE]
+            yield from rows
+            if len(rows) < ITER_BATCH_SIZE:
+                return
+            start += ITER_BATCH_SIZE
+
+    def __getitem__(self, index):
+        # Qualified, since a joined businesses_fts has Name, Category and Description too
+        columns = ', '.join(f"businesses.{header}" for header in EXPECTED_HEADERS)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("SQLiteResults only supports contiguous slices")
+            cached_start, cached_stop, cached_rows = self._page
+            if (start, stop) == (cached_start, cached_stop):
+                return list(cached_rows)
+            rows = self._select(columns, f" ORDER BY {self.order_by} LIMIT ? OFFSET ?", (max(0, stop - start), start))
+            rows = [dict(zip(EXPECTED_HEADERS, row)) for row in rows]
+            self._page = (start, stop, rows)
+            return list(rows)
+        if index < 0:
+            index += len(self)
+        cached_start, cached_stop, cached_rows = self._page
+        if cached_start is not None and cached_start <= index < cached_stop:
+            return cached_rows[index - cached_start]
+        rows = self._select(columns, f" ORDER BY {self.order_by} LIMIT 1 OFFSET ?", (index,))
+        if not rows:
+            raise IndexError(index)
+        return dict(zip(EXPECTED_HEADERS, rows[0]))
+
+
+class SQLiteDataManager:
+    """DataManager backed by a local SQLite database instead of a CSV file.
+
+    Matching runs against an FTS5 trigram table, sorting uses ordinary
+    indexes on Name and Category, and every add, update or delete touches a
+    single row. Rows are handed to the app as the same dicts DataManager
+    returns."""
+
+    def __init__(self, filename='businesses.db', reporter=None):
+        self.filename = filename
+        self.reporter = reporter if reporter is not None else MessageBoxReporter()
+        self.expected_headers = list(EXPECTED_HEADERS)
+        self.connection = None
+        # The connection is shared with the search worker thread, one statement at a time
+        self.lock = threading.RLock()
+        # Opening the database never parses the data, so there is no partial state to report
+        self.loading = False
+        self.load_warning = None
+
+    def load_business_data(self, on_progress=None):
+        """Opens (creating if needed) the database.
+        Returns a lazy sequence over all businesses, or None on critical error."""
+        try:
+            return self.stream_business_data(on_progress)
+        except DataLoadError as e:
+            self.reporter.error(e.title, str(e))
+            return None # Indicate critical error
+
+    def stream_business_data(self, on_progress=None):
+        """Same as load_business_data(), but raises DataLoadError instead of going through
+        the reporter, so it can run on a background thread like DataManager's."""
+        try:
+            with self.lock, metrics.span('load', file=self.filename):
+                if self.connection is None:
+                    self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+                    self.connection.create_function('distance_km', 4, _distance_km, deterministic=True)
+                    self.connection.executescript(SCHEMA)
+                    self._ensure_geo_table()
+        except Exception as e:
+            raise DataLoadError("Load Error", f"An error occurred while opening the database '{self.filename}': {e}") from e
+        if on_progress is not None:
+            size = os.path.getsize(self.filename)
+            on_progress(size, size)
+        return SQLiteResults(self.connection, self.lock)
+
+    def save_business_data(self, businesses_list):
+        """Replaces every row in the database with businesses_list in one transaction."""
+        columns = ', '.join(self.expected_headers)
+        placeholders = ', '.join('?' for _ in self.expected_headers)
+        try:
+            with self.lock, self.connection, metrics.span('save', file=self.filename):
+                self.connection.execute("DELETE FROM businesses")
+                self.connection.execute("DELETE FROM businesses_geo")
+                self.connection.executemany(
+                    f"INSERT OR REPLACE INTO businesses ({columns}) VALUES ({placeholders})",
+                    (self._values(b) for b in businesses_list))
+                self._index_all_coordinates()
+            return True
+        except Exception as e:
+            self.reporter.error("Save Error", f"An error occurred while saving data to '{self.filename}': {e}")
+            return False
+
+    def add_business(self, business):
+        """Inserts a single business."""
+        return self._report(self.apply_changes([('add', business)]))
+
+    def add_businesses(self, businesses):
+        """Inserts many businesses in a single transaction; existing IDs are updated instead."""
+        try:
+            with self.lock, self.connection:
+                for business in businesses:
+                    self._insert(business)
+            return True
+        except Exception as e:
+            self.reporter.error("Save Error", f"An error occurred while saving data to '{self.filename}': {e}")
+            return False
+
+    def update_business(self, business):
+        """Updates the business with the same ID in place."""
+        return self._report(self.apply_changes([('update', business)]))
+
+    def delete_business(self, business_id):
+        """Deletes the business with the given ID."""
+        return self._report(self.apply_changes([('delete', business_id)]))
+
+    def apply_changes(self, changes):
+        """Same as DataManager.apply_changes(): applies ('add', business), ('update', business)
+        and ('delete', ID) changes in order, in a single transaction. Returns None or a
+        (title, message) error per change. Each change runs in its own savepoint, so one
+        that fails is rolled back alone; if the transaction itself fails, none is applied."""
+        apply = {'add': self._insert, 'update': self._update, 'delete': self._delete}
+        for op, _ in changes:
+            if op not in apply:
+                raise ValueError(f"Unknown change '{op}'; expected add, update or delete")
+        try:
+            with self.lock, self.connection:
+                if not self.connection.in_transaction:
+                    # Opened explicitly: releasing the first savepoint would otherwise commit it on its own
+                    self.connection.execute("BEGIN")
+                errors = [self._apply_change(apply[op], value) for op, value in changes]
+        except Exception as e:
+            error = ("Save Error", f"An error occurred while saving data to '{self.filename}': {e}")
+            return [error] * len(changes)
+        return errors
+
+    def _apply_change(self, apply, value):
+        """Runs one change of a batch inside a savepoint. Returns None or a (title, message) error."""
+        self.connection.execute("SAVEPOINT change")
+        try:
+            error = apply(value)
+        except sqlite3.Error as e:
+            self.connection.execute("ROLLBACK TO change")
+            error = ("Save Error", f"An error occurred while saving data to '{self.filename}': {e}")
+        self.connection.execute("RELEASE change")
+        return error
+
+    def _report(self, errors):
+        """Shows the error of a one-change batch, if any. Returns True if the change was applied."""
+        if errors[0] is not None:
+            self.reporter.error(*errors[0])
+            return False
+        return True
+
+    def _insert(self, business):
+        """Adds a business; one with an existing ID is updated instead, as DataManager does."""
+        if self.connection.execute("SELECT 1 FROM businesses WHERE ID = ?", (business.get('ID'),)).fetchone():
+            return self._update(business)
+        columns = ', '.join(self.expected_headers)
+        placeholders = ', '.join('?' for _ in self.expected_headers)
+        cursor = self.connection.execute(f"INSERT INTO businesses ({columns}) VALUES ({placeholders})",
+                                         self._values(business))
+        self._index_coordinates(cursor.lastrowid, business)
+
+    def _update(self, business):
+        fields = [header for header in self.expected_headers if header != 'ID']
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        row = self.connection.execute("SELECT rowid FROM businesses WHERE ID = ?", (business.get('ID'),)).fetchone()
+        if row is None:
+            return ("Error", "Could not find business to edit.")
+        self.connection.execute(f"UPDATE businesses SET {assignments} WHERE rowid = ?",
+                                [business.get(field, '') for field in fields] + [row[0]])
+        self._index_coordinates(row[0], business)
+
+    def _delete(self, business_id):
+        row = self.connection.execute("SELECT rowid FROM businesses WHERE ID = ?", (business_id,)).fetchone()
+        if row is None:
+            return ("Error", "Could not find business to delete.")
+        self.connection.execute("DELETE FROM businesses_geo WHERE id = ?", (row[0],))
+        self.connection.execute("DELETE FROM businesses WHERE rowid = ?", (row[0],))
+
+    def get_business(self, business_id):
+        """Returns the business with the given ID, or None."""
+        results = SQLiteResults(self.connection, self.lock, "ID = ?", (business_id,))
+        return results[0] if results else None
+
+    def search(self, query, sort_key='Name', reverse=False, near=None, radius_km=None, nearest=None):
+        """Returns a lazy, sorted sequence of businesses whose Name, Category or
+        Description contains query (case-insensitive).
+
+        near, radius_km, nearest and the 'Distance' sort key behave as in
+        DataManager.search; the R*Tree narrows the rows before any distance
+        is computed. The SQL itself only runs once the results are counted or sliced."""
+        metrics.count('search.queries')
+        with metrics.span('search.match'):
+            return self._build_search(normalize(query), sort_key, reverse, near, radius_km, nearest)
+
+    def _build_search(self, query, sort_key, reverse, near, radius_km, nearest):
+        """Turns a normalized search into a lazy SQLiteResults; runs the R*Tree count queries
+        of a nearest search on the way."""
+        clauses, params = self._text_filter(query)
+        if near is not None and radius_km is not None:
+            geo_clause, geo_params = self._radius_filter(near, radius_km)
+            clauses.append(geo_clause)
+            params.extend(geo_params)
+        if near is not None and nearest is not None:
+            geo_clause, geo_params = self._nearest_filter(near, nearest, clauses, params)
+            clauses.append(geo_clause)
+            params.extend(geo_params)
+
+        joins = ''
+        if sort_key == 'Distance' and near is not None:
+            distance = f"distance_km(Latitude, Longitude, {float(near[0])!r}, {float(near[1])!r})"
+            # Businesses without coordinates (NULL distance) go last
+            order_by = f"{distance} IS NULL, {distance}, businesses.rowid"
+        elif sort_key == 'Relevance' and len(query) >= GRAM_SIZE:
+            # FTS5's own BM25 with the same field weights; lower bm25() values are better matches.
+            # The FTS table is joined once, so matching and scoring are one pass over the matches,
+            # and its MATCH replaces the text filter. Unlike the CSV backend, misspelled words are
+            # not matched here.
+            joins = " JOIN businesses_fts ON businesses_fts.rowid = businesses.rowid"
+            clauses[0] = "businesses_fts MATCH ?"
+            order_by = f"bm25(businesses_fts, {BM25_WEIGHTS}), businesses.rowid"
+        else:
+            order_by = f"businesses.{SORT_COLUMNS.get(sort_key, SORT_COLUMNS['Name'])}"
+            # rowid keeps ties in insertion order, like Python's stable sort
+            order_by = f"{order_by} {'DESC' if reverse else 'ASC'}, businesses.rowid"
+        where = " AND ".join(f"({clause})" for clause in clauses)
+        return SQLiteResults(self.connection, self.lock, where, params, order_by, joins)
+
+    def _text_filter(self, query):
+        """Returns ([where clause], [params]) for the text part of a search."""
+        if not query:
+            return [], []
+        if len(query) >= GRAM_SIZE:
+            return ["businesses.rowid IN (SELECT rowid FROM businesses_fts WHERE businesses_fts MATCH ?)"], [self._phrase(query)]
+        # Shorter than a trigram, so FTS5 cannot help; these match most rows anyway
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        where = " OR ".join(f"businesses.{field} LIKE ? ESCAPE '\\'" for field in ('Name', 'Category', 'Description'))
+        return [where], [pattern] * 3
+
+    def _phrase(self, query):
+        """Quotes query as an FTS5 phrase, so it matches as a plain substring."""
+        return '"' + query.replace('"', '""') + '"'
+
+    def _radius_filter(self, near, radius_km):
+        """Returns (where clause, params) keeping businesses within radius_km of near."""
+        boxes = bounding_boxes(near[0], near[1], radius_km)
+        box_sql = " OR ".join("(max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)" for _ in boxes)
+        where = (f"businesses.rowid IN (SELECT id FROM businesses_geo WHERE {box_sql}) "
+                 f"AND distance_km(Latitude, Longitude, ?, ?) <= ?")
+        params = [value for box in boxes for value in box] + [near[0], near[1], radius_km]
+        return where, params
+
+    def _nearest_filter(self, near, count, clauses, params):
+        """Returns (where clause, params) keeping the count businesses nearest to near
+        that also satisfy the other clauses. The radius doubles until enough are inside."""
+        radius = 5.0
+        while True:
+            geo_clause, geo_params = self._radius_filter(near, radius)
+            where = " AND ".join(f"({clause})" for clause in clauses + [geo_clause])
+            with self.lock:
+                found = self.connection.execute(f"SELECT COUNT(*) FROM businesses WHERE {where}",
+                                                params + geo_params).fetchone()[0]
+            if found >= count or radius >= math.pi * EARTH_RADIUS_KM:
+                break
+            radius *= 2
+        distance = f"distance_km(Latitude, Longitude, {float(near[0])!r}, {float(near[1])!r})"
+        return (f"businesses.rowid IN (SELECT rowid FROM businesses WHERE {where} ORDER BY {distance} LIMIT ?)",
+                params + geo_params + [count])
+
+    def _ensure_geo_table(self):
+        """Creates the R*Tree on first use, backfilling it from existing rows."""
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'businesses_geo'").fetchone()
+        if not exists:
+            with self.connection:
+                self.connection.executescript(GEO_SCHEMA)
+                self._index_all_coordinates()
+
+    def _index_all_coordinates(self):
+        entries = []
+        for rowid, latitude, longitude in self.connection.execute(
+                "SELECT rowid, Latitude, Longitude FROM businesses").fetchall():
+            point = parse_coordinates({'Latitude': latitude, 'Longitude': longitude})
+            if point is not None: # Blank or malformed coordinates are skipped
+                entries.append((rowid, point[0], point[0], point[1], point[1]))
+        self.connection.executemany("INSERT INTO businesses_geo VALUES (?, ?, ?, ?, ?)", entries)
+
+    def _index_coordinates(self, rowid, business):
+        """Replaces the R*Tree entry for one row; blank or malformed coordinates are skipped."""
+        self.connection.execute("DELETE FROM businesses_geo WHERE id = ?", (rowid,))
+        point = parse_coordinates(business)
+        if point is not None:
+            lat, lon = point
+            self.connection.execute("INSERT INTO businesses_geo VALUES (?, ?, ?, ?, ?)", (rowid, lat, lat, lon, lon))
+
+    def _values(self, business):
+        return tuple(business.get(header, '') or '' for header in self.expected_headers)
+
+
+def _distance_km(latitude, longitude, lat, lon):
+    """SQL function: distance from a row's Latitude/Longitude text to a point, or NULL if malformed."""
+    point = parse_coordinates({'Latitude': latitude, 'Longitude': longitude})
+    if point is None:
+        return None
+    return haversine_km(lat, lon, point[0], point[1])
+
+
+def migrate_from_csv(csv_filename='businesses.csv', db_filename='businesses.db', overwrite=False, reporter=None):
+    """One-shot import of a CSV directory (including its journal) into a SQLite database.
+    Returns the number of migrated businesses, or None on error."""
+    reporter = reporter if reporter is not None else MessageBoxReporter()
+    if os.path.exists(db_filename):
+        if not overwrite:
+            reporter.error("Migration Error", f"'{db_filename}' already exists; refusing to overwrite it.")
+            return None
+        os.remove(db_filename)
+    businesses = DataManager(csv_filename, reporter).load_business_data()
+    if businesses is None:
+        return None
+    sqlite_manager = SQLiteDataManager(db_filename, reporter)
+    if sqlite_manager.load_business_data() is None or not sqlite_manager.save_business_data(businesses):
+        return None
+    sqlite_manager.connection.close()
+    return len(businesses)
@@ -0,0 +1,87 @@
+# test_cli.py
+import csv
+import json
+
+import pytest
+
+import cli
+from data_manager import EXPECTED_HEADERS
+
+
+def business(business_id, name, address, **fields):
+    row = dict.fromkeys(EXPECTED_HEADERS, '')
+    row.update({'ID': business_id, 'Name': name, 'Category': 'Cafe', 'Address': address}, **fields)
+    return row
+
+
+def write_csv(path, businesses):
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        writer.writerows(businesses)
+
+
+def run(capsys, *argv):
+    """Runs the CLI and returns its exit code and the JSON lines it printed."""
+    code = cli.main(list(argv))
+    return code, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.fixture
+def data_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # Away from any settings.ini
+    path = tmp_path / 'businesses.csv'
+    write_csv(path, [business('a', 'Sai Cafe', '1 Main Road')])
+    return path
+
+
+IMPORTED = [
+    business('a', 'Other Cafe', '2 Main Road'),         # ID already stored
+    business('b', 'SAI CAFE', ' 1 main road'),          # Name and Address already stored
+    business('c', 'Shree Cafe', '3 Main Road'),
+    business('d', 'Shree Cafe', '3 MAIN ROAD'),         # Same as the row above
+    business('c', 'Another Cafe', '4 Main Road'),       # ID used earlier in the file
+    business('', 'Cafe Without ID', '5 Main Road'),
+    business('e', 'No Category', '6 Main Road', Category=''),
+    business('f', 'Far Away', '7 Main Road', Latitude='123', Longitude='73.3'),
+]
+
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_import_skips_duplicates_and_invalid_rows(capsys, tmp_path, data_file, workers):
+    write_csv(tmp_path / 'import.csv', IMPORTED)
+    code, output = run(capsys, '--data', str(data_file), 'import', 'import.csv', '--workers', workers)
+    assert code == 0
+    stats = output[0]
+    del stats['seconds']
+    assert stats == {'read': 8, 'imported': 2, 'invalid': 2, 'duplicates': 4}
+
+    code, output = run(capsys, '--data', str(data_file), 'query', '--limit', '0')
+    names = [b['Name'] for b in output[0]['results']]
+    assert names == ['Cafe Without ID', 'Sai Cafe', 'Shree Cafe']
+    assert all(b['ID'] for b in output[0]['results'])
+    # Importing the same file again adds nothing
+    code, output = run(capsys, '--data', str(data_file), 'import', 'import.csv', '--workers', workers)
+    assert output[0]['imported'] == 0 and output[0]['duplicates'] == 6
+
+
+def test_jsonl_import_and_export_round_trip(capsys, tmp_path, data_file):
+    lines = [json.dumps(b) for b in IMPORTED[2:4]] + ['{not json', json.dumps({'Name': 'Gym', 'Category': 'Gym',
+                                                                              'Address': '8 Main Road', 'Latitude': 16.99,
+                                                                              'Longitude': 73.31})]
+    (tmp_path / 'import.jsonl').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    code, output = run(capsys, '--data', str(data_file), 'import', 'import.jsonl', '--workers', '1')
+    assert code == 0 and output[0]['imported'] == 2 and output[0]['invalid'] == 1
+    assert output[0]['duplicates'] == 1
+
+    code, output = run(capsys, '--data', str(data_file), 'export', 'out.jsonl', '--query', 'cafe')
+    assert output == [{'exported': 2, 'file': 'out.jsonl'}]
+    exported = [json.loads(line) for line in (tmp_path / 'out.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert [b['Name'] for b in exported] == ['Sai Cafe', 'Shree Cafe']
+    code, output = run(capsys, '--data', str(data_file), 'query', 'gym')
+    assert output[0]['results'][0]['Latitude'] == '16.99'
+
+
+def test_missing_import_file_fails(capsys, data_file):
+    code, output = run(capsys, '--data', str(data_file), 'import', 'missing.csv')
+    assert code == 1 and output == []
@@ -0,0 +1,89 @@
+# test_journal.py
+import csv
+import os
+
+import pytest
+
+import data_manager as data_manager_module
+from data_manager import EXPECTED_HEADERS, DataLoadError, DataManager
+from reporting import LoggingReporter
+
+
+def business(business_id, name):
+    return dict(dict.fromkeys(EXPECTED_HEADERS, ''), ID=business_id, Name=name, Category='Cafe')
+
+
+def load(path):
+    data_manager = DataManager(str(path), LoggingReporter())
+    data_manager.stream_business_data()
+    return data_manager
+
+
+def names(data_manager):
+    return [b['Name'] for b in data_manager.search('', 'Name')]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'businesses.csv'
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        writer.writerows([business('a', 'Alpha'), business('b', 'Bravo')])
+    return path
+
+
+def journal(path):
+    return path.with_name(path.name + '.journal')
+
+
+def test_changes_are_journaled_and_replayed(path):
+    data_manager = load(path)
+    csv_bytes = path.read_bytes()
+    assert data_manager.add_business(business('c', 'Charlie'))
+    assert data_manager.update_business(business('a', 'Alpha 2'))
+    assert data_manager.delete_business('b')
+    assert path.read_bytes() == csv_bytes # Only the journal was written
+    assert len(journal(path).read_text(encoding='utf-8').splitlines()) == 3
+    for _ in range(2): # From the CSV, then from its snapshot
+        assert names(load(path)) == ['Alpha 2', 'Charlie']
+    assert load(path).compact()
+    assert not journal(path).exists()
+    assert names(load(path)) == ['Alpha 2', 'Charlie']
+
+
+def test_torn_final_record_is_dropped(path):
+    data_manager = load(path)
+    assert data_manager.add_business(business('c', 'Charlie'))
+    complete = journal(path).read_bytes()
+    with open(journal(path), mode='ab') as file:
+        file.write(b'{"op": "add", "row": {"ID": "d", "Na') # A crash mid-append
+    data_manager = load(path)
+    assert names(data_manager) == ['Alpha', 'Bravo', 'Charlie']
+    # The tail is cut off, so the next change starts on a clean line
+    assert journal(path).read_bytes() == complete
+    assert data_manager.add_business(business('e', 'Echo'))
+    assert names(load(path)) == ['Alpha', 'Bravo', 'Charlie', 'Echo']
+
+
+def test_damaged_record_refuses_the_load_and_keeps_the_journal(path):
+    data_manager = load(path)
+    assert data_manager.add_business(business('c', 'Charlie'))
+    with open(journal(path), mode='ab') as file:
+        file.write(b'not json\n')
+    assert data_manager.add_business(business('d', 'Delta'))
+    damaged = journal(path).read_bytes()
+    with pytest.raises(DataLoadError, match='line 2'):
+        load(path)
+    assert journal(path).read_bytes() == damaged
+    # The app's loader reports it instead of raising
+    assert DataManager(str(path), LoggingReporter()).load_business_data() is None
+
+
+def test_large_journal_is_compacted(path, monkeypatch):
+    monkeypatch.setattr(data_manager_module, 'COMPACT_MIN_BYTES', 1000)
+    data_manager = load(path)
+    for i in range(20):
+        assert data_manager.add_business(business(f"id-{i}", f"Cafe {i:02}"))
+    assert os.path.getsize(journal(path)) < 1000
+    assert len(names(load(path))) == 22
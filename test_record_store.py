@@ -0,0 +1,80 @@
+# test_record_store.py
+import csv
+import math
+
+from data_manager import DataManager
+from record_store import RecordStore
+from reporting import LoggingReporter
+
+HEADERS = ('ID', 'Name', 'Category', 'Latitude', 'Longitude')
+
+
+def write_csv(path, header, rows):
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def load(path):
+    data_manager = DataManager(str(path), LoggingReporter())
+    data_manager.stream_business_data()
+    return data_manager
+
+
+def test_lookup_update_and_delete_by_id():
+    store = RecordStore(HEADERS)
+    store.extend_values([['a', 'Cafe A', 'Cafe', '17.5', ''], ['b', 'Gym B', 'Gym', 'abc', '73.1800']])
+    assert dict(store.get('a')) == {'ID': 'a', 'Name': 'Cafe A', 'Category': 'Cafe', 'Latitude': '17.5', 'Longitude': ''}
+    # Coordinates keep their exact text, and parse to NaN when blank or malformed
+    assert store.get('b')['Latitude'] == 'abc' and store.get('b')['Longitude'] == '73.1800'
+    lat, lon = store.get('a').point()
+    assert lat == 17.5 and math.isnan(lon)
+    assert math.isnan(store.get('b').point()[0]) and store.get('b').point()[1] == 73.18
+    store.update({'ID': 'a', 'Name': 'Cafe A2', 'Category': 'Cafe'})
+    assert store.get('a')['Name'] == 'Cafe A2'
+    assert store.delete('b') and not store.delete('b')
+    assert store.get('b') is None and len(store) == 1 and store.tombstones == 1
+    assert [b['ID'] for b in store] == ['a']
+
+
+def test_extend_values_upserts_repeated_ids_unless_given_new_ones():
+    store = RecordStore(HEADERS)
+    store.extend_values([['a', 'One', '', '', ''], ['a', 'Two', '', '', '']])
+    assert len(store) == 1 and store.get('a')['Name'] == 'Two'
+    store.extend_values([['a', 'Three', '', '', ''], ['', 'Four', '', '', '']], lambda i: f"new-{i}")
+    assert [b['Name'] for b in store] == ['Two', 'Three', 'Four']
+    assert store.get('new-1')['Name'] == 'Four'
+
+
+def test_rows_without_an_id_column_are_all_kept(tmp_path):
+    path = tmp_path / 'businesses.csv'
+    write_csv(path, ('Name', 'Category', 'Address', 'Phone'), [(f"Cafe {i}", 'Cafe', 'A', '') for i in range(50)])
+    data_manager = load(path)
+    assert len(data_manager.search('', 'Name')) == 50
+    assert '50 row(s)' in data_manager.load_warning
+    ids = {b['ID'] for b in data_manager.search('', 'Name')}
+    assert len(ids) == 50 and '' not in ids
+    # The same file always gets the same IDs, so journaled edits find their rows again
+    business = dict(data_manager.get_business(sorted(ids)[0]))
+    business['Name'] = 'Edited'
+    assert data_manager.update_business(business)
+    data_manager = load(path)
+    assert {b['ID'] for b in data_manager.search('', 'Name')} == ids
+    assert data_manager.get_business(business['ID'])['Name'] == 'Edited'
+    # Compaction writes the IDs into the CSV instead of dropping rows
+    assert data_manager.compact()
+    path.with_name(path.name + '.snapshot').unlink(missing_ok=True)
+    data_manager = load(path)
+    assert {b['ID'] for b in data_manager.search('', 'Name')} == ids
+    assert data_manager.load_warning is None
+
+
+def test_rows_sharing_an_id_are_kept_apart(tmp_path):
+    path = tmp_path / 'businesses.csv'
+    write_csv(path, ('ID', 'Name', 'Category', 'Address', 'Phone'),
+              [(f"id-{i % 10}", f"Cafe {i}", 'Cafe', 'A', '') for i in range(50)])
+    data_manager = load(path)
+    assert sorted(b['Name'] for b in data_manager.search('', 'Name')) == sorted(f"Cafe {i}" for i in range(50))
+    # The first row with an ID keeps it
+    assert data_manager.get_business('id-3')['Name'] == 'Cafe 3'
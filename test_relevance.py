@@ -0,0 +1,75 @@
+# test_relevance.py
+import csv
+
+from data_manager import EXPECTED_HEADERS, DataManager
+from reporting import LoggingReporter
+from search_engine import edit_distance
+
+
+def business(business_id, name, category='', description=''):
+    row = dict.fromkeys(EXPECTED_HEADERS, '')
+    row.update({'ID': business_id, 'Name': name, 'Category': category, 'Description': description})
+    return row
+
+
+def load(tmp_path, businesses):
+    path = tmp_path / 'businesses.csv'
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        writer.writerows(businesses)
+    data_manager = DataManager(str(path), LoggingReporter())
+    data_manager.stream_business_data()
+    return data_manager
+
+
+def ranked(data_manager, query):
+    return [b['ID'] for b in data_manager.search(query, 'Relevance')]
+
+
+def test_name_hits_outrank_description_hits(tmp_path):
+    data_manager = load(tmp_path, [
+        business('store', 'Corner Store', 'Grocery Store', 'Also has a pharmacy counter.'),
+        business('sai', 'Sai Pharmacy', 'Pharmacy', 'Medicines.'),
+        business('gym', 'Iron Gym', 'Gym'),
+    ])
+    assert ranked(data_manager, 'pharmacy') == ['sai', 'store']
+    # Equal scores keep load order
+    data_manager.add_business(business('sai2', 'Sai Pharmacy', 'Pharmacy', 'Medicines.'))
+    assert ranked(data_manager, 'pharmacy') == ['sai', 'sai2', 'store']
+
+
+def test_misspelled_and_partial_words_still_match(tmp_path):
+    data_manager = load(tmp_path, [
+        business('sai', 'Sai Pharmacy', 'Pharmacy'),
+        business('shree', 'Shree Medicals', 'Pharmacy'),
+        business('cafe', 'Sai Cafe', 'Cafe'),
+    ])
+    assert ranked(data_manager, 'pharmcy') == ['sai', 'shree']
+    assert ranked(data_manager, 'pharm') == ['sai', 'shree']
+    assert ranked(data_manager, 'medcals') == ['shree']
+    # Every word has to match somewhere
+    assert ranked(data_manager, 'sai pharmcy') == ['sai']
+    assert ranked(data_manager, 'xyzzy') == []
+    # Exact matching is unchanged for the other sort orders
+    assert len(data_manager.search('pharmcy', 'Name')) == 0
+
+
+def test_queries_without_words_match_as_in_other_sort_orders(tmp_path):
+    data_manager = load(tmp_path, [
+        business('a', 'A-1 Cafe', 'Cafe'),
+        business('b', 'Gym', 'Gym', 'Open 24 hours - every day.'),
+        business('c', 'Sai Bakery', 'Bakery'),
+    ])
+    for query in ('-', ' - ', '.', '24 - '):
+        expected = {b['ID'] for b in data_manager.search(query, 'Name')}
+        assert set(ranked(data_manager, query)) == expected, query
+    # A hit in Name outranks one in Description
+    assert ranked(data_manager, '-') == ['a', 'b']
+
+
+def test_edit_distance_stops_at_the_limit():
+    assert edit_distance('pharmacy', 'pharmcy', 2) == 1
+    assert edit_distance('cafe', 'cake', 1) == 1
+    assert edit_distance('abc', 'xyz', 1) == 2
+    assert edit_distance('gym', 'gymnasium', 2) == 3
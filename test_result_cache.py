@@ -0,0 +1,64 @@
+# test_result_cache.py
+import csv
+
+from data_manager import EXPECTED_HEADERS, DataManager
+from reporting import LoggingReporter
+from result_cache import ResultCache
+
+NAMES = ('Sai Cafe', 'Cafe Mocha', 'Cake Shop', 'Scale Gym', 'Shree Bakery', 'Oscar Cafe', 'Decal Works')
+
+
+def load(tmp_path):
+    path = tmp_path / 'businesses.csv'
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        for i, name in enumerate(NAMES * 3):
+            writer.writerow(dict(dict.fromkeys(EXPECTED_HEADERS, ''), ID=f"id-{i}", Name=name))
+    data_manager = DataManager(str(path), LoggingReporter())
+    data_manager.stream_business_data()
+    return data_manager
+
+
+def names(results):
+    return [b['Name'] for b in results]
+
+
+def test_candidates_come_from_shorter_queries_of_the_same_version():
+    cache = ResultCache()
+    cache.put_matches(1, 'ca', {'a', 'b', 'c'})
+    cache.put_matches(1, 'caf', {'a', 'b'})
+    cache.put_matches(0, 'cafe', {'a'})
+    assert cache.candidates(1, 'cafe') == {'a', 'b'} # The smallest superset
+    assert cache.candidates(1, 'ca') is None # Only strictly shorter queries count
+    assert cache.candidates(2, 'cafe') is None
+    assert cache.refinements == 1
+
+
+def test_entries_stay_within_the_id_budget():
+    cache = ResultCache(max_results=4, max_ids=10)
+    cache.put_matches(1, 'a', set(range(6)))
+    cache.put_matches(1, 'b', set(range(6)))
+    assert cache.matches(1, 'a') is None and cache.matches(1, 'b') is not None
+    cache.put_matches(1, 'c', set(range(11))) # Larger than the whole budget: not kept
+    assert cache.matches(1, 'c') is None and cache.stats()['cached_ids'] == 6
+
+
+def test_extended_queries_refine_cached_matches(tmp_path):
+    data_manager = load(tmp_path)
+    fresh = load(tmp_path)
+    for query in ('c', 'ca', 'cal', 'ca', 'caf', 'cafe', 'cafe m', 'e'):
+        fresh.result_cache.clear() # Always matched from scratch
+        assert names(data_manager.search(query, 'Name')) == names(fresh.search(query, 'Name')), query
+    assert data_manager.result_cache.refinements >= 4
+
+
+def test_changes_invalidate_cached_matches(tmp_path):
+    data_manager = load(tmp_path)
+    assert len(data_manager.search('caf', 'Name')) == 9
+    assert len(data_manager.search('cafe', 'Name')) == 9
+    assert data_manager.add_business(dict(dict.fromkeys(EXPECTED_HEADERS, ''), ID='new', Name='Cafe Nova'))
+    assert data_manager.delete_business('id-0')
+    assert len(data_manager.search('cafe', 'Name')) == 9
+    assert 'Cafe Nova' in names(data_manager.search('cafe n', 'Name'))
+    assert 'id-0' not in {b['ID'] for b in data_manager.search('caf', 'Name')}
@@ -0,0 +1,185 @@
+# test_search.py
+import csv
+import heapq
+import random
+
+import pytest
+
+from data_manager import EXPECTED_HEADERS, DataManager
+from geo_index import haversine_km, parse_coordinates
+from reporting import LoggingReporter
+
+# Small alphabets, so queries match often and sort keys tie often
+WORDS = ('sai', 'Sai', 'cafe', 'CAFE', 'shree', 'bakery', 'gym', 'é', 'a b', 'ab', 'ba')
+CATEGORIES = ('Cafe', 'cafe', 'Bakery', 'Gym', 'School', '')
+# Around Ratnagiri, with a few rows lacking usable coordinates
+CENTER = (16.99, 73.31)
+# Where distance queries are asked from
+POINTS = ((16.99, 73.31), (17.2, 73.0), (16.5, 74.0))
+SORT_KEYS = ('Name', 'Category', 'Address', 'Phone')
+
+
+def random_business(rng, business_id):
+    def text(words):
+        return ' '.join(rng.choice(WORDS) for _ in range(words))
+    lat = f"{CENTER[0] + rng.uniform(-0.5, 0.5):.6f}"
+    lon = f"{CENTER[1] + rng.uniform(-0.5, 0.5):.6f}"
+    lat, lon = rng.choice([(lat, lon)] * 6 + [('', ''), (lat, ''), ('abc', lon), ('73.1800', lon)])
+    return {'ID': business_id, 'Name': text(rng.randint(1, 3)), 'Category': rng.choice(CATEGORIES),
+            'Address': f"{rng.randint(1, 20)} Main Road", 'Phone': rng.choice(('', '9876543210', '02352')),
+            'Website': '', 'Hours': '', 'Description': text(rng.randint(0, 4)), 'Latitude': lat, 'Longitude': lon}
+
+
+def baseline_search(businesses, query, sort_key='Name', reverse=False):
+    """The linear scan and sort the app started out with."""
+    query = query.strip().lower()
+    found = [b for b in businesses
+             if query in b.get('Name', '').lower() or query in b.get('Category', '').lower()
+             or query in b.get('Description', '').lower()]
+    return sorted(found, key=lambda b: b.get(sort_key, '').lower(), reverse=reverse)
+
+
+def brute_force_distances(businesses, lat, lon):
+    """{ID: distance_km} for every business with usable coordinates."""
+    distances = {}
+    for b in businesses:
+        point = parse_coordinates(b)
+        if point is not None:
+            distances[b['ID']] = haversine_km(lat, lon, *point)
+    return distances
+
+
+def write_csv(path, businesses):
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        writer.writerows(businesses)
+
+
+def load(path):
+    data_manager = DataManager(str(path), LoggingReporter())
+    data_manager.stream_business_data()
+    return data_manager
+
+
+def random_changes(rng, data_manager, model, next_id, count):
+    """Applies count random adds, edits and deletes to data_manager and to model, a dict of
+    ID -> business kept in the order the baseline list would have. Returns the next free ID."""
+    for _ in range(count):
+        action = rng.random()
+        if action < 0.4 or not model:
+            business = random_business(rng, f"id-{next_id}")
+            next_id += 1
+            assert data_manager.add_business(business)
+            model[business['ID']] = business
+        elif action < 0.7:
+            business_id = rng.choice(list(model))
+            business = random_business(rng, business_id)
+            assert data_manager.update_business(business)
+            model[business_id] = business # Edited in place, as the list used to be
+        elif action < 0.9:
+            business_id = rng.choice(list(model))
+            assert data_manager.delete_business(business_id)
+            del model[business_id]
+        else:
+            # Delete and re-add the same ID: it goes to the end, like a new row
+            business_id = rng.choice(list(model))
+            assert data_manager.delete_business(business_id)
+            del model[business_id]
+            business = random_business(rng, business_id)
+            assert data_manager.add_business(business)
+            model[business_id] = business
+    return next_id
+
+
+def queries(rng, businesses):
+    """A mix of empty, whole-word, partial and missing queries."""
+    picked = ['', ' ', 'zzz', 'a b', 'É']
+    for _ in range(15):
+        name = rng.choice(businesses)['Name'] if businesses else 'sai'
+        start = rng.randrange(len(name))
+        picked.append(name[start:start + rng.randint(1, 5)])
+    return picked
+
+
+def check_matches_baseline(rng, data_manager, model):
+    businesses = list(model.values())
+    for business_id, business in model.items():
+        assert dict(data_manager.get_business(business_id)) == business
+    assert data_manager.get_business('missing') is None
+    for query in queries(rng, businesses):
+        for sort_key in SORT_KEYS:
+            for reverse in (False, True):
+                expected = [b['ID'] for b in baseline_search(businesses, query, sort_key, reverse)]
+                results = data_manager.search(query, sort_key, reverse)
+                assert len(results) == len(expected), (query, sort_key, reverse)
+                assert [b['ID'] for b in results] == expected, (query, sort_key, reverse)
+                # Lazy results also answer pages and single rows without a full pass
+                assert [b['ID'] for b in results[3:9]] == expected[3:9]
+                if expected:
+                    assert results[-1]['ID'] == expected[-1]
+
+
+def check_geo_matches_brute_force(rng, data_manager, model):
+    businesses = list(model.values())
+    for lat, lon in POINTS:
+        distances = brute_force_distances(businesses, lat, lon)
+        for radius_km in (0.5, 5, 20, 80):
+            expected = {i for i, d in distances.items() if d <= radius_km}
+            results = data_manager.search('', 'Name', near=(lat, lon), radius_km=radius_km)
+            assert {b['ID'] for b in results} == expected, radius_km
+            by_distance = data_manager.search('', 'Distance', near=(lat, lon), radius_km=radius_km)
+            assert [distances[b['ID']] for b in by_distance] == sorted(distances[i] for i in expected)
+        query = rng.choice(queries(rng, businesses))
+        matching = {b['ID'] for b in baseline_search(businesses, query)}
+        for count in (1, 5, 40, len(businesses) + 5):
+            closest = heapq.nsmallest(count, ((d, i) for i, d in distances.items()))
+            results = data_manager.search('', 'Distance', near=(lat, lon), nearest=count)
+            assert [(distances[b['ID']], b['ID']) for b in results] == closest, count
+            closest = heapq.nsmallest(count, ((d, i) for i, d in distances.items() if i in matching))
+            results = data_manager.search(query, 'Distance', near=(lat, lon), nearest=count)
+            assert sorted((distances[b['ID']], b['ID']) for b in results) == closest, (query, count)
+        # Rows without usable coordinates come last when sorting by distance
+        results = data_manager.search('', 'Distance', near=(lat, lon))
+        keys = [distances.get(b['ID']) for b in results]
+        assert len(keys) == len(businesses)
+        assert keys == sorted(distances.values()) + [None] * (len(businesses) - len(distances))
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_search_matches_baseline_through_changes_and_reloads(tmp_path, seed):
+    rng = random.Random(seed)
+    path = tmp_path / 'businesses.csv'
+    model = {f"id-{i}": random_business(rng, f"id-{i}") for i in range(rng.randint(50, 250))}
+    write_csv(path, model.values())
+    next_id = len(model)
+
+    data_manager = load(path)
+    assert data_manager.load_source == 'csv'
+    check_matches_baseline(rng, data_manager, model)
+    check_geo_matches_brute_force(rng, data_manager, model)
+
+    next_id = random_changes(rng, data_manager, model, next_id, 60)
+    check_matches_baseline(rng, data_manager, model)
+    check_geo_matches_brute_force(rng, data_manager, model)
+
+    # The CSV is unchanged, so this comes from the snapshot, with the changes replayed from the journal
+    data_manager = load(path)
+    assert data_manager.load_source == 'snapshot'
+    check_matches_baseline(rng, data_manager, model)
+    check_geo_matches_brute_force(rng, data_manager, model)
+
+    next_id = random_changes(rng, data_manager, model, next_id, 30)
+    assert data_manager.compact()
+    # Compaction rewrites the CSV, so the next start parses it again and the one after that is warm
+    for source in ('csv', 'snapshot'):
+        data_manager = load(path)
+        assert data_manager.load_source == source
+        check_matches_baseline(rng, data_manager, model)
+        check_geo_matches_brute_force(rng, data_manager, model)
+
+    random_changes(rng, data_manager, model, next_id, 30)
+    check_matches_baseline(rng, data_manager, model)
+    data_manager = load(path)
+    check_matches_baseline(rng, data_manager, model)
+    check_geo_matches_brute_force(rng, data_manager, model)
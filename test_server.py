@@ -0,0 +1,97 @@
+# test_server.py
+import asyncio
+import csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from data_manager import EXPECTED_HEADERS, DataManager
+from remote_data_manager import RemoteDataManager, ServiceError
+from reporting import LoggingReporter
+from server import SearchService
+
+
+def business(business_id, name, lat='', lon='', category='Cafe'):
+    return dict(dict.fromkeys(EXPECTED_HEADERS, ''), ID=business_id, Name=name, Category=category,
+                Address='1 Main Road', Latitude=lat, Longitude=lon)
+
+
+@pytest.fixture
+def client(tmp_path):
+    """A RemoteDataManager talking to a SearchService served from a background thread."""
+    path = tmp_path / 'businesses.csv'
+    with open(path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=EXPECTED_HEADERS)
+        writer.writeheader()
+        writer.writerows([business('a', 'Sai Cafe', '16.99', '73.31'), business('b', 'Shree Cafe', '17.2', '73.0'),
+                          business('c', 'Iron Gym', category='Gym')])
+    data_manager = DataManager(str(path), LoggingReporter())
+    data_manager.stream_business_data()
+    loop = asyncio.new_event_loop()
+    service = SearchService(data_manager, read_threads=4)
+    server = loop.run_until_complete(service.start('127.0.0.1', 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield RemoteDataManager(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}", LoggingReporter())
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    service._writer_task.cancel()
+    server.close()
+    loop.run_until_complete(asyncio.gather(service._writer_task, server.wait_closed(), return_exceptions=True))
+    loop.close()
+    service.readers.shutdown()
+    service.writer.shutdown()
+
+
+def error_status(client, method, path, payload=None):
+    with pytest.raises(ServiceError) as error:
+        client._request(method, path, payload)
+    return error.value.status
+
+
+def test_search_and_nearby(client):
+    reply = client._request('GET', '/search?q=cafe&sort=Name&reverse=1')
+    assert reply['total'] == 2 and [b['ID'] for b in reply['results']] == ['b', 'a']
+    reply = client._request('GET', '/search?q=&limit=1&offset=1')
+    assert reply['total'] == 3 and [b['ID'] for b in reply['results']] == ['a']
+    reply = client._request('GET', '/nearby?near=16.99,73.31&nearest=5')
+    assert [b['ID'] for b in reply['results']] == ['a', 'b']
+    assert reply['results'][0]['distance_km'] == 0.0
+    reply = client._request('GET', '/search?q=cafe%20within%201%20km&near=16.99,73.31')
+    assert [b['ID'] for b in reply['results']] == ['a']
+    assert error_status(client, 'GET', '/nearby?radius=5') == 400
+    assert error_status(client, 'GET', '/search?limit=ten') == 400
+    assert error_status(client, 'GET', '/search?near=north') == 400
+    assert error_status(client, 'GET', '/search?sort=Rating') == 400
+    assert error_status(client, 'GET', '/missing') == 404
+    assert error_status(client, 'DELETE', '/search') == 405
+
+
+def test_business_changes(client):
+    created = client._request('POST', '/businesses', {'Name': 'Cafe Nova', 'Category': 'Cafe', 'Address': '2 Road'})
+    assert client.get_business(created['ID'])['Name'] == 'Cafe Nova'
+    assert client.update_business(dict(business('a', 'Sai Cafe 2'), Latitude='abc'))
+    assert client.get_business('a')['Latitude'] == 'abc' # Kept, as the Edit window does
+    assert client._request('DELETE', '/businesses/c') == {'deleted': 'c'}
+    assert client.get_business('c') is None
+    assert [b['Name'] for b in client.search('', 'Name')] == ['Cafe Nova', 'Sai Cafe 2', 'Shree Cafe']
+    assert error_status(client, 'PUT', '/businesses/missing', business('missing', 'X')) == 404
+    assert error_status(client, 'DELETE', '/businesses/missing') == 404
+    assert error_status(client, 'POST', '/businesses', {'Name': 'No Category'}) == 400
+    assert error_status(client, 'POST', '/businesses', business('d', 'Far', '123', '73')) == 400
+    assert error_status(client, 'POST', '/businesses/d', business('d', 'D')) == 405
+
+
+def test_concurrent_writes_are_batched(client):
+    with ThreadPoolExecutor(16) as pool:
+        added = list(pool.map(lambda i: client.add_business(business(f"id-{i}", f"Cafe {i}")), range(40)))
+    assert all(added)
+    assert len(client.search('cafe', 'Name')) == 42
+    before = client._request('GET', '/stats')
+    assert before['businesses'] == 43 and before['writes'] == 40
+    # A bulk add is one request, queued at once, so it is written in a single batch
+    assert client.add_businesses([business(f"bulk-{i}", f"Bulk {i}") for i in range(100)])
+    after = client._request('GET', '/stats')
+    assert after['businesses'] == 143 and after['writes'] == 140
+    assert after['write_batches'] == before['write_batches'] + 1
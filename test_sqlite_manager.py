@@ -0,0 +1,80 @@
+# test_sqlite_manager.py
+import random
+
+from reporting import LoggingReporter
+from sqlite_manager import SQLiteDataManager, migrate_from_csv
+from test_search import POINTS, baseline_search, brute_force_distances, queries, random_business, write_csv
+
+
+def open_database(path):
+    sqlite_manager = SQLiteDataManager(str(path), LoggingReporter())
+    assert sqlite_manager.load_business_data() is not None
+    return sqlite_manager
+
+
+def migrated(tmp_path, businesses):
+    write_csv(tmp_path / 'businesses.csv', businesses)
+    assert migrate_from_csv(str(tmp_path / 'businesses.csv'), str(tmp_path / 'businesses.db'),
+                            reporter=LoggingReporter()) == len(businesses)
+    return open_database(tmp_path / 'businesses.db')
+
+
+def test_search_matches_baseline_after_migration_and_changes(tmp_path):
+    rng = random.Random(7)
+    model = {f"id-{i}": random_business(rng, f"id-{i}") for i in range(150)}
+    sqlite_manager = migrated(tmp_path, model.values())
+    for step in range(2):
+        businesses = list(model.values())
+        for query in queries(rng, businesses):
+            for reverse in (False, True):
+                expected = baseline_search(businesses, query, 'Name', reverse)
+                results = sqlite_manager.search(query, 'Name', reverse)
+                assert {b['ID'] for b in results} == {b['ID'] for b in expected}, query
+                assert [b['Name'].lower() for b in results] == [b['Name'].lower() for b in expected], query
+        for lat, lon in POINTS:
+            distances = brute_force_distances(businesses, lat, lon)
+            results = sqlite_manager.search('', 'Distance', near=(lat, lon), radius_km=20)
+            assert [distances[b['ID']] for b in results] == sorted(d for d in distances.values() if d <= 20)
+        # Edit, delete and add some rows, then check again
+        for business_id in rng.sample(sorted(model), 20):
+            model[business_id] = random_business(rng, business_id)
+            assert sqlite_manager.update_business(model[business_id])
+        for business_id in rng.sample(sorted(model), 20):
+            assert sqlite_manager.delete_business(business_id)
+            del model[business_id]
+        for i in range(20):
+            business = random_business(rng, f"new-{step}-{i}")
+            assert sqlite_manager.add_business(business)
+            model[business['ID']] = business
+    assert dict(sqlite_manager.get_business('new-1-3')) == model['new-1-3']
+    assert sqlite_manager.get_business('missing') is None
+
+
+def test_failed_changes_roll_back_alone(tmp_path):
+    sqlite_manager = open_database(tmp_path / 'businesses.db')
+    business = random_business(random.Random(1), 'a')
+    errors = sqlite_manager.apply_changes([('add', business), ('update', dict(business, ID='missing')),
+                                           ('delete', 'missing'), ('update', dict(business, Name='Renamed'))])
+    assert errors[0] is None and errors[3] is None
+    assert errors[1] == ("Error", "Could not find business to edit.")
+    assert errors[2] == ("Error", "Could not find business to delete.")
+    assert len(sqlite_manager.search('', 'Name')) == 1
+    assert sqlite_manager.get_business('a')['Name'] == 'Renamed'
+    # Changes persist once committed
+    sqlite_manager.connection.close()
+    assert open_database(tmp_path / 'businesses.db').get_business('a')['Name'] == 'Renamed'
+
+
+def test_relevance_ranks_like_the_csv_backend(tmp_path):
+    rng = random.Random(2)
+    businesses = [dict(random_business(rng, 'store'), Name='Corner Store', Category='Grocery Store',
+                       Description='Also has a pharmacy counter.'),
+                  dict(random_business(rng, 'sai'), Name='Sai Pharmacy', Category='Pharmacy', Description=''),
+                  dict(random_business(rng, 'gym'), Name='A-1 Gym', Category='Gym', Description='')]
+    sqlite_manager = migrated(tmp_path, businesses)
+    assert [b['ID'] for b in sqlite_manager.search('pharmacy', 'Relevance')] == ['sai', 'store']
+    # Queries shorter than a trigram or without words match as for the other sort keys
+    for query in ('-', 'a', 'ph'):
+        expected = {b['ID'] for b in sqlite_manager.search(query, 'Name')}
+        assert {b['ID'] for b in sqlite_manager.search(query, 'Relevance')} == expected, query
+    assert [b['ID'] for b in sqlite_manager.search('-', 'Relevance')] == ['gym']